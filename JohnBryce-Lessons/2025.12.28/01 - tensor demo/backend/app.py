@@ -1,14 +1,24 @@
 import uvicorn
 import shutil
 import os
+import hashlib
+import queue
+import threading
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future
 import tensorflow as tf
 from fastapi import FastAPI, File, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware
-from keras.models import load_model, Model, model_from_json
-from keras.layers import Dense, GlobalAveragePooling2D
+from starlette.concurrency import run_in_threadpool
+from keras.models import load_model, Model
+from keras.layers import Dense, GlobalAveragePooling2D, Input
 from keras.applications import MobileNetV2
 from keras.optimizers import Adam
-from PIL import Image, ImageOps
+from PIL import Image
+from prediction_cache import PredictionCache
 import numpy as np
 import io
 
@@ -16,6 +26,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(BASE_DIR, "keras_model.h5")
 labels_path = os.path.join(BASE_DIR, "labels.txt")
 TRAIN_DIR = os.path.join(BASE_DIR, "images", "training-images")
+FEATURE_CACHE_DIR = os.path.join(BASE_DIR, "feature-cache")
 
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff', '.tif'}
 ALLOWED_MIME_TYPES = {
@@ -23,6 +34,24 @@ ALLOWED_MIME_TYPES = {
     'image/bmp', 'image/tiff', 'image/heic', 'image/heif'
 }
 
+CACHE_MAX_ENTRIES = 5000
+
+# Uploads that arrive within TRAIN_DEBOUNCE_SECONDS of each other share one
+# retrain; a steady stream of uploads still retrains every TRAIN_MAX_WAIT_SECONDS
+TRAIN_DEBOUNCE_SECONDS = 3.0
+TRAIN_MAX_WAIT_SECONDS = 30.0
+JOB_HISTORY = 1000
+
+FEATURE_BATCH_SIZE = 32
+
+IMAGE_SIZE = (224, 224)
+# Part of the feature cache key: cached features are only valid for the
+# preprocessing that produced them
+PREPROCESSING = "center-crop-bilinear-224"
+
+# /predict requests waiting while the model runs are sent through it together
+PREDICT_MAX_BATCH = 16
+
 def is_valid_image(filename: str, content_type: str | None) -> bool:
     ext = os.path.splitext(filename.lower())[1]
     if ext in ALLOWED_EXTENSIONS:
@@ -31,6 +60,261 @@ def is_valid_image(filename: str, content_type: str | None) -> bool:
         return True
     return False
 
+class TrainingJobQueue:
+    # One background worker; all uploads pending when it starts become one retrain
+    def __init__(self, train_fn, debounce=TRAIN_DEBOUNCE_SECONDS,
+                 max_wait=TRAIN_MAX_WAIT_SECONDS, max_jobs=JOB_HISTORY):
+        self._cond = threading.Condition()
+        self._jobs = OrderedDict()
+        self._pending = []
+        self._first_pending_at = 0.0
+        self._last_submit_at = 0.0
+        self._thread = None
+        self.train_fn = train_fn
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.max_jobs = max_jobs
+        self.runs = 0
+        self.failed_runs = 0
+
+    def submit(self, label, filename):
+        job_id = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._cond:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "label": label,
+                "filename": filename,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "run": None,
+                "error": None,
+            }
+            if not self._pending:
+                self._first_pending_at = now
+            self._pending.append(job_id)
+            self._last_submit_at = now
+            self._trim()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="training-worker", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return job_id
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        with self._cond:
+            statuses = [job["status"] for job in self._jobs.values()]
+            return {
+                "queued": statuses.count("queued"),
+                "running": statuses.count("running"),
+                "succeeded": statuses.count("succeeded"),
+                "failed": statuses.count("failed"),
+                "runs": self.runs,
+                "failed_runs": self.failed_runs,
+            }
+
+    def _trim(self):
+        # Forget the oldest finished jobs; queued and running ones are kept
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job["status"] in ("succeeded", "failed")]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    def _take_batch(self):
+        with self._cond:
+            while True:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                # Wait for uploads to stop arriving, but not forever
+                now = time.monotonic()
+                start_at = min(self._last_submit_at + self.debounce,
+                               self._first_pending_at + self.max_wait)
+                if now >= start_at:
+                    break
+                self._cond.wait(start_at - now)
+
+            batch, self._pending = self._pending, []
+            self.runs += 1
+            for job_id in batch:
+                job = self._jobs[job_id]
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                job["run"] = self.runs
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            error = None
+            classes = None
+            try:
+                classes = self.train_fn()
+            except Exception as e:
+                error = str(e)
+
+            with self._cond:
+                if error is not None:
+                    self.failed_runs += 1
+                for job_id in batch:
+                    job = self._jobs.get(job_id)
+                    if job is None:
+                        continue
+                    job["status"] = "failed" if error is not None else "succeeded"
+                    job["finished_at"] = time.time()
+                    job["error"] = error
+                    job["classes"] = classes
+                self._trim()
+
+class FeatureCache:
+    # GlobalAveragePooling2D output of the frozen backbone, one .npy per training
+    # image keyed by sha256(file bytes), under a folder keyed by the backbone weights
+    def __init__(self, cache_dir=FEATURE_CACHE_DIR, batch_size=FEATURE_BATCH_SIZE):
+        self._lock = threading.Lock()
+        self.cache_dir = cache_dir
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def backbone_key(self, feature_model):
+        digest = hashlib.sha256(PREPROCESSING.encode())
+        for weights in feature_model.get_weights():
+            digest.update(np.ascontiguousarray(weights).tobytes())
+        return digest.hexdigest()[:16]
+
+    def features_for(self, feature_model, paths):
+        # Returns (features, indices of the paths that could be read)
+        folder = os.path.join(self.cache_dir, self.backbone_key(feature_model))
+        os.makedirs(folder, exist_ok=True)
+
+        features = [None] * len(paths)
+        missing = []
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                image_bytes = f.read()
+            cache_file = os.path.join(folder, hashlib.sha256(image_bytes).hexdigest() + ".npy")
+            if os.path.exists(cache_file):
+                features[i] = np.load(cache_file)
+            else:
+                missing.append((i, image_bytes, cache_file))
+
+        # Only images never seen before go through the backbone
+        for start in range(0, len(missing), self.batch_size):
+            batch = []
+            for i, image_bytes, cache_file in missing[start:start + self.batch_size]:
+                try:
+                    batch.append((i, process_image(image_bytes)[0], cache_file))
+                except Exception as e:
+                    print(f"Skipping unreadable training image {paths[i]}: {e}")
+                    with self._lock:
+                        self.skipped += 1
+            if not batch:
+                continue
+            outputs = feature_model(np.stack([data for _, data, _ in batch]), training=False).numpy()
+            for (i, _, cache_file), output in zip(batch, outputs):
+                tmp_file = cache_file + ".tmp"
+                with open(tmp_file, "wb") as f:
+                    np.save(f, output.astype(np.float32))
+                os.replace(tmp_file, cache_file)
+                features[i] = output
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(paths) - len(missing)
+        kept = [i for i, feature in enumerate(features) if feature is not None]
+        return np.stack([features[i] for i in kept]) if kept else None, kept
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "skipped": self.skipped}
+
+class PredictionBatcher:
+    # One inference thread. Requests that queue up while it is busy are run
+    # through the model as a single batch (no waiting for more to arrive).
+    def __init__(self, max_batch=PREDICT_MAX_BATCH):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.max_batch = max_batch
+        self.batches = 0
+        self.images = 0
+
+    def submit(self, data):
+        # data: (1, 224, 224, 3) array from process_image()
+        future = Future()
+        self._queue.put((data, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+                self._thread.start()
+        return future
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "images": self.images,
+                "mean_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+            }
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Drop requests cancelled while queued (e.g. the client went away);
+            # the rest can no longer be cancelled, so setting results is safe
+            items = [item for item in items if item[1].set_running_or_notify_cancel()]
+            if not items:
+                continue
+
+            try:
+                inference_fn, class_names = get_inference()
+                if inference_fn is None:
+                    raise RuntimeError("Model not loaded")
+                batch = np.concatenate([data for data, _ in items])
+                predictions = inference_fn(batch).numpy()
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.batches += 1
+                self.images += len(items)
+            for (_, future), prediction in zip(items, predictions):
+                future.set_result((prediction, class_names))
+
+def make_inference_fn(keras_model):
+    # Direct model call traced once for any batch size (no per-call
+    # Keras predict() setup), then warmed up so the first request is fast
+    @tf.function(input_signature=[tf.TensorSpec([None, *IMAGE_SIZE, 3], tf.float32)])
+    def inference_fn(images):
+        return keras_model(images, training=False)
+
+    inference_fn(tf.zeros([1, *IMAGE_SIZE, 3]))
+    return inference_fn
+
+def current_model_version():
+    if not os.path.exists(model_path):
+        return "none"
+    return str(os.stat(model_path).st_mtime_ns)
+
 app = FastAPI()
 
 app.add_middleware(
@@ -65,52 +349,102 @@ except Exception:
     model = None
     class_names = []
 
+prediction_cache = PredictionCache(current_model_version(), max_entries=CACHE_MAX_ENTRIES)
+
+# Warm-up at startup: trace and run the model once before the first request
+inference_fn = make_inference_fn(model) if model is not None else None
+prediction_batcher = PredictionBatcher()
+
+# model, inference_fn and class_names are only ever replaced together, under this lock
+model_lock = threading.Lock()
+
+def get_serving_model():
+    with model_lock:
+        return model, class_names
+
+def get_inference():
+    with model_lock:
+        return inference_fn, class_names
+
+def swap_model(new_model, new_class_names):
+    global model, inference_fn, class_names
+    # Warmed up before the swap, so requests never wait for tracing
+    new_inference_fn = make_inference_fn(new_model)
+    with model_lock:
+        model = new_model
+        inference_fn = new_inference_fn
+        class_names = new_class_names
+        prediction_cache.set_model_version(current_model_version())
+
+feature_cache = FeatureCache()
+
+def list_training_classes():
+    # Same order as image_dataset_from_directory assigns class indices
+    return sorted(
+        name for name in os.listdir(TRAIN_DIR)
+        if os.path.isdir(os.path.join(TRAIN_DIR, name))
+    )
+
+def list_training_images(class_name):
+    class_dir = os.path.join(TRAIN_DIR, class_name)
+    return sorted(
+        os.path.join(class_dir, f) for f in os.listdir(class_dir)
+        if not f.startswith('.') and os.path.splitext(f.lower())[1] in ALLOWED_EXTENSIONS
+    )
+
 def process_image(image_bytes):
-    data = np.ndarray(shape=(1, 224, 224, 3), dtype=np.float32)
-    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    size = (224, 224)
-    image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
-    image_array = np.asarray(image)
-    normalized_image_array = (image_array.astype(np.float32) / 127.5) - 1
-    data[0] = normalized_image_array
+    image = Image.open(io.BytesIO(image_bytes))
+    # JPEGs are decoded directly at (just above) the size we need
+    image.draft("RGB", IMAGE_SIZE)
+    image = image.convert("RGB")
+
+    # Same center crop as ImageOps.fit, cropped and resized in one step
+    width, height = image.size
+    side = min(width, height)
+    left, top = (width - side) / 2, (height - side) / 2
+    image = image.resize(IMAGE_SIZE, Image.Resampling.BILINEAR,
+                         box=(left, top, left + side, top + side), reducing_gap=3.0)
+
+    data = np.asarray(image, dtype=np.float32)[np.newaxis]
+    data /= 127.5
+    data -= 1
     return data
 
 def retrain_model_safely():
-    global model, class_names
+    # Runs on the training worker. /predict keeps serving the old model until
+    # the new one is trained and saved, then both are swapped in at once.
+    #
+    # The backbone is frozen, so its GlobalAveragePooling2D output for an image
+    # never changes: it comes from the feature cache (computed once per new
+    # image) and only the Dense head is trained.
+    serving_model, _ = get_serving_model()
+    if serving_model is None:
+        if not os.path.exists(model_path):
+            create_base_model()
+        serving_model = load_model(model_path, compile=False)
 
-    tf.keras.backend.clear_session()
-    
-    if not os.path.exists(model_path):
-        create_base_model()
+    pooled = serving_model.layers[-2].output
+    feature_model = Model(inputs=serving_model.input, outputs=pooled)
 
-    loaded_model = load_model(model_path, compile=False)
-    
-    model_config = loaded_model.to_json()
-    model_weights = loaded_model.get_weights()
-    training_model = model_from_json(model_config)
-    training_model.set_weights(model_weights)
-
-    train_ds = tf.keras.utils.image_dataset_from_directory(
-        TRAIN_DIR,
-        seed=123,
-        image_size=(224, 224),
-        batch_size=32,
-        label_mode='categorical'
-    )
+    new_class_names = list_training_classes()
+    paths = []
+    labels = []
+    for i, class_name in enumerate(new_class_names):
+        class_paths = list_training_images(class_name)
+        paths.extend(class_paths)
+        labels.extend([i] * len(class_paths))
 
-    new_class_names = train_ds.class_names
-    
-    class_weights = {}
-    total_images = 0
-    class_counts = {}
+    features, kept = feature_cache.features_for(feature_model, paths)
+    if features is None:
+        raise ValueError("No readable training images found.")
+    labels = np.array(labels)[kept]
+    one_hot = np.eye(len(new_class_names), dtype=np.float32)[labels]
 
-    for i, class_name in enumerate(new_class_names):
-        class_dir = os.path.join(TRAIN_DIR, class_name)
-        count = len([f for f in os.listdir(class_dir) if not f.startswith('.')])
-        class_counts[i] = count
-        total_images += count
+    class_weights = {}
+    total_images = len(labels)
+    class_counts = np.bincount(labels, minlength=len(new_class_names))
     
-    for i, count in class_counts.items():
+    for i, count in enumerate(class_counts):
         if count > 0:
             raw_weight = total_images / (len(new_class_names) * count)
             class_weights[i] = min(raw_weight, 10.0) 
@@ -124,27 +458,43 @@ def retrain_model_safely():
         except Exception:
             pass
 
-    with open(labels_path, "w") as f:
-        for i, name in enumerate(new_class_names):
-            f.write(f"{i} {name}\n")
-    
-    class_names = [f"{i} {name}\n" for i, name in enumerate(new_class_names)]
+    # The head is trained on its own, then attached to the (shared, frozen) backbone
+    head_layer = Dense(len(new_class_names), activation='softmax', name="new_final_output")
+    feature_input = Input(shape=features.shape[1:])
+    head = Model(inputs=feature_input, outputs=head_layer(feature_input))
+
+    head.compile(optimizer=Adam(learning_rate=0.00001), 
+                 loss='categorical_crossentropy',
+                 metrics=['accuracy'])
+
+    train_ds = (
+        tf.data.Dataset.from_tensor_slices((features, one_hot))
+        .cache()
+        .shuffle(len(features), seed=123)
+        .batch(32)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    head.fit(train_ds, epochs=20, class_weight=class_weights, verbose=0)
 
-    for layer in training_model.layers:
+    for layer in feature_model.layers:
         layer.trainable = False
-    
-    x = training_model.layers[-2].output
-    predictions = Dense(len(new_class_names), activation='softmax', name="new_final_output")(x)
-    training_model = Model(inputs=training_model.input, outputs=predictions)
+    training_model = Model(inputs=feature_model.input, outputs=head_layer(pooled))
 
-    training_model.compile(optimizer=Adam(learning_rate=0.00001), 
-                  loss='categorical_crossentropy',
-                  metrics=['accuracy'])
+    # Write under temporary names, then rename: a crash never leaves a
+    # half-written model, or labels that do not match the model
+    tmp_model_path = model_path.replace(".h5", ".tmp.h5")
+    training_model.save(tmp_model_path)
+    new_labels = [f"{i} {name}\n" for i, name in enumerate(new_class_names)]
+    tmp_labels_path = labels_path + ".tmp"
+    with open(tmp_labels_path, "w") as f:
+        f.writelines(new_labels)
+    os.replace(tmp_model_path, model_path)
+    os.replace(tmp_labels_path, labels_path)
 
-    training_model.fit(train_ds, epochs=20, class_weight=class_weights)
+    swap_model(training_model, new_labels)
+    return list(new_class_names)
 
-    training_model.save(model_path)
-    model = training_model
+training_jobs = TrainingJobQueue(retrain_model_safely)
 
 @app.get("/")
 async def index():
@@ -157,9 +507,18 @@ async def predict(file: UploadFile = File(...)):
             return {"error": f"Invalid image format. Supported formats: {', '.join(ALLOWED_EXTENSIONS)}"}
         
         image_data = await file.read()
-        processed_data = process_image(image_data)
+
+        cache_key = prediction_cache.key_for(image_data)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        # Decoding and inference run off the event loop
+        processed_data = await run_in_threadpool(process_image, image_data)
         
-        prediction = model.predict(processed_data)
+        # The prediction comes with the labels of the model that made it
+        prediction, class_names = await asyncio.wrap_future(prediction_batcher.submit(processed_data))
         
         if np.isnan(prediction).any():
             return {"error": "Model returned NaN. Needs reset."}
@@ -170,23 +529,25 @@ async def predict(file: UploadFile = File(...)):
              return {"error": "Model reload required"}
 
         class_name = class_names[index]
-        confidence_score = float(prediction[0][index])
+        confidence_score = float(prediction[index])
         
         if confidence_score < 0.60:
-            return {
+            result = {
                 "class": "Unknown",
                 "confidence": confidence_score,
                 "raw_index": -1,
                 "message": "Confidence too low"
             }
+        else:
+            clean_class_name = class_name.split(' ', 1)[1].strip() if ' ' in class_name else class_name.strip()
+            result = {
+                "class": clean_class_name,
+                "confidence": confidence_score,
+                "raw_index": int(index)
+            }
 
-        clean_class_name = class_name.split(' ', 1)[1].strip() if ' ' in class_name else class_name.strip()
-
-        return {
-            "class": clean_class_name,
-            "confidence": confidence_score,
-            "raw_index": int(index)
-        }
+        prediction_cache.put(cache_key, result, (time.perf_counter() - started) * 1000)
+        return result
     except Exception as e:
         return {"error": str(e)}
 
@@ -201,20 +562,46 @@ async def train(file: UploadFile = File(...), label: str = Form(...)):
         class_dir = os.path.join(TRAIN_DIR, clean_label)
         os.makedirs(class_dir, exist_ok=True)
 
+        # Hidden temporary name, so a retrain that starts meanwhile
+        # never reads a half-written image
         file_location = os.path.join(class_dir, file.filename)
-        with open(file_location, "wb") as buffer:
+        tmp_location = os.path.join(class_dir, f".{file.filename}.part")
+        with open(tmp_location, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+        os.replace(tmp_location, file_location)
         
-        retrain_model_safely()
+        # Retraining happens in the background; uploads close together share one run
+        job_id = training_jobs.submit(clean_label, file.filename)
 
         return {
             "status": "success",
-            "message": f"Added to '{clean_label}'.",
-            "classes": [c.strip() for c in class_names]
+            "message": f"Added to '{clean_label}'. Training queued.",
+            "job_id": job_id,
+            "job_status": "queued",
+            "classes": list_training_classes()
         }
 
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/train/jobs/{job_id}")
+async def train_job(job_id: str):
+    job = training_jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job '{job_id}'."}
+    return job
+
+@app.get("/train/stats")
+async def train_stats():
+    return {**training_jobs.stats(), "feature_cache": feature_cache.stats()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return prediction_cache.stats()
+
+@app.get("/predict/stats")
+async def predict_stats():
+    return prediction_batcher.stats()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
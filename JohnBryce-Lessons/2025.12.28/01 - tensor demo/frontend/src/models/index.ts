@@ -16,6 +16,8 @@ export interface TrainResponse {
   status: "success" | "error";
   message: string;
   classes?: string[];
+  job_id?: string;
+  job_status?: "queued" | "running" | "succeeded" | "failed";
 }
 
 export type TabMode = "identify" | "teach";
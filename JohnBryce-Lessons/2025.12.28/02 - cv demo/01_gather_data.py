@@ -1,12 +1,9 @@
 import cv2
-import os
+from face_enrollment import EnrollmentSession
+from face_store import STORE_PATH
 
 def main():
-    # 1. Create a folder for the data
-    if not os.path.exists('dataset'):
-        os.makedirs('dataset')
-
-    # 2. Setup Camera and Detector
+    # 1. Setup Camera and Detector
     cap = cv2.VideoCapture(0)
     face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 
@@ -16,7 +13,9 @@ def main():
     # Ask for your ID (Just use '1' for Dean)
     face_id = input('\nenter user id (number) and press <return>: ')
     
-    count = 0
+    # 2. A background worker checks every face (blurry? same as one we
+    #    already have?) and saves the 30 good ones in one go
+    session = EnrollmentSession(int(face_id))
     while True:
         ret, frame = cap.read()
         if not ret: break
@@ -28,26 +27,24 @@ def main():
             # Draw a box just so you see it working
             cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
             
-            # Increment photo count
-            count += 1
-            
-            # Save the captured image into the datasets folder
-            # We save it as "User.1.4.jpg" (User.ID.Count.jpg)
-            cv2.imwrite(f"dataset/User.{face_id}.{count}.jpg", gray[y:y+h, x:x+w])
+            # Hand the face to the worker (no disk I/O here)
+            session.submit(gray[y:y+h, x:x+w])
             
-            cv2.imshow('Gathering Data', frame)
+        cv2.putText(frame, session.status(), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.imshow('Gathering Data', frame)
 
-        # Stop after 30 photos
-        if count >= 30: 
+        # Stop after 30 good photos
+        if session.full.is_set():
             break
         
-        # Small delay
-        if cv2.waitKey(100) & 0xFF == ord('q'):
+        # No delay needed: near-identical frames are skipped by the worker
+        if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
-    print("\nDone! Data gathered.")
     cap.release()
     cv2.destroyAllWindows()
+    faces = session.close()
+    print(f"\nDone! {len(faces)} faces saved to {STORE_PATH}/.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
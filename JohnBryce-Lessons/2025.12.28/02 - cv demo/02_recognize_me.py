@@ -1,47 +1,31 @@
 import cv2
 import numpy as np
 import os
+from face_store import dataset_imported, import_dataset, load_faces, preprocess_face, write_model
+from face_tracker import FaceTracker
 
 def train_model():
-    # Initialize the recognizer and detector
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-
-    # Get all the file paths in the dataset folder
-    imagePaths = [os.path.join("dataset", f) for f in os.listdir("dataset") if f.endswith(".jpg")]
-    
-    faceSamples = []
-    ids = []
-
     print("Training the model... please wait...")
 
-    for imagePath in imagePaths:
-        # Convert image to grayscale (just in case)
-        PIL_img = cv2.imread(imagePath, cv2.IMREAD_GRAYSCALE)
-        img_numpy = np.array(PIL_img, 'uint8')
-
-        # Extract the User ID from the image name "User.1.4.jpg"
-        id = int(os.path.split(imagePath)[-1].split(".")[1])
-        
-        # Detect the face inside the training image to be sure
-        faces = detector.detectMultiScale(img_numpy)
-        
-        for (x, y, w, h) in faces:
-            faceSamples.append(img_numpy[y:y+h, x:x+w])
-            ids.append(id)
+    # The dataset/ JPEGs are already cropped faces: they go into the crop
+    # store once (resized, no face detection), and training reads the store
+    if not dataset_imported():
+        import_dataset()
+
+    faces, ids = load_faces()
 
     # Train the recognizer with the data
-    recognizer.train(faceSamples, np.array(ids))
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(list(faces), ids)
     
     # Save the model
-    recognizer.write('trainer.yml')
+    write_model(recognizer)
     print(f"Model trained! {len(np.unique(ids))} face(s) learned.")
     return recognizer
 
 def start_recognition(recognizer):
     # Load the trained model
     recognizer.read('trainer.yml')
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
     
     font = cv2.FONT_HERSHEY_SIMPLEX
     
@@ -55,26 +39,27 @@ def start_recognition(recognizer):
     minW = 0.1 * cap.get(3)
     minH = 0.1 * cap.get(4)
 
+    # Haar runs on a small copy of the frame every few frames,
+    # and the faces are tracked (much cheaper) in between
+    tracker = FaceTracker(scale_factor=1.2, min_neighbors=5, min_size=(int(minW), int(minH)))
+
     print("Starting camera... Press 'q' to quit.")
 
     while True:
         ret, frame = cap.read()
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.2,
-            minNeighbors=5,
-            minSize=(int(minW), int(minH)),
-        )
-
-        for(x, y, w, h) in faces:
+        for track in tracker.update(gray):
+            x, y, w, h = track.box
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
             
-            # Predict who is in the box
+            # Predict who is in the box (only for new or re-detected faces,
+            # a tracked face keeps its last prediction)
             # id = Who it thinks it is
             # confidence = How WRONG it thinks it is (0 is perfect match, 100 is bad match)
-            id, confidence = recognizer.predict(gray[y:y+h, x:x+w])
+            if track.fresh:
+                track.label, track.confidence = recognizer.predict(preprocess_face(gray[y:y+h, x:x+w]))
+            id, confidence = track.label, track.confidence
 
             # If confidence is less than 100, "0" is a perfect match 
             if (confidence < 100):
@@ -89,15 +74,16 @@ def start_recognition(recognizer):
 
         cv2.imshow('camera', frame) 
 
-        if cv2.waitKey(10) & 0xFF == ord('q'):
+        if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
     cap.release()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    # If the trainer file doesn't exist, train first.
-    if not os.path.exists("trainer.yml"):
+    # If the trainer file doesn't exist (or was trained before the crop
+    # store, on faces of other sizes), train first.
+    if not dataset_imported() or not os.path.exists("trainer.yml"):
         my_recognizer = train_model()
     else:
         # If it exists, load it
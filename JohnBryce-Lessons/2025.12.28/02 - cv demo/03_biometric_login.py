@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 import os
+from face_store import dataset_imported, preprocess_face
+from face_tracker import FaceTracker
 
 # --- PART 1: THE AUTHENTICATION LAYER ---
 def login_with_face():
@@ -8,17 +10,18 @@ def login_with_face():
     Scans the camera feed. 
     Returns the User ID (int) if verification passes, or None if failed/quit.
     """
-    # 1. Check if the 'brain' exists
-    if not os.path.exists('trainer.yml'):
-        print("[ERROR] 'trainer.yml' not found. Please run the training script first!")
+    # 1. Check if the 'brain' exists (and was trained on the crop store)
+    if not os.path.exists('trainer.yml') or not dataset_imported():
+        print("[ERROR] 'trainer.yml' not found or out of date. Please run the training script first!")
         return None
 
     # 2. Load the recognizer and the trained data
     recognizer = cv2.face.LBPHFaceRecognizer_create()
     recognizer.read('trainer.yml')
     
-    # 3. Load the face detector (Haar Cascade)
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    # 3. Load the face detector (Haar Cascade on a small frame every few
+    #    frames, with cheap tracking of the faces in between)
+    tracker = FaceTracker(scale_factor=1.2, min_neighbors=5)
     
     cap = cv2.VideoCapture(0)
     
@@ -28,7 +31,9 @@ def login_with_face():
     print("\n[SYSTEM] Camera starting... Looking for User 1 (Dean)...")
     print("[SYSTEM] Press 'q' to cancel login.\n")
 
-    # DEBOUNCING VARS: We need 10 consecutive matches to trust the result
+    # DEBOUNCING VARS: We need 15 consecutive matches to trust the result
+    # (identifications of new or re-detected faces, not frames: a tracked
+    # face only repeats its last identification)
     consecutive_matches = 0
     REQUIRED_MATCHES = 15  # Increased to 15 for extra security
     
@@ -39,32 +44,36 @@ def login_with_face():
         if not ret: break
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5)
-
-        for(x, y, w, h) in faces:
+        for track in tracker.update(gray):
+            x, y, w, h = track.box
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
             
-            # Predict: Who is this?
+            # Predict: Who is this? (only for new or re-detected faces)
             # id = User ID (1, 2, etc.)
             # confidence = Distance (0 is perfect match, 100 is bad match)
-            id, confidence = recognizer.predict(gray[y:y+h, x:x+w])
+            if track.fresh:
+                track.label, track.confidence = recognizer.predict(preprocess_face(gray[y:y+h, x:x+w]))
+            id, confidence = track.label, track.confidence
 
             # Logic: If confidence is less than 55, it's a solid match
             if confidence < 55:
                 # Check for Dean (ID 1)
                 if id == 1:
-                    consecutive_matches += 1
+                    if track.fresh:
+                        consecutive_matches += 1
                     name = "Dean"
                     # Visual feedback: Show a loading bar effect
                     match_text = f"Verifying: {consecutive_matches}/{REQUIRED_MATCHES}"
                     color = (0, 255, 0) # Green
                 else:
-                    consecutive_matches = 0
+                    if track.fresh:
+                        consecutive_matches = 0
                     name = "Unknown"
                     match_text = "Access Denied"
                     color = (0, 0, 255)
             else:
-                consecutive_matches = 0
+                if track.fresh:
+                    consecutive_matches = 0
                 name = "Unknown"
                 match_text = "Scanning..."
                 color = (0, 0, 255) # Red
@@ -82,7 +91,7 @@ def login_with_face():
             break # Exit the loop
 
         # Quit with 'q'
-        if cv2.waitKey(10) & 0xFF == ord('q'):
+        if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
     cap.release()
@@ -0,0 +1,159 @@
+import numpy as np
+import queue
+import threading
+from face_store import preprocess_face, save_faces
+
+# --- CONFIGURATION ---
+TARGET_FACES = 30        # Accepted face crops per enrollment
+MIN_SHARPNESS = 40.0     # Variance of the Laplacian of a 100x100 crop; below = blurry
+MIN_DIVERSITY = 0.05     # Histogram distance to the closest accepted crop; below = duplicate
+GRID = 4                 # Diversity histograms: GRID x GRID cells of the face...
+BINS = 8                 # ...with BINS gray levels each
+QUEUE_SIZE = 64          # Crops waiting for the worker (extra crops are dropped, capture never waits)
+
+# ==========================================
+# QUALITY SCORES (WHOLE BATCH AT ONCE)
+# ==========================================
+def sharpness(faces):
+    """
+    Variance of the Laplacian of every crop in an (N, height, width) array.
+
+    Blurry crops (motion, out of focus) have few edges, so a low variance.
+    """
+    faces = faces.astype(np.int16)
+    laplacian = (faces[:, :-2, 1:-1] + faces[:, 2:, 1:-1]
+                 + faces[:, 1:-1, :-2] + faces[:, 1:-1, 2:]
+                 - 4 * faces[:, 1:-1, 1:-1])
+    return laplacian.var(axis=(1, 2), dtype=np.float32)
+
+def grid_histograms(faces):
+    """
+    Gray-level histograms of a GRID x GRID split of every crop.
+
+    Returned as square roots of normalized histograms, so the Hellinger
+    distance between two crops is sqrt(1 - dot product). Cells make the
+    histograms change when the head turns or tilts, while camera noise
+    barely moves them.
+    """
+    count, height, width = faces.shape
+    rows = np.arange(height) * GRID // height
+    cols = np.arange(width) * GRID // width
+    cells = (rows[:, None] * GRID + cols[None, :]).ravel()
+
+    # One bincount for the whole batch: (face, cell, gray level) -> bin index
+    levels = faces.reshape(count, -1) // (256 // BINS)
+    bins = (np.arange(count)[:, None] * GRID * GRID + cells[None, :]) * BINS + levels
+    histograms = np.bincount(bins.ravel(), minlength=count * GRID * GRID * BINS)
+    histograms = histograms.reshape(count, -1).astype(np.float32) / (height * width)
+    return np.sqrt(histograms)
+
+# ==========================================
+# BACKGROUND ENROLLMENT
+# ==========================================
+class EnrollmentSession:
+    """
+    Collects one user's face crops without slowing down the camera loop.
+
+    The capture loop only calls submit(crop). A worker thread scores the
+    queued crops in batches, keeps the sharp ones that differ from every
+    crop kept so far, and, once TARGET_FACES are kept, saves them all in
+    one call to save(user_id, faces) - still on the worker thread.
+    """
+    def __init__(self, user_id, save=save_faces, target=TARGET_FACES):
+        self.user_id = user_id
+        self.save = save
+        self.target = target
+
+        self.accepted = []
+        self._roots = np.empty((0, GRID * GRID * BINS), np.float32)
+        self.rejected_blurry = 0
+        self.rejected_duplicate = 0
+        self.dropped = 0
+        self.hint = ""
+        self.full = threading.Event()    # Set once `target` crops are kept
+        self.saved = False
+        self.error = None
+
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, face):
+        """Hands a grayscale face crop to the worker (never blocks)."""
+        if self.full.is_set():
+            return
+        try:
+            self._queue.put_nowait(face)
+        except queue.Full:
+            self.dropped += 1
+
+    def status(self):
+        """Progress text for the camera window."""
+        text = f"Captured: {len(self.accepted)}/{self.target}"
+        return f"{text}  {self.hint}" if self.hint else text
+
+    def close(self):
+        """
+        Waits for the worker to finish and returns the kept crops.
+
+        Crops kept before the user quit are saved too (like before).
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.accepted
+
+    def _run(self):
+        try:
+            stop = False
+            while not stop:
+                batch = [self._queue.get()]
+                # Take everything that piled up while we were busy
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = any(face is None for face in batch)
+                faces = [face for face in batch if face is not None]
+                if faces and not self.full.is_set():
+                    self._score(np.stack([preprocess_face(face) for face in faces]))
+                if self.full.is_set():
+                    self._save()
+            self._save()
+        except Exception as e:
+            self.error = e
+
+    def _score(self, faces):
+        """Keeps the sharp, new-looking crops of one batch."""
+        sharp = sharpness(faces) >= MIN_SHARPNESS
+        self.rejected_blurry += int(np.count_nonzero(~sharp))
+        if not sharp.all():
+            self.hint = "Hold still"
+
+        roots = grid_histograms(faces)
+        for i in np.flatnonzero(sharp):
+            if len(self.accepted) >= self.target:
+                break
+            # Distance to the closest crop kept so far (including this batch's)
+            if len(self._roots) > 0:
+                closest = np.sqrt(max(0.0, 1.0 - float(np.max(self._roots @ roots[i]))))
+                if closest < MIN_DIVERSITY:
+                    self.rejected_duplicate += 1
+                    self.hint = "Move your head slightly"
+                    continue
+            self.accepted.append(faces[i])
+            self._roots = np.vstack([self._roots, roots[i]])
+            self.hint = ""
+
+        if len(self.accepted) >= self.target:
+            self.full.set()
+
+    def _save(self):
+        """Writes every kept crop in one go (only once)."""
+        if self.saved or not self.accepted:
+            return
+        self.saved = True
+        self.save(self.user_id, self.accepted)
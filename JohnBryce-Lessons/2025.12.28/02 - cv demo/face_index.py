@@ -0,0 +1,475 @@
+import cv2
+import numpy as np
+import os
+import sys
+import time
+
+from face_enrollment import TARGET_FACES
+from face_store import dataset_imported, import_dataset, load_faces, store_files
+
+# --- CONFIGURATION ---
+INDEX_PATH = "face_index"      # Folder with the index files (rows + metadata)
+CONFIDENCE_THRESHOLD = 55      # Same rule as login(): confidence < 55 is a match
+MAX_FACES_PER_USER = 10        # Index rows kept per user (of the TARGET_FACES crops stored)
+CENTROID_CANDIDATES = 50       # Users kept by the (optional) centroid pre-filter
+BATCH_SIZE = 2048              # Histograms converted per LBPH call when building
+FILES_PER_BATCH = 100          # Store files read at a time when indexing
+
+# ==========================================
+# LBP HISTOGRAMS
+# ==========================================
+def lbp_histograms(faces):
+    """
+    LBPH histograms of preprocessed faces, as a (N, 16384) float32 array.
+
+    Uses OpenCV's own LBPH code (default radius/neighbors/grid), so the
+    histograms are exactly the ones recognizer.predict() compares.
+    """
+    extractor = cv2.face.LBPHFaceRecognizer_create()
+    histograms = None
+    for start in range(0, len(faces), BATCH_SIZE):
+        batch = list(faces[start:start + BATCH_SIZE])
+        extractor.train(batch, np.zeros(len(batch), dtype=np.int32))
+        for offset, histogram in enumerate(extractor.getHistograms()):
+            if histograms is None:
+                # Filled in place: no second copy of a large result
+                histograms = np.empty((len(faces), histogram.size), dtype=np.float32)
+            histograms[start + offset] = histogram[0]
+    return histograms
+
+def chi_square(query, histograms):
+    """
+    OpenCV's HISTCMP_CHISQR_ALT distance (what LBPH predict() uses):
+    2 * sum((q - h)^2 / (q + h)) over the bins where q + h > 0.
+    """
+    query = query.astype(np.float64)
+    histograms = histograms.astype(np.float64)
+    total = query + histograms
+    diff = query - histograms
+    np.square(diff, out=diff)
+    np.divide(diff, total, out=diff, where=total > 0)
+    diff[total <= 0] = 0
+    return 2 * diff.sum(axis=1)
+
+def cap_per_user(labels, limit=MAX_FACES_PER_USER, counts=None):
+    """
+    Row numbers to index: at most `limit` per user, spread evenly over
+    each user's faces (enrollment keeps crops that differ, so any of them
+    is a fair sample).
+
+    counts: {user_id: rows already indexed}, which use up part of the limit.
+    """
+    counts = counts or {}
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    users, starts, sizes = np.unique(labels[order], return_index=True, return_counts=True)
+
+    keep = []
+    for user_id, start, size in zip(users, starts, sizes):
+        room = min(size, limit - counts.get(int(user_id), 0))
+        if room > 0:
+            keep.append(order[start + np.linspace(0, size - 1, room).round().astype(np.intp)])
+    return np.sort(np.concatenate(keep)) if keep else np.empty(0, np.intp)
+
+# ==========================================
+# THE INDEX
+# ==========================================
+class FaceIndex:
+    """
+    Nearest-neighbour face identification over LBPH histograms.
+
+    Gives the same answer as LBPHFaceRecognizer.predict() (nearest stored
+    histogram by chi-square distance), without comparing the query to
+    every histogram one by one:
+
+    1. The index keeps sqrt(histogram) of every stored face in one
+       contiguous float32 matrix. One matrix product gives the Hellinger
+       distance H = sum((sqrt(q) - sqrt(h))^2) to every stored face.
+    2. Chi-square and Hellinger bound each other: 2*H <= chi2 <= 4*H.
+       So only faces with H <= 2 * min(H) can be the nearest one, and
+       only faces with 2*H < CONFIDENCE_THRESHOLD can be a match.
+    3. The exact chi-square is computed for those few candidates only.
+
+    Optional centroid pre-filter: first keep the CENTROID_CANDIDATES
+    users whose average face is closest, then search only their faces.
+    Much faster with many users, but approximate (a user whose average
+    face is far away is never checked).
+
+    files lists the crop store files the index was built from, so a
+    saved index can be checked against the store (see load_or_build_index).
+
+    A saved index is memory-mapped, not read into RAM (each row is 64 KB):
+    the OS loads the pages a search touches and can drop them again.
+    """
+
+    def __init__(self, roots, labels, files=(), norms=None):
+        self.roots = np.ascontiguousarray(roots, dtype=np.float32)   # (N, D) sqrt(histograms)
+        self.labels = np.asarray(labels, dtype=np.int32)            # (N,) user IDs
+        if norms is None:
+            norms = np.einsum("ij,ij->i", self.roots, self.roots)
+        self.norms = np.asarray(norms, dtype=np.float32)            # (N,) sum of each histogram
+        self.files = list(files)                                    # Store files it covers
+        self.roots_file = None                                      # Rows file, once saved
+        self._centroids = None
+
+    @classmethod
+    def from_histograms(cls, histograms, labels, files=()):
+        """Takes ownership of a float32 histogram array (sqrt is done in place)."""
+        histograms = np.asarray(histograms, dtype=np.float32)
+        return cls(np.sqrt(histograms, out=histograms), labels, files)
+
+    @classmethod
+    def from_faces(cls, faces, labels, files=()):
+        return cls.from_histograms(lbp_histograms(faces), labels, files)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _user_centroids(self):
+        """(users, centroid sqrt-histograms, squared norms), built on first use."""
+        if self._centroids is None:
+            users, rows = np.unique(self.labels, return_inverse=True)
+            sums = np.zeros((len(users), self.roots.shape[1]), np.float32)
+            np.add.at(sums, rows, self.roots)
+            centroids = sums / np.bincount(rows)[:, None].astype(np.float32)
+            norms = np.einsum("ij,ij->i", centroids, centroids)
+            self._centroids = (users, centroids, norms, rows)
+        return self._centroids
+
+    # ---------- search ----------
+    def _hellinger(self, query_roots, rows=None):
+        """Squared Hellinger distances, (queries, N) - one matrix product."""
+        roots = self.roots if rows is None else self.roots[rows]
+        norms = self.norms if rows is None else self.norms[rows]
+        query_norms = np.einsum("ij,ij->i", query_roots, query_roots)
+        distances = roots @ query_roots.T            # (N, queries)
+        distances *= -2
+        distances += norms[:, None]
+        distances += query_norms[None, :]
+        np.maximum(distances, 0, out=distances)      # Rounding can go slightly negative
+        return distances.T
+
+    def predict_batch(self, faces, use_centroids=False):
+        """
+        Identifies several faces at once (e.g. every face in a frame).
+
+        Args:
+            faces: Preprocessed faces (see preprocess_face)
+            use_centroids: Search only the users with the closest centroids
+
+        Returns:
+            labels: (M,) user IDs (-1 when no stored face can be a match)
+            confidences: (M,) chi-square distances, like recognizer.predict()
+        """
+        query_histograms = lbp_histograms(faces)
+        query_roots = np.sqrt(query_histograms)
+        labels = np.full(len(faces), -1, dtype=np.int32)
+        confidences = np.full(len(faces), np.inf)
+
+        rows = None
+        if use_centroids:
+            users, centroids, centroid_norms, user_of_row = self._user_centroids()
+
+        for i in range(len(faces)):
+            if use_centroids:
+                distances = centroid_norms - 2 * (centroids @ query_roots[i]) + query_roots[i] @ query_roots[i]
+                keep = min(CENTROID_CANDIDATES, len(users))
+                nearest_users = np.argpartition(distances, keep - 1)[:keep]
+                rows = np.flatnonzero(np.isin(user_of_row, nearest_users))
+                hellinger = self._hellinger(query_roots[i:i + 1], rows)[0]
+            elif i == 0:
+                # Without the pre-filter, all queries share one matrix product
+                all_hellinger = self._hellinger(query_roots)
+                hellinger = all_hellinger[0]
+            else:
+                hellinger = all_hellinger[i]
+
+            # Faces that can still be the nearest one AND a match
+            # (+ a small margin for float32 rounding in the matrix product)
+            limit = min(2 * hellinger.min(), CONFIDENCE_THRESHOLD / 2) * 1.001 + 1e-3
+            candidates = np.flatnonzero(hellinger <= limit)
+            if len(candidates) == 0:
+                continue
+
+            if rows is not None:
+                candidates = rows[candidates]
+            distances = chi_square(query_histograms[i], np.square(self.roots[candidates]))
+            best = distances.argmin()
+            labels[i] = self.labels[candidates[best]]
+            confidences[i] = distances[best]
+
+        return labels, confidences
+
+    def predict(self, face, use_centroids=False):
+        """Same return value as recognizer.predict(): (label, confidence)."""
+        labels, confidences = self.predict_batch([face], use_centroids)
+        return int(labels[0]), float(confidences[0])
+
+    # ---------- files ----------
+    # The rows are raw float32 in roots.<id>.f32 and only ever grow at the
+    # end, so adding a user writes just that user's rows. The small arrays
+    # (labels, norms, files) and the name of the rows file are in meta.npz,
+    # which is swapped in by renaming: whatever happens, it describes
+    # rows that are fully written.
+    def save(self, path=INDEX_PATH):
+        """Writes the whole index to a new rows file, then points meta.npz at it."""
+        os.makedirs(path, exist_ok=True)
+        roots_file = f"roots.{time.time_ns()}.f32"
+        self.roots.tofile(os.path.join(path, roots_file))
+        self.roots_file = roots_file
+        self._save_meta(path)
+
+        # Rows files of earlier saves are no longer used
+        for name in os.listdir(path):
+            if name.startswith("roots.") and name != roots_file:
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError:
+                    pass  # Still mapped by another process (Windows)
+
+    def append(self, faces, labels, files, path=INDEX_PATH):
+        """
+        Adds preprocessed faces to a saved index, writing only the new rows.
+
+        files is the new list of store files the index covers.
+        """
+        labels = np.asarray(labels, dtype=np.int32)
+        if len(labels) > 0:
+            new_roots = np.sqrt(lbp_histograms(faces))
+            roots_path = os.path.join(path, self.roots_file)
+            self.roots = None  # Unmap before writing (Windows can't resize a mapped file)
+            with open(roots_path, "r+b") as f:
+                # Drop any rows a crash left after the ones meta.npz describes
+                f.truncate(len(self.labels) * new_roots.shape[1] * 4)
+                f.seek(0, os.SEEK_END)
+                new_roots.tofile(f)
+            self.labels = np.concatenate([self.labels, labels])
+            self.norms = np.concatenate([self.norms, np.einsum("ij,ij->i", new_roots, new_roots)])
+            self.roots = np.memmap(roots_path, dtype=np.float32, mode="r",
+                                   shape=(len(self.labels), new_roots.shape[1]))
+            self._centroids = None
+        self.files = list(files)
+        self._save_meta(path)
+
+    def _save_meta(self, path):
+        tmp_file = os.path.join(path, "meta.tmp.npz")
+        np.savez(tmp_file, labels=self.labels, norms=self.norms, files=np.array(self.files, dtype=str),
+                 roots_file=np.array(self.roots_file), dim=np.array(self.roots.shape[1]))
+        os.replace(tmp_file, os.path.join(path, "meta.npz"))
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Opens a saved index (rows memory-mapped), or returns None if there is none."""
+        try:
+            with np.load(os.path.join(path, "meta.npz")) as meta:
+                labels, norms, files = meta["labels"], meta["norms"], meta["files"]
+                roots_file, dim = str(meta["roots_file"]), int(meta["dim"])
+            roots = np.memmap(os.path.join(path, roots_file), dtype=np.float32, mode="r",
+                              shape=(len(labels), dim))
+        except (OSError, ValueError, KeyError):
+            return None
+        index = cls(roots, labels, files.tolist(), norms)
+        index.roots_file = roots_file
+        return index
+
+def index_files(index, files):
+    """
+    Adds the faces of some store files to a saved index (a new one when
+    index is None), at most MAX_FACES_PER_USER per user.
+
+    Reads FILES_PER_BATCH files at a time and writes their rows right
+    away, so neither the crops nor the index are ever all in memory.
+    Returns None if there were no faces.
+    """
+    counts = {}
+    covered = []
+    if index is not None:
+        users, sizes = np.unique(index.labels, return_counts=True)
+        counts = {int(user_id): int(size) for user_id, size in zip(users, sizes)}
+        covered = list(index.files)
+
+    for start in range(0, len(files), FILES_PER_BATCH):
+        batch = files[start:start + FILES_PER_BATCH]
+        faces, labels = load_faces(batch)
+        keep = cap_per_user(labels, counts=counts)
+        for user_id in labels[keep]:
+            counts[int(user_id)] = counts.get(int(user_id), 0) + 1
+        covered += batch
+
+        if index is not None:
+            index.append(faces[keep], labels[keep], covered)
+        elif len(keep) > 0:
+            index = FaceIndex.from_faces(faces[keep], labels[keep], covered)
+            index.save()
+    return index
+
+def build_index():
+    """Builds (and saves) the index from the crop store."""
+    # First run after upgrading: bring the old dataset/ JPEGs into the store
+    if not dataset_imported():
+        import_dataset()
+    return index_files(None, store_files())
+
+def load_or_build_index():
+    """
+    The saved index, brought up to date with the crop store.
+
+    Store files added since the index was saved (enrollments from any
+    script) are added to it. If one was removed (e.g. a deleted user),
+    the index is rebuilt from scratch. None if the store is empty.
+    """
+    index = FaceIndex.load()
+    files = store_files()
+    if index is None or len(index) == 0 or not dataset_imported() or not set(index.files) <= set(files):
+        return build_index()
+
+    indexed = set(index.files)
+    new_files = [name for name in files if name not in indexed]
+    if new_files:
+        index_files(index, new_files)
+    return index
+
+# ==========================================
+# BENCHMARK
+# ==========================================
+def make_users(num_users, faces_per_user, seed=0):
+    """
+    Synthetic users for the benchmark: every user is a real face from
+    the crop store with its own random shift, zoom and brightness, and
+    each of their shots moves by up to a pixel and gets fresh sensor noise
+    and the camera's slight blur (this lands at LBPH confidences around
+    30, like real shots of one person).
+
+    Returns None when there is no face to start from.
+    """
+    if not dataset_imported():
+        import_dataset()
+    base_faces, _ = load_faces()
+    if len(base_faces) == 0:
+        return None
+    rng = np.random.default_rng(seed)
+    height, width = base_faces.shape[1:]
+
+    def augment(face, shift, zoom, gain, noise):
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), 0, zoom)
+        matrix[:, 2] += shift
+        moved = cv2.warpAffine(face, matrix, (width, height), borderMode=cv2.BORDER_REFLECT)
+        noisy = moved * gain + rng.normal(0, noise, moved.shape)
+        return cv2.GaussianBlur(np.clip(noisy, 0, 255).astype(np.uint8), (3, 3), 0)
+
+    def shot(user):
+        face, shift, zoom, gain = user
+        return augment(face, shift + rng.integers(-1, 2, 2), zoom, gain, 3)
+
+    faces = np.empty((num_users * faces_per_user, height, width), np.uint8)
+    labels = np.repeat(np.arange(1, num_users + 1, dtype=np.int32), faces_per_user)
+    users = []
+    for user_id in range(1, num_users + 1):
+        user = (base_faces[rng.integers(len(base_faces))], rng.uniform(-8, 8, 2),
+                rng.uniform(0.85, 1.15), rng.uniform(0.7, 1.3))
+        users.append(user)
+        for i in range((user_id - 1) * faces_per_user, user_id * faces_per_user):
+            faces[i] = shot(user)
+    return faces, labels, users, shot
+
+def benchmark(num_users=1_000, faces_per_user=TARGET_FACES, num_queries=40):
+    """
+    Compares LBPH predict() on every stored face with the index (at most
+    MAX_FACES_PER_USER faces per user; exact and with centroids).
+
+    Half the queries are new shots of enrolled users, half are shots of
+    people who never enrolled. LBPH holds a 64 KB histogram per face, so
+    num_users * faces_per_user is limited by RAM (1,000 x 30 needs ~2 GB).
+    """
+    strangers = num_queries // 2
+    print(f"Building {num_users} synthetic users x {faces_per_user} faces...")
+    made = make_users(num_users, faces_per_user)
+    if made is None:
+        print("[ERROR] No faces to start from: add dataset/ JPEGs or register a user first.")
+        return
+    faces, labels, users, shot = made
+
+    # Queries: even = enrolled users (new shots), odd = people who never enrolled
+    rng = np.random.default_rng(1)
+    queries, expected = [], []
+    for i in range(num_queries):
+        if i % 2 == 0:
+            user_id = int(rng.integers(1, num_users + 1))
+            queries.append(shot(users[user_id - 1]))
+            expected.append(user_id)
+        else:
+            # Every synthetic user is one of the few real dataset/ faces,
+            # so a stranger has to be something else entirely
+            stranger = rng.integers(0, 255, faces.shape[1:], dtype=np.uint8)
+            queries.append(cv2.GaussianBlur(stranger, (9, 9), 3))
+            expected.append(None)
+
+    start = time.time()
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(list(faces), labels)
+    print(f"LBPH train: {time.time() - start:.1f}s")
+
+    start = time.time()
+    keep = cap_per_user(labels)
+    index = FaceIndex.from_faces(faces[keep], labels[keep])
+    print(f"Index build: {time.time() - start:.1f}s "
+          f"({len(index)} rows, {index.roots.nbytes / 1e6:.0f} MB float32)")
+    del faces
+
+    def decision(label, confidence):
+        return int(label) if confidence < CONFIDENCE_THRESHOLD else None
+
+    def score(answers):
+        """(% same answer as LBPH, % right person / stranger rejected)"""
+        same = np.mean([a == b for a, b in zip(answers, lbph)]) * 100
+        right = np.mean([a == b for a, b in zip(answers, expected)]) * 100
+        return same, right
+
+    start = time.time()
+    lbph = [decision(*recognizer.predict(query)) for query in queries]
+    lbph_ms = (time.time() - start) / num_queries * 1000
+
+    results = {}
+    for name, kwargs in (("index", {}), ("index + centroids", {"use_centroids": True})):
+        index.predict(queries[0], **kwargs)  # Warm-up (centroids are built once)
+        start = time.time()
+        answers = [decision(*index.predict(query, **kwargs)) for query in queries]
+        single_ms = (time.time() - start) / num_queries * 1000
+
+        start = time.time()
+        batch_answers = [decision(*answer) for answer in zip(*index.predict_batch(queries, **kwargs))]
+        batch_ms = (time.time() - start) / num_queries * 1000
+
+        results[name] = (single_ms, batch_ms, *score(answers), score(batch_answers)[0])
+
+    genuine = num_queries - strangers
+    print()
+    print(f"{num_users} users, {len(labels)} stored faces, {num_queries} queries: LBPH accepted "
+          f"{sum(a is not None for a in lbph[::2])}/{genuine} enrolled, "
+          f"{sum(a is not None for a in lbph[1::2])}/{strangers} strangers")
+    print(f"{'Method':<20}{'ms/face':>10}{'batched':>10}{'same answer':>14}{'correct':>10}{'batch same':>12}")
+    print(f"{'LBPH predict':<20}{lbph_ms:>10.1f}{'-':>10}{'100.0%':>14}{score(lbph)[1]:>9.1f}%{'-':>12}")
+    for name, (single_ms, batch_ms, same, right, batch_same) in results.items():
+        print(f"{name:<20}{single_ms:>10.1f}{batch_ms:>10.1f}{same:>13.1f}%{right:>9.1f}%{batch_same:>11.1f}%")
+
+# ==========================================
+# OFFLINE COMMANDS
+# ==========================================
+if __name__ == "__main__":
+    # python face_index.py build                  -> build the index from the crop store
+    # python face_index.py benchmark [users] [faces per user]
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if command == "build":
+        start = time.time()
+        index = build_index()
+        if index is None:
+            print("[ERROR] No faces in the store. Register a user (or add dataset/ JPEGs) first.")
+        else:
+            print(f"[SUCCESS] Indexed {len(index)} faces in {time.time() - start:.1f}s")
+    elif command == "benchmark":
+        num_users = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+        faces_per_user = int(sys.argv[3]) if len(sys.argv) > 3 else TARGET_FACES
+        benchmark(num_users, faces_per_user)
+    else:
+        print("Usage: python face_index.py [build | benchmark [users] [faces per user]]")
@@ -0,0 +1,168 @@
+import cv2
+import numpy as np
+import os
+import sys
+import time
+import glob
+
+# --- CONFIGURATION ---
+DATA_PATH = "dataset"          # Old format: one JPEG per face (User.ID.Count.jpg)
+STORE_PATH = "face_store"      # New format: one .npz of face crops per enrollment
+IMPORTED_MARKER = os.path.join(STORE_PATH, "dataset_imported")  # Written once dataset/ is in the store
+TRAINER_FILE = "trainer.yml"
+FACE_SIZE = (100, 100)         # Every stored crop (and every face we predict on) has this size
+
+# ==========================================
+# PREPROCESSING
+# ==========================================
+def preprocess_face(gray_face):
+    """
+    Resizes a grayscale face crop to FACE_SIZE.
+
+    Use this both when storing faces and before recognizer.predict(),
+    so training and recognition see faces the same way.
+    """
+    return cv2.resize(gray_face, FACE_SIZE, interpolation=cv2.INTER_AREA)
+
+# ==========================================
+# THE CROP STORE
+# ==========================================
+def save_faces(user_id, faces):
+    """
+    Saves one enrollment's face crops as a single compressed array file.
+
+    The file is written under a temporary name and then renamed, so a
+    crash never leaves a half-written file in the store.
+    """
+    os.makedirs(STORE_PATH, exist_ok=True)
+    faces = np.asarray(faces, dtype=np.uint8)
+    labels = np.full(len(faces), user_id, dtype=np.int32)
+
+    path = os.path.join(STORE_PATH, f"User.{user_id}.{time.time_ns()}.npz")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, faces=faces, labels=labels)
+    os.replace(tmp_path, path)
+    return path
+
+def store_files():
+    """Names of the enrollment files in the store, sorted."""
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(STORE_PATH, "*.npz")))
+
+def load_faces(files=None):
+    """
+    Loads every stored crop (or only the crops of the given store files).
+
+    Returns:
+        faces: (N, height, width) uint8 array
+        labels: (N,) int32 array of user IDs
+    """
+    if files is None:
+        files = store_files()
+
+    faces, labels = [], []
+    for name in files:
+        with np.load(os.path.join(STORE_PATH, name)) as data:
+            faces.append(data["faces"])
+            labels.append(data["labels"])
+
+    if not faces:
+        return np.empty((0, FACE_SIZE[1], FACE_SIZE[0]), np.uint8), np.empty(0, np.int32)
+    return np.concatenate(faces), np.concatenate(labels)
+
+def dataset_imported():
+    """True once import_dataset() has run (users enrolled before it don't count)."""
+    return os.path.exists(IMPORTED_MARKER)
+
+def import_dataset():
+    """
+    One-time migration: copies the old dataset/ JPEGs into the store.
+
+    Those JPEGs are already face crops, so they are only resized
+    (no face detection is run on them again). The old trainer.yml was
+    trained on the unresized crops, so it is deleted: retrain() trains
+    a new one on the store.
+    """
+    if dataset_imported():
+        print(f"[SKIP] {DATA_PATH}/ was already imported into {STORE_PATH}/.")
+        return 0
+
+    by_user = {}
+    for image_path in glob.glob(os.path.join(DATA_PATH, "*.jpg")):
+        # Parse ID from filename: User.ID.Count.jpg
+        user_id = int(os.path.split(image_path)[-1].split(".")[1])
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is not None:
+            by_user.setdefault(user_id, []).append(preprocess_face(gray))
+
+    for user_id, faces in sorted(by_user.items()):
+        save_faces(user_id, faces)
+        print(f"[IMPORT] User {user_id}: {len(faces)} faces")
+
+    # Its histograms come from other face sizes: it can't match the store
+    if os.path.exists(TRAINER_FILE):
+        os.remove(TRAINER_FILE)
+        print(f"[IMPORT] Removed the old {TRAINER_FILE}; run 'python face_store.py retrain' for a new one.")
+
+    # Marker last: if we crash before it, the import simply runs again
+    os.makedirs(STORE_PATH, exist_ok=True)
+    open(IMPORTED_MARKER, "w").close()
+    return sum(len(faces) for faces in by_user.values())
+
+# ==========================================
+# THE TRAINER FILE
+# ==========================================
+def write_model(recognizer):
+    """Writes the model to a temporary file, then swaps it in atomically."""
+    # Keep the .yml extension so OpenCV picks the same file format
+    tmp_file = TRAINER_FILE.replace(".yml", ".tmp.yml")
+    recognizer.write(tmp_file)
+    os.replace(tmp_file, TRAINER_FILE)
+
+def enroll(user_id, faces):
+    """
+    Adds a new user's faces to the crop store (one new file).
+
+    The model is not touched: trainer.yml holds every user's histograms,
+    so even recognizer.update() reads and rewrites all of them. Login
+    uses the face index, which picks up the new file by itself; the
+    trainer.yml scripts need the offline retrain command.
+    The first enrollment after upgrading imports dataset/ first.
+    """
+    if not dataset_imported():
+        import_dataset()
+    return save_faces(user_id, [preprocess_face(face) for face in faces])
+
+def retrain():
+    """Full retrain from the crop store (the offline command)."""
+    if not dataset_imported():
+        import_dataset()
+
+    faces, labels = load_faces()
+    if len(faces) == 0:
+        print("[ERROR] No faces in the store. Register a user (or run 'import') first.")
+        return None
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(list(faces), labels)
+    write_model(recognizer)
+    print(f"[SUCCESS] Model retrained on {len(faces)} faces of {len(np.unique(labels))} users.")
+    return recognizer
+
+# ==========================================
+# OFFLINE COMMANDS
+# ==========================================
+if __name__ == "__main__":
+    # python face_store.py import    -> copy dataset/ JPEGs into the store (and retrain)
+    # python face_store.py retrain   -> full retrain from the store
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if command == "import":
+        print(f"Imported {import_dataset()} faces into {STORE_PATH}/")
+        retrain()
+    elif command == "retrain":
+        start = time.time()
+        retrain()
+        print(f"Took {time.time() - start:.1f}s")
+    else:
+        print("Usage: python face_store.py [import | retrain]")
@@ -0,0 +1,219 @@
+import cv2
+import sys
+import time
+
+# --- CONFIGURATION ---
+CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+DETECT_WIDTH = 320       # Haar runs on the frame shrunk to this width
+DETECT_EVERY = 5         # While faces are tracked, detect again every N frames
+TRACK_MIN_SCORE = 0.6    # Template match score below this = track lost (detect right away)
+SEARCH_MARGIN = 0.5      # How far a face may move between frames (in face sizes)
+MATCH_IOU = 0.3          # A detection overlapping a track this much refreshes it (same ID)
+CAMERA_FPS = 30          # Used to turn CPU time per frame into CPU load
+
+# ==========================================
+# TRACKS
+# ==========================================
+class Track:
+    """
+    One face followed from frame to frame.
+
+    box is (x, y, w, h) in full-frame pixels. fresh is True on the frame
+    the track was detected (new) or re-detected (refreshed): only then does
+    the caller need to run face recognition and set label / confidence.
+    """
+    def __init__(self, track_id, small_box, scale, template):
+        self.id = track_id
+        self.small_box = small_box
+        self.scale = scale
+        self.template = template
+        self.score = 1.0
+        self.fresh = True
+        self.label = None
+        self.confidence = None
+
+    @property
+    def box(self):
+        x, y, w, h = self.small_box
+        return tuple(int(round(v / self.scale)) for v in (x, y, w, h))
+
+def iou(box_a, box_b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = inter_w * inter_h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+# ==========================================
+# DETECT-THEN-TRACK
+# ==========================================
+class FaceTracker:
+    """
+    Finds faces with Haar only every few frames and follows them in between.
+
+    Haar runs on a downscaled copy of the frame:
+      - when there is nothing to track,
+      - every DETECT_EVERY frames,
+      - or as soon as a track's template match score drops.
+    In between, each face is found again by template matching in a small
+    window around its last position, which is far cheaper than Haar.
+    """
+    def __init__(self, scale_factor=1.2, min_neighbors=5, min_size=(30, 30),
+                 detect_width=DETECT_WIDTH, detect_every=DETECT_EVERY):
+        self.cascade = cv2.CascadeClassifier(CASCADE_PATH)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.detect_width = detect_width
+        self.detect_every = detect_every
+
+        self.tracks = []
+        self.next_id = 1
+        self.frames_since_detection = 0
+        self.detections = 0
+        self._small = None
+
+    def update(self, gray):
+        """
+        Follows the faces into a new grayscale frame.
+
+        Returns the list of Track objects (check track.fresh to know which
+        ones need recognition on this frame).
+        """
+        scale = min(1.0, self.detect_width / gray.shape[1])
+        if scale < 1.0:
+            size = (self.detect_width, int(round(gray.shape[0] * scale)))
+            self._small = cv2.resize(gray, size, dst=self._small, interpolation=cv2.INTER_AREA)
+            small = self._small
+        else:
+            small = gray
+
+        for track in self.tracks:
+            track.fresh = False
+        self.frames_since_detection += 1
+
+        if (not self.tracks
+                or self.frames_since_detection >= self.detect_every
+                or not self._follow(small)):
+            self._detect(small, scale)
+        return self.tracks
+
+    def _follow(self, small):
+        """Moves every track by template matching. False if one was lost."""
+        height, width = small.shape
+        for track in self.tracks:
+            x, y, w, h = track.small_box
+            margin_x, margin_y = int(w * SEARCH_MARGIN), int(h * SEARCH_MARGIN)
+            left, top = max(0, x - margin_x), max(0, y - margin_y)
+            right, bottom = min(width, x + w + margin_x), min(height, y + h + margin_y)
+            if right - left < w or bottom - top < h:
+                return False
+
+            scores = cv2.matchTemplate(small[top:bottom, left:right], track.template, cv2.TM_CCOEFF_NORMED)
+            _, best_score, _, (best_x, best_y) = cv2.minMaxLoc(scores)
+            track.score = best_score
+            if best_score < TRACK_MIN_SCORE:
+                return False
+            track.small_box = (left + best_x, top + best_y, w, h)
+        return True
+
+    def _detect(self, small, scale):
+        """Runs Haar on the small frame; keeps the IDs (and labels) of faces seen before."""
+        min_size = tuple(max(1, int(v * scale)) for v in self.min_size)
+        rects = self.cascade.detectMultiScale(small, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors, minSize=min_size)
+        self.detections += 1
+        self.frames_since_detection = 0
+
+        old_tracks = list(self.tracks)
+        self.tracks = []
+        for rect in rects:
+            rect = tuple(int(v) for v in rect)
+            x, y, w, h = rect
+            template = small[y:y+h, x:x+w].copy()
+
+            best = max(old_tracks, key=lambda t: iou(t.small_box, rect), default=None)
+            if best is not None and iou(best.small_box, rect) >= MATCH_IOU:
+                # Same face: refresh its box and template, keep ID and label
+                old_tracks.remove(best)
+                track = best
+                track.small_box, track.scale, track.template = rect, scale, template
+                track.score, track.fresh = 1.0, True
+            else:
+                track = Track(self.next_id, rect, scale, template)
+                self.next_id += 1
+            self.tracks.append(track)
+
+# ==========================================
+# BENCHMARK: EVERY-FRAME HAAR vs DETECT-THEN-TRACK
+# ==========================================
+def run_loop(video_path, use_tracker, recognize=None, max_frames=0):
+    """
+    Runs one login-style loop over a video without a window.
+
+    Returns (frames, wall seconds, CPU seconds, detections, recognitions).
+    """
+    cap = cv2.VideoCapture(video_path)
+    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    tracker = FaceTracker()
+    frames = detections = recognitions = 0
+
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    while not max_frames or frames < max_frames:
+        ret, frame = cap.read()
+        if not ret: break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if use_tracker:
+            boxes = [track.box for track in tracker.update(gray) if track.fresh]
+        else:
+            boxes = face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5)
+            detections += 1
+
+        if recognize is not None and len(boxes) > 0:
+            recognize([gray[y:y+h, x:x+w] for (x, y, w, h) in boxes])
+            recognitions += len(boxes)
+        frames += 1
+    wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+    cap.release()
+
+    if use_tracker:
+        detections = tracker.detections
+    return frames, wall, cpu, detections, recognitions
+
+def benchmark(video_path, max_frames=0):
+    """Prints FPS and CPU load of the old loop and the tracked loop."""
+    from face_index import load_or_build_index
+    from face_store import preprocess_face
+
+    index = load_or_build_index()
+    if index is None:
+        print("[INFO] No face index (register a user first): timing detection only.")
+        recognize = None
+    else:
+        recognize = lambda crops: index.predict_batch([preprocess_face(crop) for crop in crops])
+
+    print(f"{'loop':<14}{'frames':>7}{'FPS':>8}{'CPU ms/frame':>14}"
+          f"{f'CPU @{CAMERA_FPS}fps':>13}{'detections':>12}{'recognitions':>14}")
+    for name, use_tracker in (("every frame", False), ("detect+track", True)):
+        frames, wall, cpu, detections, recognitions = run_loop(video_path, use_tracker, recognize, max_frames)
+        if frames == 0:
+            print(f"[ERROR] Could not read frames from {video_path}")
+            return
+        cpu_ms = cpu / frames * 1000
+        # Share of one CPU core the loop needs to keep up with the camera
+        load = cpu_ms * CAMERA_FPS / 10
+        print(f"{name:<14}{frames:>7}{frames / wall:>8.1f}{cpu_ms:>14.1f}"
+              f"{load:>12.0f}%{detections:>12}{recognitions:>14}")
+
+if __name__ == "__main__":
+    # python face_tracker.py benchmark video.mp4 [max_frames]
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if command == "benchmark" and len(sys.argv) > 2:
+        benchmark(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 0)
+    else:
+        print("Usage: python face_tracker.py benchmark video.mp4 [max_frames]")
@@ -1,12 +1,14 @@
 import cv2
-import numpy as np
 import os
 import webbrowser
 import json
+from face_store import STORE_PATH, enroll, preprocess_face
+from face_index import CONFIDENCE_THRESHOLD, load_or_build_index
+from face_tracker import FaceTracker
+from face_enrollment import EnrollmentSession
 
 # --- CONFIGURATION ---
 DATA_PATH = "dataset"
-TRAINER_FILE = "trainer.yml"
 NAMES_FILE = "names.json"  # <--- NEW: Stores ID -> Name mapping
 CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
 
@@ -44,6 +46,12 @@ def get_next_id():
 # ==========================================
 # MODULE 1: REGISTER NEW USER
 # ==========================================
+def save_enrollment(user_id, faces):
+    """Stores the new faces and adds them to the login index."""
+    enroll(user_id, faces)
+    # Writes only the new user's rows (and picks up anything else that changed)
+    load_or_build_index()
+
 def register_user():
     print("\n--- REGISTRATION PHASE ---")
     
@@ -65,7 +73,9 @@ def register_user():
     cap = cv2.VideoCapture(0)
     face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
     
-    count = 0
+    # A background worker keeps only sharp, non-duplicate faces and
+    # saves them (and updates the model) in one go once it has 30
+    session = EnrollmentSession(user_id, save=save_enrollment)
     while True:
         ret, frame = cap.read()
         if not ret: break
@@ -75,17 +85,12 @@ def register_user():
 
         for (x, y, w, h) in faces:
             cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-            count += 1
-            
-            # Save image: User.ID.Count.jpg
-            file_name = f"{DATA_PATH}/User.{user_id}.{count}.jpg"
-            cv2.imwrite(file_name, gray[y:y+h, x:x+w])
-            
-            cv2.putText(frame, f"Captured: {count}/30", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            session.submit(gray[y:y+h, x:x+w])
 
+        cv2.putText(frame, session.status(), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
         cv2.imshow('Registration', frame)
         
-        if count >= 30:
+        if session.full.is_set():
             break
         if cv2.waitKey(10) & 0xFF == ord('q'):
             break
@@ -93,47 +98,25 @@ def register_user():
     cap.release()
     cv2.destroyAllWindows()
     
-    print("Photos saved. Training model...")
-    train_model()
-    return True # Success
-
-# ==========================================
-# MODULE 2: TRAIN MODEL
-# ==========================================
-def train_model():
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    detector = cv2.CascadeClassifier(CASCADE_PATH)
-
-    image_paths = [os.path.join(DATA_PATH, f) for f in os.listdir(DATA_PATH) if f.endswith(".jpg")]
-    
-    if len(image_paths) == 0:
-        print("[ERROR] No data found. Register a user first.")
-        return
-
-    face_samples = []
-    ids = []
-    
-    for image_path in image_paths:
-        PIL_img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-        img_numpy = np.array(PIL_img, 'uint8')
-        
-        # Parse ID from filename
-        id = int(os.path.split(image_path)[-1].split(".")[1])
-        
-        faces = detector.detectMultiScale(img_numpy)
-        for (x, y, w, h) in faces:
-            face_samples.append(img_numpy[y:y+h, x:x+w])
-            ids.append(id)
+    print("Photos captured. Saving...")
+    captured_faces = session.close()
+    if not captured_faces:
+        print("No faces captured.")
+        return False
 
-    recognizer.train(face_samples, np.array(ids))
-    recognizer.write(TRAINER_FILE)
-    print(f"[SUCCESS] Model trained! Saved to {TRAINER_FILE}")
+    print(f"[SUCCESS] {len(captured_faces)} faces added "
+          f"({session.rejected_blurry} blurry, {session.rejected_duplicate} duplicates skipped). "
+          f"Saved to {STORE_PATH}/")
+    return True # Success
 
 # ==========================================
-# MODULE 3: LOGIN (BIOMETRIC AUTH)
+# MODULE 2: LOGIN (BIOMETRIC AUTH)
 # ==========================================
 def login():
-    if not os.path.exists(TRAINER_FILE):
+    # Nearest-neighbour index over the LBPH histograms: same answers as
+    # recognizer.predict(), without scanning every stored face per frame
+    index = load_or_build_index()
+    if index is None:
         print("[ERROR] Model not found. Please Register first.")
         return False
 
@@ -142,37 +125,55 @@ def login():
 
     print("\n--- SECURE LOGIN ---")
     
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(TRAINER_FILE)
-    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    # Haar on a small frame every few frames; faces are tracked in between
+    tracker = FaceTracker(scale_factor=1.2, min_neighbors=5)
     
     cap = cv2.VideoCapture(0)
     
+    # Counts identifications (new or re-detected faces), not frames:
+    # a tracked face only repeats its last identification
     consecutive_matches = 0
     REQUIRED_MATCHES = 15
     auth_success = False
     detected_name = "Unknown"
+    matched_label = None
     
     while True:
         ret, frame = cap.read()
         if not ret: break
         
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.2, 5)
-
-        for(x, y, w, h) in faces:
+        tracks = tracker.update(gray)
+
+        # Identify only new or re-detected faces (in one batch);
+        # a tracked face keeps the result of its last identification
+        fresh = [track for track in tracks if track.fresh]
+        if fresh:
+            ids, confidences = index.predict_batch(
+                [preprocess_face(gray[y:y+h, x:x+w]) for (x, y, w, h) in (t.box for t in fresh)]
+            )
+            for track, id_num, confidence in zip(fresh, ids, confidences):
+                track.label, track.confidence = int(id_num), confidence
+
+        for track in tracks:
+            x, y, w, h = track.box
             cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-            id_num, confidence = recognizer.predict(gray[y:y+h, x:x+w])
 
-            if confidence < 55:
-                consecutive_matches += 1
+            if track.confidence < CONFIDENCE_THRESHOLD:
+                if track.fresh:
+                    # A different person starts the count again
+                    if track.label != matched_label:
+                        consecutive_matches = 0
+                        matched_label = track.label
+                    consecutive_matches += 1
                 # Lookup the name from our dictionary
-                detected_name = names.get(id_num, "Unknown")
+                detected_name = names.get(track.label, "Unknown")
                 
                 color = (0, 255, 0)
                 msg = f"{detected_name}: {consecutive_matches}/{REQUIRED_MATCHES}"
             else:
-                consecutive_matches = 0
+                if track.fresh:
+                    consecutive_matches = 0
                 color = (0, 0, 255)
                 msg = "Unknown"
 
@@ -184,7 +185,8 @@ def login():
             auth_success = True
             break
             
-        if cv2.waitKey(10) & 0xFF == ord('q'):
+        # 1 ms is enough for the window to refresh; cap.read() sets the pace
+        if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
     cap.release()
@@ -198,7 +200,7 @@ def login():
         return False # Failed
 
 # ==========================================
-# MODULE 4: THE REACT BRIDGE
+# MODULE 3: THE REACT BRIDGE
 # ==========================================
 def launch_dashboard(user_name):
     """
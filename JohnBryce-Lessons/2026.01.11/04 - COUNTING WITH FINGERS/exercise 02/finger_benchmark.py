@@ -0,0 +1,180 @@
+"""
+Headless Finger Counter Benchmark
+=================================
+
+Pushes a recorded clip through the full finger counting pipeline (mirror,
+color conversion, MediaPipe hand detection, count_raised_fingers) as fast
+as possible, with no camera and no display - suitable for CI.
+
+Reports as JSON:
+    - Overall FPS
+    - Per-stage latency (mean, p50, p90, p99, max) for read, prepare,
+      inference and count
+    - The finger count for every frame (for regression checks)
+
+How to run:
+    python finger_benchmark.py clip.mp4
+    python finger_benchmark.py frames_dir/ --max-frames 500 --output result.json
+    python finger_benchmark.py clip.mp4 --inference-width 0     # full resolution
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from finger_counter import count_fingers, initialize_hand_detector
+from frame_source import open_frame_source
+from hand_inference import INFERENCE_WIDTH, HandInference
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Pipeline stages, in order
+STAGES = ("read", "prepare", "inference", "count")
+
+PERCENTILES = (50, 90, 99)
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Mean, percentiles and max of one stage's latencies, in milliseconds."""
+    if not samples_ms:
+        return {}
+    samples = np.asarray(samples_ms)
+    summary = {"mean_ms": round(float(samples.mean()), 3)}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}_ms"] = round(float(np.percentile(samples, percentile)), 3)
+    summary["max_ms"] = round(float(samples.max()), 3)
+    return summary
+
+
+def run_benchmark(
+    source,
+    max_frames: int = 0,
+    inference_width=INFERENCE_WIDTH,
+    use_roi: bool = False,
+    mirror_mode: bool = True
+) -> dict:
+    """
+    Run every frame of a recording through the pipeline.
+
+    Args:
+        source: Video file, image directory (or webcam index)
+        max_frames: Stop after this many frames (0 = whole clip)
+        inference_width: Width given to MediaPipe (None = full resolution)
+        use_roi: Crop around the last hand (see hand_inference.py)
+        mirror_mode: Mirror frames like the apps do by default
+
+    Returns:
+        Report dictionary (JSON-serializable)
+
+    Raises:
+        RuntimeError: If the source cannot be opened
+    """
+    capture = open_frame_source(source, realtime=False)
+    if not capture.isOpened():
+        raise RuntimeError(f"Could not open frame source {source}")
+
+    hands = initialize_hand_detector()[0]
+    inference = HandInference(hands, inference_width=inference_width, use_roi=use_roi)
+
+    latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    counts: List[int] = []
+    resolution = None
+    rgb_frame = None
+
+    started = time.perf_counter()
+    try:
+        while not max_frames or len(counts) < max_frames:
+            stage_started = time.perf_counter()
+            success, frame = capture.read()
+            if not success:
+                break
+            read_done = time.perf_counter()
+
+            if mirror_mode:
+                frame = cv2.flip(frame, 1)
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+            rgb_frame.flags.writeable = False
+            prepare_done = time.perf_counter()
+
+            results = inference.process(rgb_frame)
+            rgb_frame.flags.writeable = True
+            inference_done = time.perf_counter()
+
+            counts.append(count_fingers(results, mirror_mode))
+            count_done = time.perf_counter()
+
+            latencies["read"].append((read_done - stage_started) * 1000)
+            latencies["prepare"].append((prepare_done - read_done) * 1000)
+            latencies["inference"].append((inference_done - prepare_done) * 1000)
+            latencies["count"].append((count_done - inference_done) * 1000)
+
+            if resolution is None:
+                resolution = f"{frame.shape[1]}x{frame.shape[0]}"
+    finally:
+        elapsed = time.perf_counter() - started
+        capture.release()
+        hands.close()
+
+    return {
+        "source": str(source),
+        "resolution": resolution,
+        "inference_width": inference_width,
+        "roi": use_roi,
+        "mirror": mirror_mode,
+        "frames": len(counts),
+        "seconds": round(elapsed, 3),
+        "fps": round(len(counts) / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {stage: summarize(samples) for stage, samples in latencies.items()},
+        "hand_frames": sum(1 for count in counts if count > 0),
+        "counts": counts,
+    }
+
+
+def main():
+    """Parse arguments, run the benchmark and print (or save) the JSON report."""
+    parser = argparse.ArgumentParser(description="Headless finger counter benchmark")
+    parser.add_argument("source", help="video file or image directory (or a webcam index)")
+    parser.add_argument("--max-frames", type=int, default=0,
+                        help="stop after this many frames (default: whole clip)")
+    parser.add_argument("--inference-width", type=int, default=INFERENCE_WIDTH,
+                        help=f"width given to MediaPipe, 0 for full resolution (default: {INFERENCE_WIDTH})")
+    parser.add_argument("--roi", action="store_true", help="crop around the last detected hand")
+    parser.add_argument("--no-mirror", action="store_true", help="do not mirror frames")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmark(
+            args.source,
+            max_frames=args.max_frames,
+            inference_width=args.inference_width or None,
+            use_roi=args.roi,
+            mirror_mode=not args.no_mirror
+        )
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report_json + "\n")
+        print(f"{report['frames']} frames at {report['fps']} FPS -> {args.output}")
+    else:
+        print(report_json)
+
+
+if __name__ == "__main__":
+    main()
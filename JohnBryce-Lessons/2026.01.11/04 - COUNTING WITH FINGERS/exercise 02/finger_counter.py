@@ -8,17 +8,27 @@ Requirements:
     pip install opencv-python mediapipe
 
 How to run:
-    python finger_counter.py
+    python finger_counter.py                  # webcam 0
+    python finger_counter.py clip.mp4         # replay a video file
+    python finger_counter.py frames_dir/      # replay an image directory
+
+Headless benchmark (no camera or display needed):
+    python finger_benchmark.py clip.mp4
 
 Controls:
     - Press 'q' to quit the application
     - Press 'm' to toggle mirror mode (default: on)
 """
 
+import sys
+
 import cv2
 import mediapipe as mp
 from typing import Optional
 
+from frame_source import is_camera, open_frame_source
+from hand_inference import HandInference
+
 
 # MediaPipe Hand Landmark indices
 # Each finger has 4 landmarks: MCP (base), PIP, DIP, and TIP
@@ -176,6 +186,30 @@ def count_raised_fingers(hand_landmarks, handedness: str) -> int:
     return finger_count
 
 
+def count_fingers(results, mirror_mode: bool) -> int:
+    """
+    Finger count for one frame, exactly as the apps compute it.
+
+    Args:
+        results: MediaPipe hands results
+        mirror_mode: Whether the frame was mirrored (inverts handedness)
+
+    Returns:
+        Raised fingers on the last detected hand, 0 when no hand
+    """
+    finger_count = 0
+    if results.multi_hand_landmarks and results.multi_handedness:
+        for hand_landmarks, handedness_info in zip(
+            results.multi_hand_landmarks,
+            results.multi_handedness
+        ):
+            handedness = handedness_info.classification[0].label
+            if mirror_mode:
+                handedness = "Left" if handedness == "Right" else "Right"
+            finger_count = count_raised_fingers(hand_landmarks, handedness)
+    return finger_count
+
+
 def draw_finger_count(frame, count: int, position: tuple = (50, 100)) -> None:
     """
     Draw the finger count on the frame with a background for visibility.
@@ -269,20 +303,20 @@ def draw_instructions(frame, mirror_mode: bool) -> None:
 
 def main():
     """Main function to run the finger counting application."""
-    # Initialize webcam
-    cap = cv2.VideoCapture(0)
+    # Initialize webcam (1280x720), or a recording given on the command line
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    cap = open_frame_source(source)
 
     if not cap.isOpened():
-        print("Error: Could not open webcam")
+        print(f"Error: Could not open frame source {source}")
         return
 
-    # Set camera resolution (optional, may improve performance)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-
     # Initialize hand detector
     hands, mp_drawing, mp_drawing_styles, mp_hands = initialize_hand_detector()
 
+    # Runs the detector on a reduced-resolution copy of each frame
+    inference = HandInference(hands)
+
     # Mirror mode makes the display more intuitive (like looking in a mirror)
     mirror_mode = True
 
@@ -296,7 +330,7 @@ def main():
         success, frame = cap.read()
 
         if not success:
-            print("Error: Failed to read from webcam")
+            print("Error: Failed to read from webcam" if is_camera(source) else "End of recording")
             break
 
         # Mirror the frame if mirror mode is enabled
@@ -306,10 +340,11 @@ def main():
         # Convert BGR (OpenCV) to RGB (MediaPipe)
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-        # Process the frame for hand detection
+        # Process the frame for hand detection (landmarks come back
+        # normalized to the full frame, so drawing is unchanged)
         # Mark frame as not writeable to improve performance
         rgb_frame.flags.writeable = False
-        results = hands.process(rgb_frame)
+        results = inference.process(rgb_frame)
         rgb_frame.flags.writeable = True
 
         # Default finger count when no hand is detected
@@ -360,6 +395,7 @@ def main():
             break
         elif key == ord('m'):
             mirror_mode = not mirror_mode
+            inference.reset()
             print(f"Mirror mode: {'ON' if mirror_mode else 'OFF'}")
 
     # Cleanup
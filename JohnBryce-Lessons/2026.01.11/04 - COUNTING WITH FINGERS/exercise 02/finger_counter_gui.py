@@ -12,11 +12,15 @@ Requirements:
     pip install -r requirements.txt
 
 How to run:
-    python finger_counter_gui.py
+    python finger_counter_gui.py                  # webcam 0
+    python finger_counter_gui.py clip.mp4         # replay a video file
+    python finger_counter_gui.py frames_dir/      # replay an image directory
 
 Architecture:
-    - CameraWorker (QThread): Handles camera capture & MediaPipe processing
-    - TTSManager: Handles text-to-speech with state tracking
+    - LatestFrameGrabber (frame_capture.py): Reads the camera on its own
+      thread, keeping only the newest frame
+    - CameraWorker (QThread): MediaPipe processing, paced to TARGET_FPS
+    - TTSManager: Speaks count changes on its own thread (never blocks the UI)
     - MainWindow (QMainWindow): UI rendering & user interaction
 
 Features:
@@ -24,11 +28,14 @@ Features:
     - Real-time finger count display (0-5)
     - Optional TTS that announces count changes
     - Mirror mode toggle (default: ON)
+    - Live FPS and per-stage timings (capture, inference, draw, convert)
     - Clean resource management on exit
 """
 
 import sys
-from typing import Optional
+import threading
+import time
+from typing import Optional, Tuple
 
 import cv2
 import mediapipe as mp
@@ -49,6 +56,10 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from frame_capture import FramePacer, LatestFrameGrabber, StageTimings, TARGET_FPS
+from frame_source import FrameSourceSpec, open_frame_source
+from hand_inference import HandInference
+
 
 # =============================================================================
 # CONSTANTS
@@ -59,6 +70,9 @@ DEFAULT_CAMERA_INDEX = 0
 FRAME_WIDTH = 1280
 FRAME_HEIGHT = 720
 
+# How often the worker reports FPS and stage timings to the UI
+STATS_INTERVAL_S = 1.0
+
 # MediaPipe detection thresholds
 DETECTION_CONFIDENCE = 0.7
 TRACKING_CONFIDENCE = 0.5
@@ -231,8 +245,14 @@ class TTSManager:
     This class encapsulates pyttsx3 and tracks the last spoken count
     to prevent repeated announcements of the same number.
 
+    Speech runs on a dedicated worker thread, so speak_count() never
+    blocks the GUI thread. Requests go into a single-slot (coalescing)
+    queue: while a number is being spoken, newer counts overwrite the
+    pending one, and only the most recent count is spoken next.
+
     Design decisions:
-        - TTS engine is initialized lazily on first speech request
+        - TTS engine is created lazily on the worker thread, on first use
+          (pyttsx3 engines must be used from the thread that created them)
         - Uses a separate state variable to track what was last spoken
         - Does NOT speak on initialization (no startup sound)
     """
@@ -242,13 +262,54 @@ class TTSManager:
         self._last_spoken_count: Optional[int] = None
         self._enabled = False
 
+        # Single-slot queue shared with the worker thread
+        self._condition = threading.Condition()
+        self._pending_count: Optional[int] = None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
     def _ensure_engine(self) -> pyttsx3.Engine:
-        """Lazily initialize the TTS engine on first use."""
+        """Lazily initialize the TTS engine on first use (worker thread only)."""
         if self._engine is None:
             self._engine = pyttsx3.init()
             self._engine.setProperty('rate', 150)  # Moderate speaking speed
         return self._engine
 
+    def _ensure_thread(self) -> None:
+        """Start the speech worker thread on first use."""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Worker loop: speak the newest pending count, one at a time."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending_count is not None or not self._running)
+                if not self._running:
+                    break
+
+                count = self._pending_count
+                self._pending_count = None
+
+                # Superseded counts may land back on the number just spoken
+                if count == self._last_spoken_count:
+                    continue
+                self._last_spoken_count = count
+
+            try:
+                engine = self._ensure_engine()
+                engine.say(str(count))
+                # Blocks only this thread while the word is spoken
+                engine.runAndWait()
+            except Exception as e:
+                print(f"Warning: Text-to-speech failed: {e}")
+
+        if self._engine is not None:
+            self._engine.stop()
+            self._engine = None
+
     @property
     def enabled(self) -> bool:
         return self._enabled
@@ -259,11 +320,16 @@ class TTSManager:
         # Reset last spoken count when disabling to ensure fresh announcement
         # when re-enabling while showing the same count
         if not value:
-            self._last_spoken_count = None
+            with self._condition:
+                self._pending_count = None
+                self._last_spoken_count = None
 
     def speak_count(self, count: int) -> None:
         """
-        Speak the finger count if enabled and count has changed.
+        Queue the finger count to be spoken if enabled and changed.
+
+        Returns immediately; a count still waiting to be spoken is
+        replaced by this one.
 
         Args:
             count: The current finger count (0-5)
@@ -271,22 +337,24 @@ class TTSManager:
         if not self._enabled:
             return
 
-        # Only speak if the count has changed from what was last spoken
-        if count == self._last_spoken_count:
-            return
+        self._ensure_thread()
+        with self._condition:
+            self._pending_count = count
+            self._condition.notify()
 
-        self._last_spoken_count = count
-        engine = self._ensure_engine()
+    def cleanup(self) -> None:
+        """Stop the speech worker and clean up TTS resources."""
+        if self._thread is None:
+            return
 
-        engine.say(str(count))
-        # runAndWait blocks briefly but is acceptable for single words
-        engine.runAndWait()
+        with self._condition:
+            self._running = False
+            self._pending_count = None
+            self._condition.notify()
 
-    def cleanup(self) -> None:
-        """Clean up TTS resources."""
-        if self._engine is not None:
-            self._engine.stop()
-            self._engine = None
+        # Waits for at most the word currently being spoken
+        self._thread.join(timeout=2.0)
+        self._thread = None
 
 
 # =============================================================================
@@ -300,9 +368,20 @@ class CameraWorker(QThread):
     This worker runs in a separate thread to prevent blocking the UI.
     It emits signals for frame updates and finger count changes.
 
+    Capture runs on a separate LatestFrameGrabber thread, so this loop
+    always processes the newest frame (stale frames are dropped), and a
+    FramePacer caps the loop at TARGET_FPS without a fixed sleep.
+
+    Frame path: each camera frame is flipped and converted to RGB once,
+    into a buffer reused every frame. Landmarks are drawn on that RGB
+    buffer, which is then scaled to the preview size here (not on the
+    GUI thread) into a new array that the emitted QImage wraps directly.
+
     Signals:
-        frame_ready (QImage): Emitted when a new frame is ready for display
+        frame_ready (QImage): Emitted when a new frame is ready for display,
+            already scaled to preview_size
         finger_count_changed (int): Emitted when a new finger count is detected
+        timings_updated (dict): FPS and per-stage timings, every STATS_INTERVAL_S
 
     Why QThread instead of threading.Thread:
         - Native Qt signal/slot mechanism for thread-safe UI updates
@@ -313,10 +392,11 @@ class CameraWorker(QThread):
     # Signals for communicating with the main thread
     frame_ready = Signal(QImage)
     finger_count_changed = Signal(int)
+    timings_updated = Signal(dict)
 
-    def __init__(self, camera_index: int = DEFAULT_CAMERA_INDEX, parent=None):
+    def __init__(self, source: FrameSourceSpec = DEFAULT_CAMERA_INDEX, parent=None):
         super().__init__(parent)
-        self._camera_index = camera_index
+        self._source = source
         self._running = False
         self._mirror_mode = True
 
@@ -325,9 +405,21 @@ class CameraWorker(QThread):
         self._mp_drawing = None
         self._mp_drawing_styles = None
         self._mp_hands = None
+        self._inference: Optional[HandInference] = None
+        self._landmark_style = None
+        self._connection_style = None
+
+        # Full-resolution RGB frame, reused every frame
+        self._rgb_buffer: Optional[np.ndarray] = None
 
-        # Camera capture object
-        self._cap: Optional[cv2.VideoCapture] = None
+        # (width, height) the preview is shown at, set by the UI thread
+        self._preview_size: Optional[Tuple[int, int]] = None
+
+        # Camera capture (read on the grabber's own thread)
+        self._grabber: Optional[LatestFrameGrabber] = None
+
+        # Rolling per-stage timings, readable from any thread
+        self._timings = StageTimings()
 
     @property
     def mirror_mode(self) -> bool:
@@ -336,6 +428,27 @@ class CameraWorker(QThread):
     @mirror_mode.setter
     def mirror_mode(self, value: bool) -> None:
         self._mirror_mode = value
+        # The hand ROI refers to the un-flipped frame: search the full frame again
+        if self._inference is not None:
+            self._inference.reset()
+
+    @property
+    def preview_size(self) -> Optional[Tuple[int, int]]:
+        return self._preview_size
+
+    @preview_size.setter
+    def preview_size(self, value: Tuple[int, int]) -> None:
+        # A single tuple assignment, safe to do from the UI thread
+        self._preview_size = value
+
+    @property
+    def stage_timings(self) -> dict:
+        """Current FPS, per-stage milliseconds and capture counters."""
+        stats = self._timings.snapshot()
+        if self._grabber is not None:
+            stats["camera_read_ms"] = round(self._grabber.camera_read_ms, 2)
+            stats["frames_dropped"] = self._grabber.frames_dropped
+        return stats
 
     def _initialize_mediapipe(self) -> None:
         """
@@ -355,34 +468,84 @@ class CameraWorker(QThread):
             min_tracking_confidence=TRACKING_CONFIDENCE
         )
 
+        # Detection runs on a reduced-resolution copy of each frame
+        self._inference = HandInference(self._hands)
+
+        # Landmarks are drawn on the RGB frame; the default styles are BGR
+        self._landmark_style = self._to_rgb_styles(
+            self._mp_drawing_styles.get_default_hand_landmarks_style()
+        )
+        self._connection_style = self._to_rgb_styles(
+            self._mp_drawing_styles.get_default_hand_connections_style()
+        )
+
+    def _to_rgb_styles(self, styles: dict) -> dict:
+        """Copy a MediaPipe style dict with colors swapped from BGR to RGB."""
+        return {
+            key: self._mp_drawing.DrawingSpec(
+                color=spec.color[::-1],
+                thickness=spec.thickness,
+                circle_radius=spec.circle_radius
+            )
+            for key, spec in styles.items()
+        }
+
     def _draw_hand_landmarks(self, frame, hand_landmarks) -> None:
-        """Draw hand landmarks and connections on the frame."""
+        """Draw hand landmarks and connections on the RGB frame."""
         self._mp_drawing.draw_landmarks(
             frame,
             hand_landmarks,
             self._mp_hands.HAND_CONNECTIONS,
-            self._mp_drawing_styles.get_default_hand_landmarks_style(),
-            self._mp_drawing_styles.get_default_hand_connections_style()
+            self._landmark_style,
+            self._connection_style
         )
 
-    def _convert_frame_to_qimage(self, frame: np.ndarray) -> QImage:
+    def _prepare_frame(self, frame: np.ndarray) -> np.ndarray:
         """
-        Convert OpenCV BGR frame to QImage for Qt display.
+        Mirror (if enabled) and convert a BGR camera frame to RGB.
 
-        OpenCV uses BGR color order, while Qt expects RGB.
+        This is the only color conversion per frame. The result is written
+        into a buffer reused every frame, so no full-resolution array is
+        allocated after the first frame.
+        """
+        if self._mirror_mode:
+            self._rgb_buffer = cv2.flip(frame, 1, dst=self._rgb_buffer)
+            source = self._rgb_buffer
+        else:
+            source = frame
+
+        # cv2 writes into dst when it has the right shape (BGR->RGB works in place)
+        self._rgb_buffer = cv2.cvtColor(source, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
+        return self._rgb_buffer
+
+    def _convert_frame_to_qimage(self, rgb_frame: np.ndarray) -> QImage:
+        """
+        Scale the RGB frame to the preview size and wrap it in a QImage.
+
+        The scaled array is new for every frame and never touched again by
+        the worker. The QImage uses its memory directly (no deep copy);
+        PySide6 keeps a reference to the array until the last copy of the
+        QImage is gone, so ownership passes to the UI with the signal.
         """
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         height, width, channels = rgb_frame.shape
-        bytes_per_line = channels * width
 
-        # Create QImage from numpy array; .copy() ensures Qt owns the data
+        if self._preview_size is None:
+            preview = rgb_frame.copy()
+        else:
+            # Fit inside the preview while keeping the aspect ratio
+            scale = min(self._preview_size[0] / width, self._preview_size[1] / height)
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            # INTER_LINEAR: INTER_AREA is several times slower at non-integer scales
+            preview = cv2.resize(rgb_frame, size, interpolation=cv2.INTER_LINEAR)
+
+        preview_height, preview_width = preview.shape[:2]
         return QImage(
-            rgb_frame.data,
-            width,
-            height,
-            bytes_per_line,
+            preview.data,
+            preview_width,
+            preview_height,
+            channels * preview_width,
             QImage.Format.Format_RGB888
-        ).copy()
+        )
 
     def run(self) -> None:
         """
@@ -392,16 +555,16 @@ class CameraWorker(QThread):
         """
         self._running = True
 
-        # Initialize camera
-        self._cap = cv2.VideoCapture(self._camera_index)
+        # Initialize camera (or a recording, replayed at its own frame rate),
+        # at a resolution chosen for quality/performance balance
+        cap = open_frame_source(self._source, width=FRAME_WIDTH, height=FRAME_HEIGHT)
 
-        if not self._cap.isOpened():
-            print(f"Error: Could not open camera {self._camera_index}")
+        if not cap.isOpened():
+            print(f"Error: Could not open frame source {self._source}")
             return
 
-        # Set camera resolution for optimal quality/performance balance
-        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        # Capture continuously on a separate thread, keeping only the newest frame
+        self._grabber = LatestFrameGrabber(cap).start()
 
         # Initialize MediaPipe (must be in worker thread)
         self._initialize_mediapipe()
@@ -409,56 +572,68 @@ class CameraWorker(QThread):
         # Track previous finger count to only emit on changes
         previous_count: Optional[int] = None
 
+        pacer = FramePacer(TARGET_FPS)
+        timings = self._timings
+        last_stats_time = time.perf_counter()
+
         while self._running:
-            success, frame = self._cap.read()
+            # Newest frame (waits only if no new frame has arrived yet)
+            with timings.measure("capture"):
+                frame = self._grabber.read()
 
-            if not success:
+            if frame is None:
                 continue
 
-            # Apply mirror mode if enabled (more intuitive for users)
-            if self._mirror_mode:
-                frame = cv2.flip(frame, 1)
-
-            # Convert to RGB for MediaPipe processing
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with timings.measure("inference"):
+                # Mirror (more intuitive for users) and convert to RGB, once
+                rgb_frame = self._prepare_frame(frame)
 
-            # Setting writeable=False improves MediaPipe performance
-            rgb_frame.flags.writeable = False
-            results = self._hands.process(rgb_frame)
-            rgb_frame.flags.writeable = True
+                # Setting writeable=False improves MediaPipe performance
+                rgb_frame.flags.writeable = False
+                results = self._inference.process(rgb_frame)
+                rgb_frame.flags.writeable = True
 
             # Default to 0 when no hand is detected
             finger_count = 0
 
-            # Process detected hands
-            if results.multi_hand_landmarks and results.multi_handedness:
-                for hand_landmarks, handedness_info in zip(
-                    results.multi_hand_landmarks,
-                    results.multi_handedness
-                ):
-                    handedness = handedness_info.classification[0].label
+            with timings.measure("draw"):
+                # Process detected hands
+                if results.multi_hand_landmarks and results.multi_handedness:
+                    for hand_landmarks, handedness_info in zip(
+                        results.multi_hand_landmarks,
+                        results.multi_handedness
+                    ):
+                        handedness = handedness_info.classification[0].label
 
-                    # In mirror mode, handedness label is inverted
-                    if self._mirror_mode:
-                        handedness = "Left" if handedness == "Right" else "Right"
+                        # In mirror mode, handedness label is inverted
+                        if self._mirror_mode:
+                            handedness = "Left" if handedness == "Right" else "Right"
 
-                    # Count fingers using the original logic (DO NOT MODIFY)
-                    finger_count = count_raised_fingers(hand_landmarks, handedness)
+                        # Count fingers using the original logic (DO NOT MODIFY)
+                        finger_count = count_raised_fingers(hand_landmarks, handedness)
 
-                    # Draw landmarks overlay on the frame
-                    self._draw_hand_landmarks(frame, hand_landmarks)
+                        # Draw landmarks overlay on the RGB frame
+                        self._draw_hand_landmarks(rgb_frame, hand_landmarks)
 
             # Emit finger count only when it changes (reduces signal noise)
             if finger_count != previous_count:
                 self.finger_count_changed.emit(finger_count)
                 previous_count = finger_count
 
-            # Convert and emit frame for display
-            qimage = self._convert_frame_to_qimage(frame)
+            # Scale to the preview size and emit frame for display
+            with timings.measure("convert"):
+                qimage = self._convert_frame_to_qimage(rgb_frame)
             self.frame_ready.emit(qimage)
 
-            # ~30 FPS to balance smoothness and CPU usage
-            self.msleep(33)
+            timings.frame_done()
+
+            now = time.perf_counter()
+            if now - last_stats_time >= STATS_INTERVAL_S:
+                self.timings_updated.emit(self.stage_timings)
+                last_stats_time = now
+
+            # Sleep only for what is left of this frame's time slot
+            pacer.wait()
 
         self._cleanup()
 
@@ -468,13 +643,14 @@ class CameraWorker(QThread):
 
     def _cleanup(self) -> None:
         """Release camera and MediaPipe resources."""
+        self._inference = None
         if self._hands is not None:
             self._hands.close()
             self._hands = None
 
-        if self._cap is not None:
-            self._cap.release()
-            self._cap = None
+        if self._grabber is not None:
+            self._grabber.stop()  # Also releases the camera
+            self._grabber = None
 
 
 # =============================================================================
@@ -501,9 +677,10 @@ class MainWindow(QMainWindow):
     Uses Qt layouts for proper resizing behavior.
     """
 
-    def __init__(self):
+    def __init__(self, source: FrameSourceSpec = DEFAULT_CAMERA_INDEX):
         super().__init__()
 
+        self._source = source
         self._tts_manager = TTSManager()
         self._camera_worker: Optional[CameraWorker] = None
 
@@ -642,6 +819,17 @@ class MainWindow(QMainWindow):
 
         layout.addStretch()  # Push content to the left
 
+        # Performance readout (FPS and per-stage timings from the worker)
+        self._timings_label = QLabel("")
+        self._timings_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        self._timings_label.setStyleSheet(f"""
+            QLabel {{
+                font-size: 12px;
+                color: {Colors.TEXT_MUTED};
+            }}
+        """)
+        layout.addWidget(self._timings_label)
+
         return container
 
     def _create_control_bar(self) -> QHBoxLayout:
@@ -751,11 +939,12 @@ class MainWindow(QMainWindow):
 
     def _setup_camera_worker(self) -> None:
         """Initialize and start the camera worker thread."""
-        self._camera_worker = CameraWorker(camera_index=DEFAULT_CAMERA_INDEX)
+        self._camera_worker = CameraWorker(source=self._source)
 
         # Connect signals to slots
         self._camera_worker.frame_ready.connect(self._on_frame_ready)
         self._camera_worker.finger_count_changed.connect(self._on_finger_count_changed)
+        self._camera_worker.timings_updated.connect(self._on_timings_updated)
 
         # Start the worker thread
         self._camera_worker.start()
@@ -765,17 +954,15 @@ class MainWindow(QMainWindow):
         """
         Handle new frame from camera worker.
 
-        Scales the image to fit the preview label while maintaining aspect ratio.
+        The worker already scaled the image to the preview size, so it is
+        shown as is (no scaling on the GUI thread).
         """
-        pixmap = QPixmap.fromImage(image)
+        self._preview_label.setPixmap(QPixmap.fromImage(image))
 
-        # Scale to fit while keeping aspect ratio for natural appearance
-        scaled_pixmap = pixmap.scaled(
-            self._preview_label.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self._preview_label.setPixmap(scaled_pixmap)
+        # Let the worker scale the next frames to the current preview area
+        size = self._preview_label.contentsRect().size()
+        if self._camera_worker is not None:
+            self._camera_worker.preview_size = (size.width(), size.height())
 
     @Slot(int)
     def _on_finger_count_changed(self, count: int) -> None:
@@ -787,9 +974,20 @@ class MainWindow(QMainWindow):
         self._count_label.setText(str(count))
 
         # TTS will only speak if enabled AND count changed
-        # (TTSManager handles the change detection internally)
+        # (TTSManager handles the change detection internally and
+        # speaks on its own thread, so this returns immediately)
         self._tts_manager.speak_count(count)
 
+    @Slot(dict)
+    def _on_timings_updated(self, stats: dict) -> None:
+        """Show the worker's FPS and per-stage timings."""
+        self._timings_label.setText(
+            f"{stats['fps']:.1f} FPS\n"
+            f"capture {stats['capture_ms']:.1f} ms · inference {stats['inference_ms']:.1f} ms\n"
+            f"draw {stats['draw_ms']:.1f} ms · convert {stats['convert_ms']:.1f} ms\n"
+            f"dropped frames: {stats.get('frames_dropped', 0)}"
+        )
+
     @Slot()
     def _on_sound_toggled(self) -> None:
         """Handle sound checkbox state changes."""
@@ -840,7 +1038,10 @@ def main():
     font.setFamily("Segoe UI, SF Pro Display, Helvetica Neue, sans-serif")
     app.setFont(font)
 
-    window = MainWindow()
+    # Optional source: webcam index, video file or image directory
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CAMERA_INDEX
+
+    window = MainWindow(source)
     window.show()
 
     sys.exit(app.exec())
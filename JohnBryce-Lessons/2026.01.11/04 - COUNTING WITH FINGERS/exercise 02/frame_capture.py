@@ -0,0 +1,242 @@
+"""
+Frame Capture
+=============
+
+Low-latency capture helpers shared by the finger counter apps.
+
+Cameras buffer frames internally. When the processing loop is slower
+than the camera, reading frame-by-frame means every frame is already
+stale by the time it is processed, and latency keeps growing.
+
+This module splits capture from processing:
+    - LatestFrameGrabber: a dedicated thread reads frames continuously
+      into a single-slot buffer. Older frames are overwritten (dropped),
+      so the processing loop always gets the newest frame.
+    - FramePacer: paces the processing loop to a target FPS, sleeping
+      only for whatever time is left in each frame interval.
+    - StageTimings: rolling per-stage timings (capture, inference,
+      draw, convert) plus the effective FPS.
+
+No Qt imports, so the same helpers work in the OpenCV-only app and in
+the GUI worker thread.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Processing loop target (the camera may deliver more; extra frames are dropped)
+TARGET_FPS = 30
+
+# How many recent samples the rolling timings average over
+TIMING_WINDOW = 60
+
+# Give up waiting for a new frame after this long (camera unplugged, etc.)
+FRAME_WAIT_TIMEOUT_S = 1.0
+
+# Pipeline stages reported by StageTimings
+STAGES = ("capture", "inference", "draw", "convert")
+
+
+# =============================================================================
+# LATEST-FRAME GRABBER
+# =============================================================================
+
+class LatestFrameGrabber:
+    """
+    Continuously reads frames on a background thread, keeping only the newest.
+
+    Works with any object that has read() -> (success, frame) and release(),
+    such as cv2.VideoCapture.
+
+    Example:
+        grabber = LatestFrameGrabber(cv2.VideoCapture(0))
+        grabber.start()
+        frame = grabber.read()   # newest frame not returned before
+        grabber.stop()
+    """
+
+    def __init__(self, capture):
+        self._capture = capture
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Single-slot buffer
+        self._frame: Optional[np.ndarray] = None
+        self._frame_id = 0
+        self._last_returned_id = 0
+
+        # Counters
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_failures = 0
+        self._read_ms: deque = deque(maxlen=TIMING_WINDOW)
+
+    def start(self) -> "LatestFrameGrabber":
+        """Start the capture thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        """Capture loop: overwrite the slot with every new frame."""
+        while self._running:
+            started = time.perf_counter()
+            success, frame = self._capture.read()
+            read_ms = (time.perf_counter() - started) * 1000
+
+            if not success:
+                self.read_failures += 1
+                # Avoid a hot loop while the camera is not delivering
+                time.sleep(0.005)
+                continue
+
+            with self._condition:
+                # The previous frame was never picked up: it is dropped
+                if self._frame_id > self._last_returned_id:
+                    self.frames_dropped += 1
+
+                self._frame = frame
+                self._frame_id += 1
+                self.frames_captured += 1
+                self._read_ms.append(read_ms)
+                self._condition.notify_all()
+
+    def read(self, timeout: float = FRAME_WAIT_TIMEOUT_S) -> Optional[np.ndarray]:
+        """
+        Return the newest frame that has not been returned yet.
+
+        Blocks until a new frame arrives, or returns None after `timeout`
+        seconds (or once the grabber is stopped).
+        """
+        with self._condition:
+            has_new_frame = self._condition.wait_for(
+                lambda: self._frame_id > self._last_returned_id or not self._running,
+                timeout=timeout
+            )
+            if not has_new_frame or self._frame_id == self._last_returned_id:
+                return None
+
+            self._last_returned_id = self._frame_id
+            return self._frame
+
+    @property
+    def camera_read_ms(self) -> float:
+        """Average time the camera takes to deliver a frame."""
+        with self._condition:
+            return float(np.mean(self._read_ms)) if self._read_ms else 0.0
+
+    def stop(self) -> None:
+        """Stop the capture thread and release the capture device."""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+        self._capture.release()
+
+
+# =============================================================================
+# ADAPTIVE PACING
+# =============================================================================
+
+class FramePacer:
+    """
+    Paces a loop to a target FPS.
+
+    Instead of a fixed sleep after every frame (which adds the sleep on
+    top of the processing time), wait() only sleeps until the next frame
+    deadline. When a frame took longer than the interval, it does not
+    sleep at all and the schedule restarts from now, so a slow frame
+    does not cause a burst of catch-up frames.
+    """
+
+    def __init__(self, target_fps: float = TARGET_FPS):
+        self.interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self._next_deadline = time.perf_counter() + self.interval
+
+    def wait(self) -> float:
+        """Sleep until the next frame is due. Returns the time slept in seconds."""
+        now = time.perf_counter()
+        remaining = self._next_deadline - now
+
+        if remaining > 0:
+            time.sleep(remaining)
+            self._next_deadline += self.interval
+            return remaining
+
+        # Behind schedule: don't sleep, and don't try to catch up
+        self._next_deadline = now + self.interval
+        return 0.0
+
+
+# =============================================================================
+# STAGE TIMINGS
+# =============================================================================
+
+class StageTimings:
+    """
+    Rolling per-stage timings and the effective processing FPS.
+
+    Example:
+        timings = StageTimings()
+        with timings.measure("inference"):
+            results = hands.process(rgb_frame)
+        timings.frame_done()
+        timings.snapshot()  # {"fps": 29.8, "inference_ms": 11.2, ...}
+    """
+
+    def __init__(self, stages: Tuple[str, ...] = STAGES, window: int = TIMING_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {stage: deque(maxlen=window) for stage in stages}
+        self._frame_times: deque = deque(maxlen=window + 1)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Time the enclosed block as one sample of `stage`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - started) * 1000)
+
+    def add(self, stage: str, milliseconds: float) -> None:
+        """Record one sample for a stage."""
+        with self._lock:
+            self._samples[stage].append(milliseconds)
+
+    def frame_done(self) -> None:
+        """Mark the end of one processed frame (for the FPS estimate)."""
+        with self._lock:
+            self._frame_times.append(time.perf_counter())
+
+    def snapshot(self) -> Dict[str, float]:
+        """Average milliseconds per stage and the current FPS."""
+        with self._lock:
+            stats = {
+                f"{stage}_ms": round(float(np.mean(samples)), 2) if samples else 0.0
+                for stage, samples in self._samples.items()
+            }
+
+            fps = 0.0
+            if len(self._frame_times) > 1:
+                elapsed = self._frame_times[-1] - self._frame_times[0]
+                if elapsed > 0:
+                    fps = (len(self._frame_times) - 1) / elapsed
+            stats["fps"] = round(fps, 1)
+
+        return stats
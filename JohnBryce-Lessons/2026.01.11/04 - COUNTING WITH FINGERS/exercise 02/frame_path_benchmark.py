@@ -0,0 +1,167 @@
+"""
+Frame Path Benchmark
+====================
+
+Measures what the GUI's per-frame path (camera frame -> QImage for the
+preview) allocates, for the previous path and the current one.
+
+Previous path (per frame):
+    flip -> BGR->RGB for MediaPipe -> draw on BGR -> BGR->RGB again
+    -> QImage(...).copy() -> SmoothTransformation scale on the GUI thread
+
+Current path (CameraWorker._prepare_frame / _convert_frame_to_qimage):
+    flip + one BGR->RGB into a reused buffer -> draw on RGB
+    -> resize to the preview size in the worker -> QImage wraps that array
+
+NumPy/OpenCV allocations are measured with tracemalloc. Qt allocations
+are not visible to tracemalloc, so deep copies made by Qt are counted
+from the image sizes.
+
+How to run:
+    python frame_path_benchmark.py
+"""
+
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImage
+
+from finger_counter_gui import FRAME_HEIGHT, FRAME_WIDTH, CameraWorker
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+BENCHMARK_FRAMES = 200
+
+# Typical preview area of the window at its minimum size
+PREVIEW_SIZE = (856, 482)
+
+MB = 1024 * 1024
+
+
+# =============================================================================
+# FRAME PATHS
+# =============================================================================
+
+def previous_path(frame: np.ndarray, mirror: bool):
+    """
+    The frame path before the single-conversion change.
+
+    Returns:
+        Tuple of (displayed image, bytes deep-copied by Qt)
+    """
+    if mirror:
+        frame = cv2.flip(frame, 1)
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # For MediaPipe
+
+    # (landmarks were drawn on the BGR frame here)
+
+    display = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    height, width, channels = display.shape
+    qimage = QImage(display.data, width, height, channels * width,
+                    QImage.Format.Format_RGB888).copy()
+
+    # GUI thread: smooth scale to the label (QPixmap.scaled does the same)
+    scaled = qimage.scaled(QSize(*PREVIEW_SIZE), Qt.AspectRatioMode.KeepAspectRatio,
+                           Qt.TransformationMode.SmoothTransformation)
+
+    del rgb_frame
+    return scaled, qimage.sizeInBytes() + scaled.sizeInBytes()
+
+
+def current_path(worker: CameraWorker, frame: np.ndarray):
+    """
+    The current frame path, using the worker's own methods.
+
+    Returns:
+        Tuple of (displayed image, bytes deep-copied by Qt)
+    """
+    rgb_frame = worker._prepare_frame(frame)
+
+    # (landmarks are drawn on rgb_frame here)
+
+    return worker._convert_frame_to_qimage(rgb_frame), 0
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def measure(run_frame, frames):
+    """
+    Run a frame path over every frame.
+
+    Each frame's peak NumPy/OpenCV allocation is measured while its
+    output is still alive (as when it is waiting to be displayed).
+
+    Returns:
+        Dictionary with ms/frame, allocated MB/frame and Qt copy MB/frame
+    """
+    run_frame(frames[0])  # Warm up (first-frame buffers, Qt init)
+
+    allocated = []
+    qt_copied = []
+    seconds = 0.0
+
+    tracemalloc.start()
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+        started = time.perf_counter()
+        image, qt_bytes = run_frame(frame)
+        seconds += time.perf_counter() - started
+
+        allocated.append(tracemalloc.get_traced_memory()[1] - baseline)
+        qt_copied.append(qt_bytes)
+        del image
+    tracemalloc.stop()
+
+    return {
+        "ms": 1000 * seconds / len(frames),
+        "allocated_mb": float(np.mean(allocated)) / MB,
+        "qt_copied_mb": float(np.mean(qt_copied)) / MB,
+    }
+
+
+def main():
+    """Compare per-frame allocations of the previous and current frame paths."""
+    rng = np.random.default_rng(0)
+    # A few distinct frames, reused in turn (frames come from the grabber)
+    source_frames = [
+        rng.integers(0, 256, (FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+        for _ in range(4)
+    ]
+    frames = [source_frames[i % len(source_frames)] for i in range(BENCHMARK_FRAMES)]
+
+    worker = CameraWorker()
+    worker.mirror_mode = True
+    worker.preview_size = PREVIEW_SIZE
+
+    results = {
+        "previous": measure(lambda frame: previous_path(frame, mirror=True), frames),
+        "current": measure(lambda frame: current_path(worker, frame), frames),
+    }
+
+    print()
+    print("=" * 66)
+    print(f"   FRAME PATH: {FRAME_WIDTH}x{FRAME_HEIGHT} -> preview {PREVIEW_SIZE[0]}x{PREVIEW_SIZE[1]}, "
+          f"{BENCHMARK_FRAMES} frames")
+    print("=" * 66)
+    print(f"{'Path':<12} {'ms/frame':>9} {'NumPy MB/frame':>15} {'Qt copy MB/frame':>17}")
+    print("-" * 66)
+    for name, result in results.items():
+        print(f"{name:<12} {result['ms']:>9.2f} {result['allocated_mb']:>15.2f} "
+              f"{result['qt_copied_mb']:>17.2f}")
+    print()
+    print("Both paths then upload the image once with QPixmap.fromImage.")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Frame Sources
+=============
+
+One way to open every kind of input the finger counter can run on:
+
+    - Webcam index:      0, 1, ... (or "0" from the command line)
+    - Video file:        recordings/hand.mp4
+    - Image directory:   recordings/hand_frames/ (files in name order)
+
+open_frame_source() returns an object with the same interface as
+cv2.VideoCapture (isOpened, read, get, release), so it works directly
+with LatestFrameGrabber and the existing loops.
+
+Recorded sources can be replayed in real time (paced to the clip's FPS,
+like a camera) or read as fast as possible (for benchmarks).
+"""
+
+from pathlib import Path
+from typing import List, Optional, Union
+
+import cv2
+
+from frame_capture import FramePacer
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Requested camera resolution (the camera may pick the closest it supports)
+CAMERA_WIDTH = 1280
+CAMERA_HEIGHT = 720
+
+# Replay rate for image directories, and for videos that report no FPS
+DEFAULT_REPLAY_FPS = 30.0
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+# A webcam index, or a path to a video file or image directory
+FrameSourceSpec = Union[int, str, Path]
+
+
+# =============================================================================
+# IMAGE SEQUENCE
+# =============================================================================
+
+class ImageSequenceCapture:
+    """
+    Reads the images of a directory in file-name order, like a video.
+
+    Mirrors the parts of the cv2.VideoCapture interface the apps use.
+    """
+
+    def __init__(self, directory: Union[str, Path], fps: float = DEFAULT_REPLAY_FPS):
+        self._paths: List[Path] = sorted(
+            path for path in Path(directory).iterdir()
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        self._fps = fps
+        self._position = 0
+
+    def isOpened(self) -> bool:
+        return self._position < len(self._paths)
+
+    def read(self):
+        """Return (success, BGR frame) for the next image."""
+        while self._position < len(self._paths):
+            frame = cv2.imread(str(self._paths[self._position]))
+            self._position += 1
+            if frame is not None:
+                return True, frame
+            print(f"Warning: Skipping unreadable image {self._paths[self._position - 1]}")
+        return False, None
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return self._fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self._paths))
+        return 0.0
+
+    def release(self) -> None:
+        self._position = len(self._paths)
+
+
+# =============================================================================
+# REAL-TIME REPLAY
+# =============================================================================
+
+class RealtimeReplay:
+    """
+    Delivers frames of a recorded source no faster than its frame rate.
+
+    Without this, a video file is read as fast as the disk allows, and a
+    LatestFrameGrabber would drop most of the clip.
+    """
+
+    def __init__(self, capture, fps: Optional[float] = None):
+        self._capture = capture
+        fps = fps or capture.get(cv2.CAP_PROP_FPS) or DEFAULT_REPLAY_FPS
+        self._pacer = FramePacer(fps)
+
+    def isOpened(self) -> bool:
+        return self._capture.isOpened()
+
+    def read(self):
+        self._pacer.wait()
+        return self._capture.read()
+
+    def get(self, prop: int) -> float:
+        return self._capture.get(prop)
+
+    def release(self) -> None:
+        self._capture.release()
+
+
+# =============================================================================
+# OPENING SOURCES
+# =============================================================================
+
+def is_camera(source: FrameSourceSpec) -> bool:
+    """True for a webcam index (an int, or a string of digits)."""
+    return isinstance(source, int) or (isinstance(source, str) and source.isdigit())
+
+
+def open_frame_source(
+    source: FrameSourceSpec,
+    realtime: bool = True,
+    width: int = CAMERA_WIDTH,
+    height: int = CAMERA_HEIGHT
+):
+    """
+    Open a webcam, video file or image directory.
+
+    Args:
+        source: Webcam index, video file path or image directory path
+        realtime: Pace recorded sources to their FPS (ignored for cameras)
+        width: Requested camera width (recordings keep their own size)
+        height: Requested camera height
+
+    Returns:
+        A cv2.VideoCapture-like object; check isOpened() before reading
+    """
+    if is_camera(source):
+        capture = cv2.VideoCapture(int(source))
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        return capture
+
+    path = Path(source)
+    if path.is_dir():
+        capture = ImageSequenceCapture(path)
+    else:
+        capture = cv2.VideoCapture(str(path))
+
+    return RealtimeReplay(capture) if realtime else capture
+
@@ -0,0 +1,260 @@
+"""
+Reduced-Resolution Hand Inference
+=================================
+
+Runs MediaPipe Hands on a smaller copy of each frame.
+
+MediaPipe returns landmarks as normalized (0-1) coordinates, so the hand
+model does not need the full 1280x720 camera frame: downscaling first
+cuts the cost of converting and copying every frame into MediaPipe, and
+the landmarks still line up with the full-resolution frame used for
+drawing.
+
+Optional ROI mode: once a hand is found, only a square region around it
+is sent to MediaPipe (then downscaled if still larger than the inference
+width), and the landmarks are mapped back to full-frame coordinates.
+The region is kept stable while the hand stays inside it, so MediaPipe's
+own frame-to-frame tracking keeps working. When the hand is lost the
+next frame is searched in full again.
+
+Benchmark against the full-frame path (FPS + finger-count agreement):
+    python hand_inference.py                 # webcam 0
+    python hand_inference.py my_clip.mp4     # recorded video
+    python hand_inference.py frames_dir/     # image directory
+"""
+
+import sys
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Width of the image given to MediaPipe (height keeps the aspect ratio).
+# None runs on the full-resolution frame.
+INFERENCE_WIDTH: Optional[int] = 640
+
+# Crop around the last detected hand instead of using the whole frame
+USE_ROI = False
+
+# Extra space around the hand's bounding box, as a fraction of its size
+ROI_MARGIN = 0.5
+
+# Smallest ROI side in full-resolution pixels (avoids tiny crops)
+ROI_MIN_SIZE = 256
+
+# Frames compared by the benchmark
+BENCHMARK_FRAMES = 300
+
+
+# =============================================================================
+# HAND INFERENCE
+# =============================================================================
+
+class HandInference:
+    """
+    Wraps a MediaPipe Hands instance to run at a reduced resolution.
+
+    process() takes the full-resolution RGB frame and returns MediaPipe
+    results whose landmarks are normalized to that full frame, exactly
+    like hands.process(frame) would.
+
+    Example:
+        inference = HandInference(hands, inference_width=640, use_roi=True)
+        results = inference.process(rgb_frame)
+    """
+
+    def __init__(
+        self,
+        hands,
+        inference_width: Optional[int] = INFERENCE_WIDTH,
+        use_roi: bool = USE_ROI
+    ):
+        self._hands = hands
+        self.inference_width = inference_width
+        self.use_roi = use_roi
+
+        # Current ROI in full-resolution pixels: (x0, y0, x1, y1)
+        self._roi: Optional[Tuple[int, int, int, int]] = None
+
+        # Downscaled image, reused while the size stays the same
+        self._resized: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Forget the ROI (e.g. after the frame was flipped or resized)."""
+        self._roi = None
+
+    def _downscale(self, image: np.ndarray) -> np.ndarray:
+        """Shrink to inference_width if larger; always returns a contiguous array."""
+        height, width = image.shape[:2]
+        if self.inference_width is None or width <= self.inference_width:
+            return np.ascontiguousarray(image)
+
+        new_height = max(1, round(height * self.inference_width / width))
+        # cv2 writes into dst when the size matches, otherwise returns a new array
+        self._resized = cv2.resize(
+            image, (self.inference_width, new_height), dst=self._resized, interpolation=cv2.INTER_AREA
+        )
+        return self._resized
+
+    def process(self, rgb_frame: np.ndarray):
+        """
+        Detect hands on a reduced-resolution copy of the frame.
+
+        Args:
+            rgb_frame: Full-resolution RGB frame
+
+        Returns:
+            MediaPipe results with landmarks normalized to rgb_frame
+        """
+        height, width = rgb_frame.shape[:2]
+
+        if self.use_roi and self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            results = self._hands.process(self._downscale(rgb_frame[y0:y1, x0:x1]))
+
+            if results.multi_hand_landmarks:
+                self._map_to_frame(results, self._roi, width, height)
+                self._update_roi(results, width, height)
+                return results
+
+            # Hand left the ROI: search the whole frame this time
+            self._roi = None
+
+        results = self._hands.process(self._downscale(rgb_frame))
+
+        if self.use_roi and results.multi_hand_landmarks:
+            self._update_roi(results, width, height)
+
+        return results
+
+    @staticmethod
+    def _map_to_frame(results, roi, width: int, height: int) -> None:
+        """Convert landmarks from ROI-normalized to frame-normalized, in place."""
+        x0, y0, x1, y1 = roi
+        scale_x = (x1 - x0) / width
+        scale_y = (y1 - y0) / height
+
+        for hand_landmarks in results.multi_hand_landmarks:
+            for landmark in hand_landmarks.landmark:
+                landmark.x = x0 / width + landmark.x * scale_x
+                landmark.y = y0 / height + landmark.y * scale_y
+                # z uses roughly the same scale as x
+                landmark.z *= scale_x
+
+    def _update_roi(self, results, width: int, height: int) -> None:
+        """
+        Fit a square ROI around all detected hands.
+
+        The ROI only moves when a hand gets close to its edge, so most
+        frames use the same crop and MediaPipe's tracking stays valid.
+        """
+        xs = [landmark.x for hand in results.multi_hand_landmarks for landmark in hand.landmark]
+        ys = [landmark.y for hand in results.multi_hand_landmarks for landmark in hand.landmark]
+
+        left, right = min(xs) * width, max(xs) * width
+        top, bottom = min(ys) * height, max(ys) * height
+        hand_size = max(right - left, bottom - top)
+
+        # Keep the current ROI while the hand (plus half the margin) is inside it
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            pad = hand_size * ROI_MARGIN / 2
+            if left - pad >= x0 and right + pad <= x1 and top - pad >= y0 and bottom + pad <= y1:
+                return
+
+        side = max(hand_size * (1 + 2 * ROI_MARGIN), ROI_MIN_SIZE)
+        side = int(min(side, width, height))
+
+        center_x = (left + right) / 2
+        center_y = (top + bottom) / 2
+
+        # Shift (don't shrink) the square so it stays inside the frame
+        x0 = int(np.clip(center_x - side / 2, 0, width - side))
+        y0 = int(np.clip(center_y - side / 2, 0, height - side))
+        self._roi = (x0, y0, x0 + side, y0 + side)
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def main():
+    """Compare the full-frame path with the reduced-resolution modes."""
+    # Imported here: finger_counter.py imports this module
+    from finger_counter import count_fingers, initialize_hand_detector
+    from frame_source import open_frame_source
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    cap = open_frame_source(source, realtime=False)
+    if not cap.isOpened():
+        print(f"Error: Could not open {source}")
+        return
+
+    # Each mode gets its own Hands instance (MediaPipe keeps tracking state)
+    modes = {
+        "full frame": dict(inference_width=None, use_roi=False),
+        f"{INFERENCE_WIDTH}px": dict(inference_width=INFERENCE_WIDTH, use_roi=False),
+        f"{INFERENCE_WIDTH}px + ROI": dict(inference_width=INFERENCE_WIDTH, use_roi=True),
+    }
+    detectors = {}
+    for name, options in modes.items():
+        hands = initialize_hand_detector()[0]
+        detectors[name] = (hands, HandInference(hands, **options))
+
+    seconds = {name: 0.0 for name in modes}
+    counts = {name: [] for name in modes}
+
+    frames = 0
+    frame_size = ""
+    while frames < BENCHMARK_FRAMES:
+        success, frame = cap.read()
+        if not success:
+            break
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame.flags.writeable = False
+        frame_size = f"{frame.shape[1]}x{frame.shape[0]}"
+
+        # Same frame through every mode, one after the other
+        for name, (_, inference) in detectors.items():
+            started = time.perf_counter()
+            results = inference.process(rgb_frame)
+            seconds[name] += time.perf_counter() - started
+            counts[name].append(count_fingers(results, False))
+
+        frames += 1
+
+    cap.release()
+    for hands, _ in detectors.values():
+        hands.close()
+
+    if frames == 0:
+        print("No frames read.")
+        return
+
+    reference = np.array(counts["full frame"])
+
+    print()
+    print("=" * 66)
+    print(f"   HAND INFERENCE: {frames} frames of {frame_size}")
+    print("=" * 66)
+    print(f"{'Mode':<20} {'ms/frame':>9} {'FPS':>8} {'Agreement':>11} {'Hand frames':>12}")
+    print("-" * 66)
+    for name in modes:
+        mode_counts = np.array(counts[name])
+        ms_per_frame = 1000 * seconds[name] / frames
+        agreement = 100 * (mode_counts == reference).mean()
+        print(f"{name:<20} {ms_per_frame:>9.2f} {1000 / ms_per_frame:>8.1f} "
+              f"{agreement:>10.1f}% {int((mode_counts > 0).sum()):>12}")
+    print()
+    print("Agreement = frames with the same finger count as the full-frame path.")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Multi-Stream Finger Counter
+===========================
+
+Counts fingers on several cameras/videos at once (e.g. a kiosk wall).
+
+Each source runs in its own worker process with its own MediaPipe Hands
+instance, so streams use separate CPU cores instead of sharing one
+Python GIL. Workers send results back in two ways:
+
+    - Frame ring (shared memory): each worker writes its annotated
+      preview frames into a few fixed slots of a shared-memory block.
+      Frames are never pickled or copied through a pipe.
+    - Result channel (multiprocessing queue): one small tuple per frame
+      (stream, frame number, ring slot, finger count, inference time).
+
+The parent process aggregates the results, prints per-stream counts and
+FPS, and can show all streams as a mosaic.
+
+How to run:
+    python multi_stream.py 0 1                       # two webcams
+    python multi_stream.py a.mp4 b.mp4 frames_dir/   # recordings, in real time
+    python multi_stream.py a.mp4 b.mp4 --fast        # recordings, max throughput
+    python multi_stream.py 0 a.mp4 --show            # mosaic window ('q' quits)
+"""
+
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from collections import deque
+from contextlib import ExitStack
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+# Size of the preview frames written to the ring
+RING_WIDTH = 640
+RING_HEIGHT = 360
+
+# Slots per stream; the parent reads a slot well before it is reused
+RING_SLOTS = 4
+
+# How often the aggregator prints the per-stream table
+REPORT_INTERVAL_S = 2.0
+
+# Rolling window (frames) for per-stream FPS
+FPS_WINDOW = 60
+
+# Wait this long for a result before checking whether workers are alive
+RESULT_TIMEOUT_S = 0.1
+
+
+# =============================================================================
+# SHARED-MEMORY FRAME RING
+# =============================================================================
+
+class FrameRing:
+    """
+    Fixed number of (height, width, 3) uint8 frame slots in shared memory.
+
+    Each slot has a stamp holding the frame number written to it. The
+    writer clears the stamp before writing and sets it afterwards, so a
+    reader can tell whether a slot was overwritten while it was copying.
+
+    Example:
+        ring = FrameRing.create()             # parent
+        ring = FrameRing.attach(ring.name)    # worker
+        slot = ring.write(frame_number, frame)
+        frame = ring.read(slot, frame_number) # None if already overwritten
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, slots: int, height: int, width: int):
+        self._memory = memory
+        self.slots = slots
+        self._stamps = np.ndarray((slots,), dtype=np.int64, buffer=memory.buf)
+        self._frames = np.ndarray((slots, height, width, 3), dtype=np.uint8,
+                                  buffer=memory.buf, offset=self._stamps.nbytes)
+
+    @classmethod
+    def create(cls, slots: int = RING_SLOTS, height: int = RING_HEIGHT,
+               width: int = RING_WIDTH) -> "FrameRing":
+        """Allocate a new ring (in the parent process)."""
+        size = slots * 8 + slots * height * width * 3
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), slots, height, width)
+        ring._stamps[:] = -1
+        ring._frames[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, slots: int = RING_SLOTS, height: int = RING_HEIGHT,
+               width: int = RING_WIDTH) -> "FrameRing":
+        """Open an existing ring by name (in a worker process)."""
+        return cls(shared_memory.SharedMemory(name=name), slots, height, width)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def write(self, frame_number: int, frame: np.ndarray) -> int:
+        """Resize a frame into the next slot. Returns the slot index."""
+        slot = frame_number % self.slots
+        self._stamps[slot] = -1
+        cv2.resize(frame, (self._frames.shape[2], self._frames.shape[1]),
+                   dst=self._frames[slot], interpolation=cv2.INTER_AREA)
+        self._stamps[slot] = frame_number
+        return slot
+
+    def read(self, slot: int, frame_number: int) -> Optional[np.ndarray]:
+        """Copy of the frame in `slot`, or None if it no longer holds frame_number."""
+        if self._stamps[slot] != frame_number:
+            return None
+        frame = self._frames[slot].copy()
+        return frame if self._stamps[slot] == frame_number else None
+
+    def close(self) -> None:
+        # Drop the array views first, or the memory cannot be closed
+        del self._stamps, self._frames
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory (parent only, after every worker closed it)."""
+        self._memory.unlink()
+
+
+# =============================================================================
+# WORKER PROCESS
+# =============================================================================
+
+class StreamResult(NamedTuple):
+    """One processed frame, as sent over the result channel."""
+    stream: int
+    frame_number: int
+    slot: int
+    finger_count: int
+    inference_ms: float
+
+
+class StreamEnded(NamedTuple):
+    """Sent once when a worker stops (end of recording or error)."""
+    stream: int
+    error: Optional[str]
+
+
+def stream_worker(stream, source, ring_name, results, stop_event, realtime, mirror_mode):
+    """
+    Process one source until it ends or stop_event is set.
+
+    Runs in its own process: opens the source, creates its own MediaPipe
+    Hands instance, writes annotated frames into the ring and sends one
+    StreamResult per frame.
+    """
+    # Imported here so only worker processes load MediaPipe
+    from finger_counter import count_fingers, draw_finger_count, draw_hand_landmarks, initialize_hand_detector
+    from frame_capture import LatestFrameGrabber
+    from frame_source import is_camera, open_frame_source
+    from hand_inference import HandInference
+
+    error = None
+
+    try:
+        # Every resource is released on the way out, in reverse order,
+        # even when the loop or a later setup step raises
+        with ExitStack() as cleanup:
+            ring = FrameRing.attach(ring_name)
+            cleanup.callback(ring.close)
+
+            capture = open_frame_source(source, realtime=realtime)
+            cleanup.callback(capture.release)
+            if not capture.isOpened():
+                raise RuntimeError(f"Could not open frame source {source}")
+
+            # Cameras: always process the newest frame (as in the GUI)
+            grabber = None
+            if is_camera(source):
+                grabber = LatestFrameGrabber(capture).start()
+                cleanup.callback(grabber.stop)
+
+            hands, mp_drawing, mp_drawing_styles, mp_hands = initialize_hand_detector()
+            cleanup.callback(hands.close)
+            inference = HandInference(hands)
+            frame_number = 0
+
+            while not stop_event.is_set():
+                if grabber is not None:
+                    frame = grabber.read()
+                    if frame is None:
+                        continue
+                else:
+                    success, frame = capture.read()
+                    if not success:
+                        break
+
+                if mirror_mode:
+                    frame = cv2.flip(frame, 1)
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+                started = time.perf_counter()
+                rgb_frame.flags.writeable = False
+                detection = inference.process(rgb_frame)
+                inference_ms = (time.perf_counter() - started) * 1000
+
+                finger_count = count_fingers(detection, mirror_mode)
+
+                for hand_landmarks in detection.multi_hand_landmarks or ():
+                    draw_hand_landmarks(frame, hand_landmarks, mp_drawing, mp_drawing_styles, mp_hands)
+                draw_finger_count(frame, finger_count)
+
+                slot = ring.write(frame_number, frame)
+                results.put(StreamResult(stream, frame_number, slot, finger_count, inference_ms))
+                frame_number += 1
+    except Exception as e:
+        error = str(e)
+    finally:
+        # The parent waits for this to know the stream is done
+        results.put(StreamEnded(stream, error))
+
+
+# =============================================================================
+# AGGREGATOR
+# =============================================================================
+
+class StreamAggregator:
+    """Latest count, frame totals and rolling FPS per stream."""
+
+    def __init__(self, sources: List[str]):
+        self.sources = sources
+        self.counts: Dict[int, int] = {}
+        self.frames = [0] * len(sources)
+        self.latest: Dict[int, StreamResult] = {}
+        self.ended: Dict[int, Optional[str]] = {}
+        self._inference_ms = [deque(maxlen=FPS_WINDOW) for _ in sources]
+        self._arrivals = [deque(maxlen=FPS_WINDOW + 1) for _ in sources]
+
+    def add(self, result: StreamResult) -> None:
+        self.counts[result.stream] = result.finger_count
+        self.frames[result.stream] += 1
+        self.latest[result.stream] = result
+        self._inference_ms[result.stream].append(result.inference_ms)
+        self._arrivals[result.stream].append(time.perf_counter())
+
+    def end(self, ended: StreamEnded) -> None:
+        self.ended[ended.stream] = ended.error
+
+    @property
+    def all_ended(self) -> bool:
+        return len(self.ended) == len(self.sources)
+
+    def fps(self, stream: int) -> float:
+        """Frames per second over the last FPS_WINDOW results of a stream."""
+        arrivals = self._arrivals[stream]
+        if len(arrivals) < 2 or arrivals[-1] == arrivals[0]:
+            return 0.0
+        return (len(arrivals) - 1) / (arrivals[-1] - arrivals[0])
+
+    def report(self) -> str:
+        """Table of per-stream count, FPS and inference time."""
+        lines = [f"{'#':<3} {'Source':<28} {'Count':>5} {'FPS':>7} {'Infer ms':>9} {'Frames':>8}  Status"]
+        for stream, source in enumerate(self.sources):
+            inference_ms = self._inference_ms[stream]
+            status = "running"
+            if stream in self.ended:
+                status = f"error: {self.ended[stream]}" if self.ended[stream] else "ended"
+            lines.append(
+                f"{stream:<3} {source[-28:]:<28} {self.counts.get(stream, 0):>5} "
+                f"{self.fps(stream):>7.1f} {np.mean(inference_ms) if inference_ms else 0:>9.1f} "
+                f"{self.frames[stream]:>8}  {status}"
+            )
+        total_fps = sum(self.fps(stream) for stream in range(len(self.sources)) if stream not in self.ended)
+        lines.append(f"Total: {total_fps:.1f} FPS across {len(self.sources) - len(self.ended)} running streams")
+        return "\n".join(lines)
+
+
+def build_mosaic(rings: List[FrameRing], aggregator: StreamAggregator, last_frames: Dict[int, np.ndarray]) -> np.ndarray:
+    """Tile the newest frame of every stream into one image."""
+    columns = int(np.ceil(np.sqrt(len(rings))))
+    rows = int(np.ceil(len(rings) / columns))
+    mosaic = np.zeros((rows * RING_HEIGHT, columns * RING_WIDTH, 3), dtype=np.uint8)
+
+    for stream, ring in enumerate(rings):
+        latest = aggregator.latest.get(stream)
+        if latest is not None:
+            frame = ring.read(latest.slot, latest.frame_number)
+            if frame is not None:
+                last_frames[stream] = frame
+
+        if stream in last_frames:
+            row, column = divmod(stream, columns)
+            mosaic[row * RING_HEIGHT:(row + 1) * RING_HEIGHT,
+                   column * RING_WIDTH:(column + 1) * RING_WIDTH] = last_frames[stream]
+
+    return mosaic
+
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def run_streams(sources: List[str], realtime: bool = True, mirror_mode: bool = True,
+                show: bool = False, duration: float = 0.0) -> StreamAggregator:
+    """
+    Start one worker process per source and aggregate their results.
+
+    Args:
+        sources: Webcam indexes, video files or image directories
+        realtime: Replay recordings at their own FPS (False = max throughput)
+        mirror_mode: Mirror frames like the single-camera apps
+        show: Show a mosaic of all streams
+        duration: Stop after this many seconds (0 = until all streams end)
+
+    Returns:
+        The aggregator, with final per-stream totals
+    """
+    # spawn: every worker starts a clean interpreter with its own MediaPipe
+    context = mp.get_context("spawn")
+    results = context.Queue()
+    stop_event = context.Event()
+
+    rings = [FrameRing.create() for _ in sources]
+    workers = [
+        context.Process(
+            target=stream_worker,
+            args=(stream, source, ring.name, results, stop_event, realtime, mirror_mode),
+            name=f"stream-{stream}",
+            daemon=True
+        )
+        for stream, (source, ring) in enumerate(zip(sources, rings))
+    ]
+
+    aggregator = StreamAggregator([str(source) for source in sources])
+    last_frames: Dict[int, np.ndarray] = {}
+
+    for worker in workers:
+        worker.start()
+
+    started = time.perf_counter()
+    last_report = started
+
+    try:
+        while not aggregator.all_ended:
+            try:
+                message = results.get(timeout=RESULT_TIMEOUT_S)
+            except queue.Empty:
+                message = None
+
+            if isinstance(message, StreamResult):
+                aggregator.add(message)
+            elif isinstance(message, StreamEnded):
+                aggregator.end(message)
+
+            # A worker that crashed without sending StreamEnded (e.g. killed)
+            for stream, worker in enumerate(workers):
+                if worker.exitcode not in (None, 0) and stream not in aggregator.ended:
+                    aggregator.end(StreamEnded(stream, f"worker exited ({worker.exitcode})"))
+
+            now = time.perf_counter()
+            if now - last_report >= REPORT_INTERVAL_S:
+                print(aggregator.report(), end="\n\n")
+                last_report = now
+
+            if show:
+                cv2.imshow("Finger Counter - Streams", build_mosaic(rings, aggregator, last_frames))
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+
+            if duration and now - started >= duration:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+
+        # Keep draining so workers are never blocked on a full queue
+        deadline = time.perf_counter() + 5.0
+        while any(worker.is_alive() for worker in workers) and time.perf_counter() < deadline:
+            try:
+                message = results.get(timeout=RESULT_TIMEOUT_S)
+                if isinstance(message, StreamEnded):
+                    aggregator.end(message)
+            except queue.Empty:
+                pass
+
+        for worker in workers:
+            worker.join(timeout=1.0)
+            if worker.is_alive():
+                worker.terminate()
+
+        for ring in rings:
+            ring.close()
+            ring.unlink()
+
+        if show:
+            cv2.destroyAllWindows()
+
+    return aggregator
+
+
+def main():
+    """Parse arguments and run all streams."""
+    parser = argparse.ArgumentParser(description="Multi-stream finger counter")
+    parser.add_argument("sources", nargs="+", help="webcam indexes, video files or image directories")
+    parser.add_argument("--fast", action="store_true", help="read recordings as fast as possible")
+    parser.add_argument("--no-mirror", action="store_true", help="do not mirror frames")
+    parser.add_argument("--show", action="store_true", help="show a mosaic of all streams")
+    parser.add_argument("--duration", type=float, default=0.0, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    aggregator = run_streams(
+        args.sources,
+        realtime=not args.fast,
+        mirror_mode=not args.no_mirror,
+        show=args.show,
+        duration=args.duration
+    )
+    elapsed = time.perf_counter() - started
+
+    print(aggregator.report())
+    print(f"\n{sum(aggregator.frames)} frames in {elapsed:.1f} s "
+          f"({sum(aggregator.frames) / elapsed:.1f} FPS overall, including startup)")
+
+
+if __name__ == "__main__":
+    main()
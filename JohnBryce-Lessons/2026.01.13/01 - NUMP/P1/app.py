@@ -15,6 +15,15 @@ img = Image.open("images/4k-image.jpg")
 image = np.array(img)
 print(image)
 
+# image[::step, ::step, :] keeps one pixel per block and drops the rest
+# (aliasing). For big images / whole folders use image_pipeline.py:
+# tiled, memory-mapped mirror, resize and area-average downscale with
+# a process pool:
+#
+#     from image_pipeline import process_directory
+#     for result in process_directory("images", "images/processed"):
+#         print(result)
+
 # for step in range(1, 6):
 #     resized_image = image[::step, ::step, :]
 #     print(f"step = {step}, shape = {resized_image.shape}")
@@ -0,0 +1,348 @@
+"""
+Tiled Image Pipeline
+====================
+Mirror, resize and area-average downscale large images (8K scans and
+up) without holding several full-size copies in memory.
+
+How it works:
+    - Each image is decoded once into a memory-mapped .npy scratch file
+      (.npy inputs are memory-mapped directly, with no decode at all)
+    - Every operation reads a strip of rows at a time from the source
+      map and writes its result into a memory-mapped output array
+    - Outputs are stored as RGBX (4 bytes per pixel, PIL's own layout),
+      so they are encoded straight from the memory map with no copy
+    - A directory is processed by a process pool; each worker handles
+      one image and then exits, so peak RAM is bounded per worker
+
+Run from the lesson folder:
+    python P1/image_pipeline.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+INPUT_DIR = Path("images")
+OUTPUT_DIR = Path("images/processed")
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".npy"}
+
+# Rows of the source image handled per step (a 8K RGB strip of 256
+# rows is ~6 MB)
+TILE_ROWS = 256
+
+# Integer factor for the area-average downscale
+DOWNSCALE_FACTOR = 4
+
+# Output width of the bilinear resize (height keeps the aspect ratio)
+RESIZE_WIDTH = 1920
+
+JPEG_QUALITY = 90
+
+WORKERS = os.cpu_count() or 1
+
+
+# ============================================================
+# MEMORY-MAPPED I/O
+# ============================================================
+
+def load_as_memmap(path, scratch_dir):
+    """
+    Open an image as a read-only memory-mapped (H, W, 3) uint8 array.
+
+    .npy files are mapped directly. Other formats are decoded once and
+    copied strip by strip into a scratch .npy file, after which the
+    decoded image is released.
+
+    Args:
+        path: Image file
+        scratch_dir: Folder for the scratch .npy file
+
+    Returns:
+        Read-only np.memmap
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".npy":
+        return np.load(path, mmap_mode="r")
+
+    scratch_path = Path(scratch_dir) / f"{path.stem}.source.npy"
+
+    with Image.open(path) as img:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        width, height = img.size
+
+        source = np.lib.format.open_memmap(scratch_path, mode="w+", dtype=np.uint8,
+                                           shape=(height, width, 3))
+        for top in range(0, height, TILE_ROWS):
+            bottom = min(top + TILE_ROWS, height)
+            source[top:bottom] = np.asarray(img.crop((0, top, width, bottom)))
+        source.flush()
+        del source
+
+    return np.load(scratch_path, mmap_mode="r")
+
+
+def create_output(scratch_dir, name, height, width):
+    """
+    Create a writable memory-mapped (H, W, 4) RGBX output array.
+
+    Operations write into output[..., :3]; the padding byte lets
+    save_image hand the map to PIL without converting it.
+    """
+    return np.lib.format.open_memmap(Path(scratch_dir) / f"{name}.npy", mode="w+",
+                                     dtype=np.uint8, shape=(height, width, 4))
+
+
+def save_image(rgbx, path):
+    """
+    Encode an (H, W, 4) RGBX array to an image file.
+
+    PIL keeps RGB images as 4 bytes per pixel, so Image.frombuffer can
+    share an RGBX array's memory - the memory-mapped output is encoded
+    without being copied into RAM first (an (H, W, 3) array would be).
+    """
+    height, width, _ = rgbx.shape
+    image = Image.frombuffer("RGBX", (width, height), rgbx, "raw", "RGBX", 0, 1)
+    image.save(path, quality=JPEG_QUALITY)
+
+
+# ============================================================
+# TILED OPERATIONS
+# ============================================================
+
+def mirror(source, output):
+    """Horizontal flip, one strip of rows at a time."""
+    for top in range(0, source.shape[0], TILE_ROWS):
+        bottom = top + TILE_ROWS
+        output[top:bottom] = source[top:bottom, ::-1]
+
+
+def area_downscale(source, output, factor):
+    """
+    Downscale by an integer factor, averaging every factor x factor block.
+
+    Unlike image[::factor, ::factor] (which keeps one pixel and drops the
+    rest), every source pixel contributes, so there is no aliasing.
+    Edge rows/columns that do not fill a whole block are dropped.
+    """
+    out_height, out_width, channels = output.shape
+    width = out_width * factor
+
+    # Whole blocks per strip, so a block never spans two strips
+    strip_rows = max(1, TILE_ROWS // factor)
+    for out_top in range(0, out_height, strip_rows):
+        out_bottom = min(out_top + strip_rows, out_height)
+        rows = source[out_top * factor:out_bottom * factor, :width]
+
+        blocks = rows.reshape(out_bottom - out_top, factor, out_width, factor, channels)
+        mean = blocks.mean(axis=(1, 3), dtype=np.float32)
+        np.rint(mean, out=mean)
+        output[out_top:out_bottom] = mean
+
+
+def _bilinear_axis(out_size, in_size):
+    """Source indices and weights for one axis (pixel centers aligned)."""
+    coords = (np.arange(out_size, dtype=np.float32) + 0.5) * (in_size / out_size) - 0.5
+    coords = np.clip(coords, 0, in_size - 1)
+    low = np.floor(coords).astype(np.intp)
+    high = np.minimum(low + 1, in_size - 1)
+    weight = (coords - low).astype(np.float32)
+    return low, high, weight
+
+
+def resize_bilinear(source, output):
+    """
+    Bilinear resize to output.shape, one strip of output rows at a time.
+
+    Each strip only reads the source rows it needs. For large reductions
+    run area_downscale first, since bilinear sampling alone aliases.
+    """
+    in_height, in_width, _ = source.shape
+    out_height, out_width, _ = output.shape
+
+    y_low, y_high, y_weight = _bilinear_axis(out_height, in_height)
+    x_low, x_high, x_weight = _bilinear_axis(out_width, in_width)
+    x_weight = x_weight[np.newaxis, :, np.newaxis]
+
+    strip_rows = max(1, TILE_ROWS * out_height // in_height)
+    for out_top in range(0, out_height, strip_rows):
+        out_bottom = min(out_top + strip_rows, out_height)
+
+        # Source rows needed by this strip
+        first = y_low[out_top]
+        last = y_high[out_bottom - 1]
+        rows = np.asarray(source[first:last + 1], dtype=np.float32)
+
+        top = rows[y_low[out_top:out_bottom] - first]
+        bottom = rows[y_high[out_top:out_bottom] - first]
+        wy = y_weight[out_top:out_bottom, np.newaxis, np.newaxis]
+        blended = top + (bottom - top) * wy
+
+        left = blended[:, x_low]
+        right = blended[:, x_high]
+        result = left + (right - left) * x_weight
+        np.rint(result, out=result)
+        output[out_top:out_bottom] = result
+
+
+# ============================================================
+# PER-IMAGE WORKER
+# ============================================================
+
+def process_image(path, output_dir):
+    """
+    Run every operation on one image and save the results.
+
+    Runs inside a pool worker. Scratch arrays live in a temporary folder
+    that is removed when the image is done.
+
+    Returns:
+        Dictionary with the image name, output paths, time and peak RAM
+    """
+    path = Path(path)
+    output_dir = Path(output_dir)
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="image_pipeline_") as scratch_dir:
+        source = load_as_memmap(path, scratch_dir)
+        height, width, _ = source.shape
+
+        outputs = []
+
+        def finish(name, output):
+            """Flush an output map and encode it next to the others."""
+            output.flush()
+            output_path = output_dir / f"{path.stem}_{name}.jpg"
+            save_image(output, output_path)
+            outputs.append(str(output_path))
+
+        mirrored = create_output(scratch_dir, "mirror", height, width)
+        mirror(source, mirrored[..., :3])
+        finish("mirror", mirrored)
+        del mirrored
+
+        downscaled = create_output(scratch_dir, "area", height // DOWNSCALE_FACTOR, width // DOWNSCALE_FACTOR)
+        area_downscale(source, downscaled[..., :3], DOWNSCALE_FACTOR)
+        finish(f"area_{DOWNSCALE_FACTOR}x", downscaled)
+
+        # Resize from the area-averaged image when it is still large enough
+        # (less to read, and no aliasing from sampling the full resolution)
+        resize_source = downscaled[..., :3] if downscaled.shape[1] >= RESIZE_WIDTH else source
+        resized = create_output(scratch_dir, "resize", max(1, round(height * RESIZE_WIDTH / width)), RESIZE_WIDTH)
+        resize_bilinear(resize_source, resized[..., :3])
+        finish(f"resize_{RESIZE_WIDTH}", resized)
+
+        del downscaled, resized, resize_source, source
+
+    return {
+        "image": path.name,
+        "size": f"{width}x{height}",
+        "outputs": outputs,
+        "seconds": time.perf_counter() - started,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB.
+
+    Includes touched pages of the memory-mapped files, which are backed
+    by disk and can be dropped by the OS under memory pressure.
+    Returns None where it cannot be measured (Windows without psutil).
+    """
+    try:
+        import resource
+    except ImportError:
+        # No resource module on Windows: use psutil's peak working set
+        try:
+            import psutil
+        except ImportError:
+            return None
+        peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+        return None if peak is None else peak / (1024 * 1024)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KB on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ============================================================
+# DIRECTORY PIPELINE
+# ============================================================
+
+def find_images(input_dir):
+    """Image files directly inside input_dir, sorted by name."""
+    return sorted(
+        path for path in Path(input_dir).iterdir()
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def process_directory(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, workers=WORKERS):
+    """
+    Process every image in a folder with a pool of worker processes.
+
+    Each worker handles a single image and is then replaced by a fresh
+    process (max_tasks_per_child=1), so memory from one large image is
+    returned to the OS before the next one starts.
+
+    Yields:
+        Result dictionaries from process_image, as images finish
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    images = find_images(input_dir)
+    if not images:
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(images)), max_tasks_per_child=1) as pool:
+        futures = {pool.submit(process_image, path, output_dir): path for path in images}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"image": futures[future].name, "error": str(e)}
+
+
+def main():
+    """Process INPUT_DIR and print a per-image report."""
+    print()
+    print("=" * 70)
+    print(f"   TILED IMAGE PIPELINE: {INPUT_DIR} -> {OUTPUT_DIR}")
+    print("=" * 70)
+    print()
+
+    started = time.perf_counter()
+    count = 0
+
+    print(f"{'Image':<28} {'Size':>12} {'Time (s)':>9} {'Peak RAM (MB)':>14}")
+    print("-" * 70)
+    for result in process_directory():
+        count += 1
+        if "error" in result:
+            print(f"{result['image']:<28} ERROR: {result['error']}")
+            continue
+        peak = "n/a" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.0f}"
+        print(f"{result['image']:<28} {result['size']:>12} {result['seconds']:>9.2f} {peak:>14}")
+
+    print()
+    print(f"Processed {count} images in {time.perf_counter() - started:.2f} s")
+    print()
+
+
+if __name__ == "__main__":
+    main()
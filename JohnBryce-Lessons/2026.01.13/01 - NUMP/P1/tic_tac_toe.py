@@ -1,6 +1,22 @@
+from pathlib import Path
+
 import numpy as np
 import streamlit as st
 
+from mlp import MLP
+from ttt_policy import NO_MOVE, encode, get_policy_table
+from ttt_vectorized import WIN_LINES, train_network_vectorized
+
+# Games played to train the AI when no saved weights exist
+TRAINING_GAMES = 1_000_000
+
+# Bump when the network layout changes, so old weight files are ignored
+NETWORK_FORMAT_VERSION = 1
+NETWORK_WEIGHTS_PATH = Path(__file__).parent / f"ttt_network_v{NETWORK_FORMAT_VERSION}.npz"
+
+# Play from the precomputed policy table (perfect play) instead of the network
+USE_POLICY_TABLE = True
+
 # ============================================================
 # GAME LOGIC
 # ============================================================
@@ -30,19 +46,13 @@ def check_winner(board):
     Check if there's a winner.
     Returns: 1 if X wins, -1 if O wins, 0 if no winner yet.
     """
-    # All possible winning lines (rows, columns, diagonals)
-    win_lines = [
-        [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-        [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-        [0, 4, 8], [2, 4, 6]              # diagonals
-    ]
-
-    for line in win_lines:
-        total = board[line[0]] + board[line[1]] + board[line[2]]
-        if total == 3:
-            return 1   # X wins
-        if total == -3:
-            return -1  # O wins
+    # Sum of every winning line (rows, columns, diagonals) in one product
+    line_sums = board @ WIN_LINES
+
+    if np.any(line_sums == 3):
+        return 1   # X wins
+    if np.any(line_sums == -3):
+        return -1  # O wins
 
     return 0  # No winner
 
@@ -72,42 +82,73 @@ class SimpleNeuralNetwork:
     Input: 9 neurons (board state)
     Hidden: 18 neurons
     Output: 9 neurons (score for each cell)
+    The math runs in the shared float32 MLP core (mlp.py).
     """
 
     def __init__(self):
         # Initialize weights with small random values
-        # Layer 1: input (9) -> hidden (18)
-        self.weights1 = np.random.randn(9, 18) * 0.5
-        self.bias1 = np.zeros(18)
-
-        # Layer 2: hidden (18) -> output (9)
-        self.weights2 = np.random.randn(18, 9) * 0.5
-        self.bias2 = np.zeros(9)
-
-        self.learning_rate = 0.1
-
-    def sigmoid(self, x):
-        """Sigmoid activation function."""
-        return 1 / (1 + np.exp(-np.clip(x, -500, 500)))
-
-    def sigmoid_derivative(self, x):
-        """Derivative of sigmoid for backpropagation."""
-        return x * (1 - x)
+        # Layer 1: input (9) -> hidden (18), Layer 2: hidden (18) -> output (9)
+        self.core = MLP([9, 18, 9], learning_rate=0.1, init_scale=0.5)
+
+    # Named views of the core's parameters (assigning copies into them)
+    weights1 = property(lambda self: self.core.weights[0],
+                        lambda self, value: np.copyto(self.core.weights[0], value))
+    bias1 = property(lambda self: self.core.biases[0],
+                     lambda self, value: np.copyto(self.core.biases[0], value))
+    weights2 = property(lambda self: self.core.weights[1],
+                        lambda self, value: np.copyto(self.core.weights[1], value))
+    bias2 = property(lambda self: self.core.biases[1],
+                     lambda self, value: np.copyto(self.core.biases[1], value))
+
+    @property
+    def learning_rate(self):
+        return self.core.learning_rate
+
+    @learning_rate.setter
+    def learning_rate(self, value):
+        self.core.learning_rate = value
+
+    def save(self, path, num_games):
+        """Save the weights, format version and number of training games."""
+        np.savez(
+            path,
+            format_version=NETWORK_FORMAT_VERSION,
+            num_games=num_games,
+            weights1=self.weights1,
+            bias1=self.bias1,
+            weights2=self.weights2,
+            bias2=self.bias2,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a network saved with save().
+        Returns (network, num_games), or (None, 0) if the file is missing,
+        from another format version or has the wrong shapes.
+        """
+        network = cls()
+        try:
+            with np.load(path) as data:
+                if int(data["format_version"]) != NETWORK_FORMAT_VERSION:
+                    return None, 0
+                for name in ("weights1", "bias1", "weights2", "bias2"):
+                    if data[name].shape != getattr(network, name).shape:
+                        return None, 0
+                    setattr(network, name, data[name])
+                num_games = int(data["num_games"])
+        except (OSError, KeyError, ValueError):
+            return None, 0
+
+        return network, num_games
 
     def forward(self, board):
         """
         Forward pass: compute output scores for each cell.
-        Returns scores between 0 and 1.
+        board: one (9,) board or an (N, 9) batch
+        Returns scores between 0 and 1 (valid until the next forward call).
         """
-        # Hidden layer
-        self.hidden_input = np.dot(board, self.weights1) + self.bias1
-        self.hidden_output = self.sigmoid(self.hidden_input)
-
-        # Output layer
-        self.output_input = np.dot(self.hidden_output, self.weights2) + self.bias2
-        self.output = self.sigmoid(self.output_input)
-
-        return self.output
+        return self.core.forward(board)
 
     def train(self, board, target):
         """
@@ -115,36 +156,48 @@ class SimpleNeuralNetwork:
         board: the input board state
         target: the desired output (what move was good/bad)
         """
-        # Forward pass
-        output = self.forward(board)
+        self.core.train_batch(board, target)
 
-        # Calculate error
-        output_error = target - output
+    def train_batch(self, boards, moves, rewards):
+        """
+        Train the network on a minibatch of played moves at once.
+        boards: (N, 9) board states
+        moves: (N,) cell chosen in each state
+        rewards: (N,) reward of the game each move came from
+        Like train, the target is the current output with the chosen cell
+        set to the reward, so only the chosen cell has an error.
+        The update uses the average gradient over the minibatch.
+        """
+        rows = np.arange(len(boards))
 
-        # Backpropagation
-        # Output layer gradient
-        output_delta = output_error * self.sigmoid_derivative(output)
+        output = self.core.forward(boards)
 
-        # Hidden layer error and gradient
-        hidden_error = np.dot(output_delta, self.weights2.T)
-        hidden_delta = hidden_error * self.sigmoid_derivative(self.hidden_output)
+        # Output error is zero everywhere except the chosen cell
+        error = self.core.output_error()
+        error[rows, moves] = rewards - output[rows, moves]
 
-        # Update weights and biases
-        self.weights2 += self.learning_rate * np.outer(self.hidden_output, output_delta)
-        self.bias2 += self.learning_rate * output_delta
-        self.weights1 += self.learning_rate * np.outer(board, hidden_delta)
-        self.bias1 += self.learning_rate * hidden_delta
+        self.core.backward()
 
 
 # ============================================================
 # AI DECISION MAKING
 # ============================================================
 
-def ai_choose_move(network, board, player=1):
+def ai_choose_move(network, board, player=1, policy_table=None):
     """
     Use the neural network to choose the best valid move.
     player: 1 for X (AI), -1 for O
+    policy_table: optional precomputed table (see ttt_policy.py); when
+    given, the move is a single lookup instead of a forward pass, and
+    network may be None
     """
+    if policy_table is not None:
+        move = policy_table[encode(board * player)]
+        if move != NO_MOVE:
+            return int(move)
+        if network is None:
+            return None
+
     # Get network scores for all cells
     scores = network.forward(board * player)
 
@@ -248,13 +301,32 @@ def train_network(network, num_games=1000):
 # STREAMLIT WEB UI
 # ============================================================
 
-# Train the neural network once when app starts
+# Load (or train once and save) the neural network when app starts
 @st.cache_resource
 def get_trained_network():
-    """Train and cache the neural network."""
+    """
+    Load saved weights, training and saving them first if needed.
+    Returns (network, num_games it was trained on).
+    """
+    network, num_games = SimpleNeuralNetwork.load(NETWORK_WEIGHTS_PATH)
+    if network is not None:
+        return network, num_games
+
     network = SimpleNeuralNetwork()
-    network = train_network(network, num_games=1000)
-    return network
+    network = train_network_vectorized(network, num_games=TRAINING_GAMES)
+    try:
+        network.save(NETWORK_WEIGHTS_PATH, TRAINING_GAMES)
+    except OSError as e:
+        print(f"Could not save network weights to {NETWORK_WEIGHTS_PATH}: {e}")
+    return network, TRAINING_GAMES
+
+
+@st.cache_resource
+def get_ai_policy_table():
+    """Load the precomputed policy table, or None when it is disabled."""
+    if not USE_POLICY_TABLE:
+        return None
+    return get_policy_table()
 
 
 def init_game_state():
@@ -274,7 +346,7 @@ def reset_game():
     st.session_state.message = "Your turn! Click a cell to play."
 
 
-def make_move(cell_index, network):
+def make_move(cell_index, network, policy_table=None):
     """Handle a cell click - human move followed by AI move."""
     board = st.session_state.board
 
@@ -297,7 +369,7 @@ def make_move(cell_index, network):
         return
 
     # AI move (X = 1)
-    ai_move = ai_choose_move(network, board, player=1)
+    ai_move = ai_choose_move(network, board, player=1, policy_table=policy_table)
     if ai_move is not None:
         board[ai_move] = 1
 
@@ -328,65 +400,77 @@ def get_cell_display(value):
 # MAIN STREAMLIT APP
 # ============================================================
 
-# Page config
-st.set_page_config(page_title="Tic-Tac-Toe AI", page_icon="🎮", layout="centered")
-
-# Load trained network
-network = get_trained_network()
-
-# Initialize game state
-init_game_state()
-
-# Title
-st.title("🎮 Tic-Tac-Toe")
-st.markdown("**You are O** | **AI is X**")
-st.markdown("---")
-
-# Game message
-if st.session_state.game_over:
-    st.success(st.session_state.message)
-else:
-    st.info(st.session_state.message)
-
-# Game board - 3x3 grid of buttons
-board = st.session_state.board
-
-# Custom CSS for larger buttons
-st.markdown("""
-<style>
-div.stButton > button {
-    font-size: 48px;
-    height: 100px;
-    width: 100px;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Create 3x3 grid
-for row in range(3):
-    cols = st.columns(3)
-    for col in range(3):
-        cell_index = row * 3 + col
-        cell_value = board[cell_index]
-        display = get_cell_display(cell_value)
-
-        with cols[col]:
-            # Button for each cell
-            if st.button(
-                display if display else " ",
-                key=f"cell_{cell_index}",
-                disabled=st.session_state.game_over or cell_value != 0
-            ):
-                make_move(cell_index, network)
-                st.rerun()
-
-st.markdown("---")
-
-# New Game button
-if st.button("🔄 New Game", type="primary"):
-    reset_game()
-    st.rerun()
-
-# Footer
-st.markdown("---")
-st.caption("Neural Network AI trained on 1000 self-play games")
+def main():
+    """Render the Streamlit app (Streamlit runs this file as __main__)."""
+    # Page config
+    st.set_page_config(page_title="Tic-Tac-Toe AI", page_icon="🎮", layout="centered")
+
+    # Load the policy table if enabled, otherwise the trained network
+    policy_table = get_ai_policy_table()
+    network, num_games = None, 0
+    if policy_table is None:
+        network, num_games = get_trained_network()
+
+    # Initialize game state
+    init_game_state()
+
+    # Title
+    st.title("🎮 Tic-Tac-Toe")
+    st.markdown("**You are O** | **AI is X**")
+    st.markdown("---")
+
+    # Game message
+    if st.session_state.game_over:
+        st.success(st.session_state.message)
+    else:
+        st.info(st.session_state.message)
+
+    # Game board - 3x3 grid of buttons
+    board = st.session_state.board
+
+    # Custom CSS for larger buttons
+    st.markdown("""
+    <style>
+    div.stButton > button {
+        font-size: 48px;
+        height: 100px;
+        width: 100px;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+    # Create 3x3 grid
+    for row in range(3):
+        cols = st.columns(3)
+        for col in range(3):
+            cell_index = row * 3 + col
+            cell_value = board[cell_index]
+            display = get_cell_display(cell_value)
+
+            with cols[col]:
+                # Button for each cell
+                if st.button(
+                    display if display else " ",
+                    key=f"cell_{cell_index}",
+                    disabled=st.session_state.game_over or cell_value != 0
+                ):
+                    make_move(cell_index, network, policy_table)
+                    st.rerun()
+
+    st.markdown("---")
+
+    # New Game button
+    if st.button("🔄 New Game", type="primary"):
+        reset_game()
+        st.rerun()
+
+    # Footer
+    st.markdown("---")
+    if policy_table is not None:
+        st.caption("AI plays from a precomputed table of every reachable position")
+    else:
+        st.caption(f"Neural Network AI trained on {num_games:,} self-play games")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Tic-Tac-Toe Policy Table
+========================
+Precomputed best move for every reachable tic-tac-toe position.
+
+Tic-tac-toe is small enough to solve completely: there are only a few
+thousand reachable positions. A memoized minimax search visits each of
+them once and stores the best move in a flat array, so choosing a move
+at play time is a single array lookup.
+
+Boards are stored from the point of view of the player to move
+(+1 = player to move, -1 = opponent, 0 = empty) and indexed in base 3:
+    index = sum((board[i] + 1) * 3**i)
+
+Build (or rebuild) the table with:
+    python ttt_policy.py
+"""
+
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ttt_vectorized import winners
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+# Bump when the table layout or search rules change
+POLICY_FORMAT_VERSION = 1
+
+POLICY_TABLE_PATH = Path(__file__).parent / f"ttt_policy_v{POLICY_FORMAT_VERSION}.npz"
+
+NUM_STATES = 3 ** 9
+
+# Table value for positions with no move (unreachable or game over)
+NO_MOVE = -1
+
+# Weight of each cell in the base-3 index
+POWERS = 3 ** np.arange(9)
+
+
+# ============================================================
+# ENCODING
+# ============================================================
+
+def encode(board):
+    """Base-3 index of a board seen from the player to move."""
+    return int(np.dot(np.asarray(board) + 1, POWERS))
+
+
+# ============================================================
+# MEMOIZED SEARCH
+# ============================================================
+
+def build_policy_table():
+    """
+    Solve tic-tac-toe with memoized minimax (negamax).
+
+    Starting from the empty board, the search flips the board after every
+    move so it is always seen from the player to move. That covers every
+    position reachable whichever side starts.
+
+    Returns:
+        (NUM_STATES,) int8 array: best cell per board index, NO_MOVE otherwise
+    """
+    table = np.full(NUM_STATES, NO_MOVE, dtype=np.int8)
+    values = {}  # board index -> value for the player to move
+
+    def negamax(board):
+        """Value of the position for the player to move (faster wins score higher)."""
+        index = encode(board)
+        if index in values:
+            return values[index]
+
+        empty = np.flatnonzero(board == 0)
+
+        # The opponent just moved, so only they can have a line
+        if winners(board[np.newaxis])[0] == -1:
+            value = -(len(empty) + 1)
+        elif len(empty) == 0:
+            value = 0
+        else:
+            value = None
+            for move in empty:
+                board[move] = 1
+                score = -negamax(-board)
+                board[move] = 0
+                if value is None or score > value:
+                    value = score
+                    table[index] = move
+
+        values[index] = value
+        return value
+
+    negamax(np.zeros(9, dtype=np.int8))
+    return table
+
+
+# ============================================================
+# PERSISTENCE
+# ============================================================
+
+def save_policy_table(table, path=POLICY_TABLE_PATH):
+    """Save the table together with its format version."""
+    np.savez_compressed(path, table=table, format_version=POLICY_FORMAT_VERSION)
+
+
+def load_policy_table(path=POLICY_TABLE_PATH):
+    """
+    Load a saved table.
+
+    Returns:
+        The table, or None if the file is missing or from another version
+    """
+    try:
+        with np.load(path) as data:
+            if int(data["format_version"]) != POLICY_FORMAT_VERSION:
+                return None
+            table = data["table"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+    if table.shape != (NUM_STATES,):
+        return None
+    return table
+
+
+def get_policy_table(path=POLICY_TABLE_PATH):
+    """Load the table from disk, building and saving it on first use."""
+    table = load_policy_table(path)
+    if table is None:
+        table = build_policy_table()
+        try:
+            save_policy_table(table, path)
+        except OSError as e:
+            print(f"Could not save policy table to {path}: {e}")
+    return table
+
+
+def main():
+    """Build the table, save it and time a cold load."""
+    started = time.perf_counter()
+    table = build_policy_table()
+    build_seconds = time.perf_counter() - started
+
+    save_policy_table(table)
+
+    started = time.perf_counter()
+    load_policy_table()
+    load_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Positions with a move: {(table != NO_MOVE).sum()}")
+    print(f"Build time: {build_seconds:.2f} s")
+    print(f"Saved to {POLICY_TABLE_PATH} ({POLICY_TABLE_PATH.stat().st_size / 1024:.1f} KB)")
+    print(f"Load time: {load_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Vectorized Tic-Tac-Toe Training
+===============================
+Plays thousands of tic-tac-toe games at the same time and trains the
+network on the recorded moves in minibatches.
+
+Instead of one board at a time, every game in a round is a row of an
+(N, 9) board array:
+    - Moves for all games are chosen with one batched forward pass
+    - Winners are found with one matrix product against WIN_LINES
+    - Learning uses minibatched forward/backward passes
+
+The network only needs two methods:
+    forward(boards)                      -> (N, 9) scores
+    train_batch(boards, moves, rewards)  -> one minibatch gradient step
+
+Benchmark against the original loop:
+    python ttt_vectorized.py
+"""
+
+import time
+
+import numpy as np
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+# Games played in parallel per round (the network is updated between rounds)
+GAMES_PER_ROUND = 10_000
+
+# Recorded moves per gradient step
+MINIBATCH_SIZE = 256
+
+# Reward per game result: loss (O wins), draw, win (X wins)
+REWARD_LOSS = 0.0
+REWARD_DRAW = 0.5
+REWARD_WIN = 1.0
+
+
+# ============================================================
+# WIN DETECTION
+# ============================================================
+
+# All possible winning lines (rows, columns, diagonals)
+_LINES = [
+    [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
+    [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
+    [0, 4, 8], [2, 4, 6]              # diagonals
+]
+
+# (9, 8) matrix: column j has a 1 for every cell in winning line j.
+# boards @ WIN_LINES gives the sum of each line for every board.
+# float32 so the product runs through BLAS (integer matmul does not).
+WIN_LINES = np.zeros((9, 8), dtype=np.float32)
+for _line_index, _cells in enumerate(_LINES):
+    WIN_LINES[_cells, _line_index] = 1
+
+
+def winners(boards):
+    """
+    Find the winner of many boards at once.
+
+    Args:
+        boards: (N, 9) array with 1 for X, -1 for O, 0 for empty
+
+    Returns:
+        (N,) int8 array: 1 if X wins, -1 if O wins, 0 if no winner yet
+    """
+    line_sums = boards.astype(np.float32, copy=False) @ WIN_LINES  # (N, 8)
+
+    result = np.zeros(len(boards), dtype=np.int8)
+    result[(line_sums == 3).any(axis=1)] = 1
+    result[(line_sums == -3).any(axis=1)] = -1
+    return result
+
+
+# ============================================================
+# PARALLEL SELF-PLAY
+# ============================================================
+
+def play_games(network, num_games, rng):
+    """
+    Play many games of AI (X) against a random opponent (O) at once.
+
+    X always moves first, so after each step every still-running game
+    has the same player to move.
+
+    Args:
+        network: Network with a batched forward(boards) method
+        num_games: Number of games to play simultaneously
+        rng: numpy Generator for the random opponent
+
+    Returns:
+        states: (M, 9) boards seen by the AI before each of its moves
+        moves: (M,) cell chosen in each state
+        game_ids: (M,) game each move belongs to
+        results: (num_games,) winner of each game (1, -1 or 0 for draw)
+    """
+    # float32 boards feed both the network and the win check without copies
+    boards = np.zeros((num_games, 9), dtype=np.float32)
+    active = np.ones(num_games, dtype=bool)
+    results = np.zeros(num_games, dtype=np.int8)
+
+    recorded_states = []
+    recorded_moves = []
+    recorded_games = []
+
+    player = 1  # X starts
+    for _ in range(9):
+        game_ids = np.flatnonzero(active)
+        if len(game_ids) == 0:
+            break
+
+        current = boards[game_ids]
+        empty = current == 0
+
+        if player == 1:
+            # AI's turn: highest-scoring empty cell (first one on ties)
+            scores = network.forward(current)
+            moves = np.where(empty, scores, -np.inf).argmax(axis=1)
+
+            recorded_states.append(current)
+            recorded_moves.append(moves)
+            recorded_games.append(game_ids)
+        else:
+            # Random opponent: random score for each empty cell
+            scores = rng.random(current.shape)
+            moves = np.where(empty, scores, -1.0).argmax(axis=1)
+
+        boards[game_ids, moves] = player
+
+        # Check which of the games that just moved are now over
+        current = boards[game_ids]
+        winner = winners(current)
+        finished = (winner != 0) | (current != 0).all(axis=1)
+
+        results[game_ids[finished]] = winner[finished]
+        active[game_ids[finished]] = False
+
+        player = -player  # Switch player
+
+    return (
+        np.concatenate(recorded_states),
+        np.concatenate(recorded_moves),
+        np.concatenate(recorded_games),
+        results,
+    )
+
+
+# ============================================================
+# TRAINING
+# ============================================================
+
+def train_on_moves(network, states, moves, rewards, batch_size, rng):
+    """
+    Learn from recorded moves in shuffled minibatches.
+
+    As in the original loop, each chosen move's score is pushed towards
+    the reward of the game it came from.
+    """
+    order = rng.permutation(len(states))
+
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        network.train_batch(states[batch], moves[batch], rewards[batch])
+
+
+def train_network_vectorized(network, num_games=1_000_000, games_per_round=GAMES_PER_ROUND,
+                             batch_size=MINIBATCH_SIZE, seed=None, verbose=True):
+    """
+    Train the neural network on many games played in parallel.
+
+    Each round plays `games_per_round` games with the current network,
+    then trains on every AI move from those games.
+
+    Args:
+        network: Network with forward(boards) and train_batch(boards, moves, rewards)
+        num_games: Total number of games to play
+        games_per_round: Games played simultaneously per round
+        batch_size: Moves per gradient step
+        seed: Seed for the random opponent and shuffling
+        verbose: Print progress after each round
+
+    Returns:
+        network: The trained network
+    """
+    rng = np.random.default_rng(seed)
+
+    # Indexed by result + 1: loss (-1), draw (0), win (1)
+    reward_table = np.array([REWARD_LOSS, REWARD_DRAW, REWARD_WIN])
+
+    if verbose:
+        print(f"Training for {num_games} games ({games_per_round} in parallel)...")
+
+    wins = losses = draws = 0
+    games_played = 0
+
+    while games_played < num_games:
+        round_games = min(games_per_round, num_games - games_played)
+
+        states, moves, game_ids, results = play_games(network, round_games, rng)
+
+        rewards = reward_table[results[game_ids] + 1]
+        train_on_moves(network, states, moves, rewards, batch_size, rng)
+
+        wins += int((results == 1).sum())
+        losses += int((results == -1).sum())
+        draws += int((results == 0).sum())
+        games_played += round_games
+
+        if verbose:
+            print(f"Games: {games_played} | Wins: {wins} | Losses: {losses} | Draws: {draws}")
+
+    if verbose:
+        print("\nTraining complete!")
+        print(f"Final stats - Wins: {wins}, Losses: {losses}, Draws: {draws}")
+        print(f"Win rate: {wins / num_games * 100:.1f}%")
+
+    return network
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+
+def evaluate(network, num_games=10_000, seed=0):
+    """Win/loss/draw rates (%) of the greedy network against a random opponent."""
+    _, _, _, results = play_games(network, num_games, np.random.default_rng(seed))
+    return {
+        "win": 100 * (results == 1).mean(),
+        "loss": 100 * (results == -1).mean(),
+        "draw": 100 * (results == 0).mean(),
+    }
+
+
+def main():
+    """Compare the original per-game loop with the vectorized engine."""
+    # Imported here to avoid a circular import (tic_tac_toe uses this module)
+    from tic_tac_toe import SimpleNeuralNetwork, train_network
+
+    print("=" * 60)
+    print("   ORIGINAL LOOP: 1,000 games")
+    print("=" * 60)
+    np.random.seed(0)
+    network = SimpleNeuralNetwork()
+    started = time.perf_counter()
+    train_network(network, num_games=1000)
+    loop_seconds = time.perf_counter() - started
+    loop_eval = evaluate(network)
+
+    print()
+    print("=" * 60)
+    print("   VECTORIZED ENGINE: 1,000,000 games")
+    print("=" * 60)
+    np.random.seed(0)
+    network = SimpleNeuralNetwork()
+    started = time.perf_counter()
+    train_network_vectorized(network, num_games=1_000_000, seed=0, verbose=False)
+    vector_seconds = time.perf_counter() - started
+    vector_eval = evaluate(network)
+
+    print()
+    print(f"{'':<22} {'Time (s)':>9} {'Games/s':>10} {'Win %':>7} {'Loss %':>7} {'Draw %':>7}")
+    print("-" * 66)
+    for name, seconds, games, stats in [
+        ("Loop (1k games)", loop_seconds, 1000, loop_eval),
+        ("Vectorized (1M games)", vector_seconds, 1_000_000, vector_eval),
+    ]:
+        print(f"{name:<22} {seconds:>9.2f} {games / seconds:>10.0f} "
+              f"{stats['win']:>7.1f} {stats['loss']:>7.1f} {stats['draw']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
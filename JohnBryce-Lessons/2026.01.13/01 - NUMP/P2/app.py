@@ -6,18 +6,40 @@ using a trained CNN model.
 
 Run with:
     uvicorn app:app --reload
+
+Inference runs through a micro-batching engine (see inference_engine.py):
+concurrent uploads are grouped into one forward pass on a worker thread,
+so the event loop is never blocked by the model.
+
+Repeated uploads of the same image are answered from a content-addressed
+cache (see prediction_cache.py) that is cleared whenever the model
+file changes.
 """
 
-import io
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torchvision import transforms
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
-from PIL import Image
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from bulk_classifier import (
+    classify_stream,
+    is_archive,
+    iter_archive_images,
+    iter_uploaded_images,
+    to_ndjson,
+)
+from inference_engine import InferenceEngine
+from model_runtime import TORCHSCRIPT_FP32_PATH, TORCHSCRIPT_INT8_PATH, load_fastest_model
+from prediction_cache import PredictionCache
+from preprocessing import preprocess
 
 
 # ============================================================
@@ -31,6 +53,14 @@ IMAGE_SIZE = 64
 HIGH_CONFIDENCE_THRESHOLD = 0.8
 MEDIUM_CONFIDENCE_THRESHOLD = 0.5
 
+# Micro-batching settings
+MAX_BATCH_SIZE = 16
+MAX_BATCH_WAIT_MS = 5.0
+
+# Prediction cache settings
+CACHE_MAX_ENTRIES = 10_000
+MODEL_CHECK_INTERVAL_S = 1.0
+
 
 # ============================================================
 # CNN MODEL DEFINITION
@@ -86,36 +116,20 @@ class LilyCNN(nn.Module):
 # IMAGE PREPROCESSING
 # ============================================================
 
-# Transform pipeline matching training preprocessing
-preprocess_transform = transforms.Compose([
-    transforms.Resize((IMAGE_SIZE, IMAGE_SIZE)),
-    transforms.ToTensor(),
-    transforms.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225]
-    )
-])
-
-
 def preprocess_image(image_bytes: bytes) -> torch.Tensor:
     """
     Preprocess an image for model inference.
 
+    Uses the shared preprocessing module (same as training), which
+    decodes JPEGs at reduced resolution before resizing to 64x64.
+
     Args:
         image_bytes: Raw image bytes from upload
 
     Returns:
         Tensor of shape (1, 3, 64, 64) ready for model
     """
-    # Load image from bytes
-    image = Image.open(io.BytesIO(image_bytes))
-
-    # Convert to RGB (handles grayscale, RGBA, etc.)
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-
-    # Apply transforms
-    tensor = preprocess_transform(image)
+    tensor = preprocess(image_bytes, IMAGE_SIZE)
 
     # Add batch dimension
     tensor = tensor.unsqueeze(0)
@@ -127,68 +141,67 @@ def preprocess_image(image_bytes: bytes) -> torch.Tensor:
 # MODEL LOADING
 # ============================================================
 
-def load_model() -> LilyCNN:
+def load_model():
     """
-    Load the trained CNN model from disk.
+    Load the fastest available trained model from disk.
+
+    Prefers the exported INT8 / fp32 TorchScript artifacts (see
+    export_model.py) and falls back to rebuilding LilyCNN from the
+    state dict. The model is warmed up before it is returned.
 
     Returns:
-        LilyCNN model in evaluation mode
+        model: Model in evaluation mode
+        runtime: Dictionary describing which artifact was loaded
     """
-    model = LilyCNN()
+    return load_fastest_model(LilyCNN, MODEL_PATH, IMAGE_SIZE)
 
-    if MODEL_PATH.exists():
-        # Load trained weights
-        state_dict = torch.load(MODEL_PATH, map_location=torch.device('cpu'))
-        model.load_state_dict(state_dict)
-        print(f"Loaded model weights from {MODEL_PATH}")
-    else:
-        print(f"WARNING: Model file not found at {MODEL_PATH}")
-        print("Using untrained model - predictions will be random!")
 
-    # Set to evaluation mode (disables dropout, etc.)
-    model.eval()
+def model_files_version() -> str:
+    """
+    Short version string for the model files currently on disk.
 
-    return model
+    Changes whenever the state dict or an exported artifact is
+    written, so cached predictions never outlive the model they
+    came from.
+    """
+    stamps = [
+        f"{path.name}@{path.stat().st_mtime_ns}"
+        for path in (MODEL_PATH, TORCHSCRIPT_INT8_PATH, TORCHSCRIPT_FP32_PATH)
+        if path.exists()
+    ]
+    if not stamps:
+        return "untrained"
+    return hashlib.sha1(";".join(stamps).encode()).hexdigest()[:12]
 
 
 # ============================================================
 # PREDICTION
 # ============================================================
 
-def predict(model: LilyCNN, image_tensor: torch.Tensor) -> dict:
+def interpret_probability(lily_prob: float) -> dict:
     """
-    Run inference on a preprocessed image.
+    Turn a lily probability into the API response fields.
 
     Args:
-        model: Trained LilyCNN model
-        image_tensor: Preprocessed image tensor
+        lily_prob: Probability of class 1 (lily), between 0 and 1
 
     Returns:
         Dictionary with prediction, confidence, and note
     """
-    with torch.no_grad():
-        # Forward pass
-        outputs = model(image_tensor)
-
-        # Apply softmax to get probabilities
-        probabilities = F.softmax(outputs, dim=1)
-
-        # Extract lily probability (class 1)
-        lily_prob = probabilities[0, 1].item()
-        confidence = lily_prob * 100
-
-        # Determine prediction based on thresholds
-        if lily_prob >= HIGH_CONFIDENCE_THRESHOLD:
-            prediction = "Lily"
-            note = "High confidence detection"
-        elif lily_prob >= MEDIUM_CONFIDENCE_THRESHOLD:
-            prediction = "Possibly Lily"
-            note = "Medium confidence - consider manual review"
-        else:
-            prediction = "Not Lily"
-            not_lily_confidence = (1 - lily_prob) * 100
-            note = f"Likely another flower type ({not_lily_confidence:.1f}% confidence)"
-            confidence = not_lily_confidence
+    confidence = lily_prob * 100
+
+    # Determine prediction based on thresholds
+    if lily_prob >= HIGH_CONFIDENCE_THRESHOLD:
+        prediction = "Lily"
+        note = "High confidence detection"
+    elif lily_prob >= MEDIUM_CONFIDENCE_THRESHOLD:
+        prediction = "Possibly Lily"
+        note = "Medium confidence - consider manual review"
+    else:
+        prediction = "Not Lily"
+        not_lily_confidence = (1 - lily_prob) * 100
+        note = f"Likely another flower type ({not_lily_confidence:.1f}% confidence)"
+        confidence = not_lily_confidence
 
     return {
         "prediction": prediction,
@@ -197,19 +210,107 @@ def predict(model: LilyCNN, image_tensor: torch.Tensor) -> dict:
     }
 
 
+def predict_batch(model: LilyCNN, image_tensors: list) -> list:
+    """
+    Run one forward pass over several preprocessed images.
+
+    Args:
+        model: Trained LilyCNN model
+        image_tensors: List of tensors, each of shape (1, 3, 64, 64)
+
+    Returns:
+        List of result dictionaries, in the same order as the input
+    """
+    with torch.inference_mode():
+        # Forward pass over the whole batch
+        outputs = model(torch.cat(image_tensors, dim=0))
+
+        # Apply softmax to get probabilities
+        probabilities = F.softmax(outputs, dim=1)
+
+        # Extract lily probability (class 1) for every image at once
+        lily_probs = probabilities[:, 1].tolist()
+
+    return [interpret_probability(lily_prob) for lily_prob in lily_probs]
+
+
+def predict(model: LilyCNN, image_tensor: torch.Tensor) -> dict:
+    """
+    Run inference on a preprocessed image.
+
+    Args:
+        model: Trained LilyCNN model
+        image_tensor: Preprocessed image tensor
+
+    Returns:
+        Dictionary with prediction, confidence, and note
+    """
+    return predict_batch(model, [image_tensor])[0]
+
+
 # ============================================================
 # FASTAPI APPLICATION
 # ============================================================
 
+# Load model at startup
+model, model_runtime = load_model()
+model_version = model_files_version()
+
+# Content-addressed cache of /predict results
+prediction_cache = PredictionCache(model_version, max_entries=CACHE_MAX_ENTRIES)
+model_reload_lock = asyncio.Lock()
+last_model_check = time.monotonic()
+
+
+async def reload_model_if_changed():
+    """
+    Reload the model (and drop cached results) when its files change.
+
+    The files are checked at most once per MODEL_CHECK_INTERVAL_S.
+    """
+    global model, model_runtime, model_version, last_model_check
+
+    now = time.monotonic()
+    if now - last_model_check < MODEL_CHECK_INTERVAL_S:
+        return
+    last_model_check = now
+
+    if model_files_version() == model_version:
+        return
+
+    async with model_reload_lock:
+        version = model_files_version()
+        if version == model_version:
+            return
+
+        print("Model files changed - reloading model")
+        model, model_runtime = await run_in_threadpool(load_model)
+        model_version = version
+        prediction_cache.set_model_version(version)
+
+# Batches concurrent /predict calls into single forward passes
+engine = InferenceEngine(
+    handler=lambda image_tensors: predict_batch(model, image_tensors),
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_BATCH_WAIT_MS
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the inference worker with the app and stop it on shutdown."""
+    engine.start()
+    yield
+    engine.stop()
+
+
 app = FastAPI(
     title="Lily Flower Classifier API",
     description="Classify flower images as Lily or Not Lily using a CNN model",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Load model at startup
-model = load_model()
-
 
 @app.get("/")
 async def root():
@@ -217,7 +318,7 @@ async def root():
     return {
         "service": "Lily Flower Classifier",
         "status": "running",
-        "model_loaded": MODEL_PATH.exists()
+        "model_loaded": model_runtime["trained"]
     }
 
 
@@ -254,11 +355,22 @@ async def predict_endpoint(image: UploadFile = File(...)):
         # Read image bytes
         image_bytes = await image.read()
 
-        # Preprocess image
-        image_tensor = preprocess_image(image_bytes)
+        # Same bytes + same model = same answer
+        await reload_model_if_changed()
+        cache_key = await run_in_threadpool(prediction_cache.key_for, image_bytes)
+        result = prediction_cache.get(cache_key)
+        if result is not None:
+            return JSONResponse(content=result)
+
+        started = time.perf_counter()
 
-        # Run prediction
-        result = predict(model, image_tensor)
+        # Preprocess image (CPU-bound, so keep it off the event loop)
+        image_tensor = await run_in_threadpool(preprocess_image, image_bytes)
+
+        # Queue for the batching engine and wait without blocking the loop
+        result = await asyncio.wrap_future(engine.submit(image_tensor))
+
+        prediction_cache.put(cache_key, result, (time.perf_counter() - started) * 1000)
 
         return JSONResponse(content=result)
 
@@ -269,6 +381,38 @@ async def predict_endpoint(image: UploadFile = File(...)):
         )
 
 
+@app.post("/predict/bulk")
+async def predict_bulk_endpoint(files: list[UploadFile] = File(...)):
+    """
+    Classify many images in one request.
+
+    Accepts either a single .zip / .tar(.gz) archive or several image
+    files. Results are streamed back as NDJSON (one JSON object per
+    image, then a summary line) while the rest is still processing.
+
+    Args:
+        files: One archive, or a list of image files (JPG or PNG)
+
+    Returns:
+        Streaming NDJSON response
+    """
+    if len(files) == 1 and is_archive(files[0].filename or ""):
+        archive = files[0]
+        images = iter_archive_images(archive.file, archive.filename)
+    else:
+        images = iter_uploaded_images(files)
+
+    results = classify_stream(
+        images,
+        preprocess=preprocess_image,
+        predict_batch=lambda image_tensors: predict_batch(model, image_tensors)
+    )
+
+    # Starlette runs this sync generator in a worker thread, so the event
+    # loop stays free while the archive is decoded and classified
+    return StreamingResponse(to_ndjson(results), media_type="application/x-ndjson")
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check with model status."""
@@ -276,9 +420,28 @@ async def health_check():
         "status": "healthy",
         "model_file": str(MODEL_PATH),
         "model_exists": MODEL_PATH.exists(),
+        "runtime": model_runtime,
         "image_size": IMAGE_SIZE,
         "thresholds": {
             "high_confidence": HIGH_CONFIDENCE_THRESHOLD,
             "medium_confidence": MEDIUM_CONFIDENCE_THRESHOLD
         }
     }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Micro-batching metrics: batch sizes and queue/batch latency."""
+    return {
+        "engine_running": engine.running,
+        "queue_depth": engine.queue_depth(),
+        "max_batch_size": engine.max_batch_size,
+        "max_wait_ms": engine.max_wait_ms,
+        **engine.metrics.snapshot()
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Prediction cache hit rate, size and latency saved."""
+    return prediction_cache.stats()
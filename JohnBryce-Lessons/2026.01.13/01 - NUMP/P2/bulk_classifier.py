@@ -0,0 +1,238 @@
+"""
+Bulk Lily Classification
+========================
+Classify many images in one request and stream the results back
+as NDJSON (one JSON object per line) while the rest is still running.
+
+Inputs:
+    - A .zip archive
+    - A .tar / .tar.gz / .tgz / .tar.bz2 / .tar.xz archive (read as a stream)
+    - A list of individual image files (multipart batch)
+
+Pipeline:
+    archive members -> decode + preprocess (thread pool) -> batches -> model -> NDJSON
+
+Memory stays bounded no matter how large the archive is: only a fixed
+window of images is being decoded at any time, and results are written
+out as soon as each batch is done.
+"""
+
+import json
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+# Images per forward pass
+BULK_BATCH_SIZE = 64
+
+# Threads decoding and resizing images
+DECODE_WORKERS = 4
+
+# Most images being decoded (or waiting for a batch) at once
+MAX_IN_FLIGHT = BULK_BATCH_SIZE * 2
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+ZIP_EXTENSIONS = (".zip",)
+# Full endings only: a plain .gz / .bz2 / .xz file is not a tar archive
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+class ArchiveError(Exception):
+    """An archive could not be opened, or broke off while being read."""
+
+    def __init__(self, filename: str, message: str):
+        super().__init__(message)
+        self.filename = filename
+
+
+# ============================================================
+# INPUT SOURCES
+# ============================================================
+
+def archive_type(filename: str):
+    """Return "zip", "tar" or None for a filename."""
+    name = filename.lower()
+    if name.endswith(ZIP_EXTENSIONS):
+        return "zip"
+    if name.endswith(TAR_EXTENSIONS):
+        return "tar"
+    return None
+
+
+def is_archive(filename: str) -> bool:
+    """Check whether a filename looks like a supported archive."""
+    return archive_type(filename) is not None
+
+
+def _is_image_name(name: str) -> bool:
+    """Skip folders, macOS metadata and non-image files."""
+    path = Path(name)
+    if path.name.startswith(".") or "__MACOSX" in path.parts:
+        return False
+    return path.suffix.lower() in IMAGE_EXTENSIONS
+
+
+def iter_archive_images(fileobj, filename: str):
+    """
+    Yield (name, image_bytes) for every image inside an archive.
+
+    Members are read one at a time, so only the current image is held
+    in memory. Tar archives are read as a forward-only stream.
+
+    Args:
+        fileobj: Binary file object with the archive contents
+        filename: Original filename, used to detect the archive type
+
+    Yields:
+        (member_name, image_bytes) tuples
+
+    Raises:
+        ArchiveError: If the archive cannot be opened or read to the end
+    """
+    kind = archive_type(filename)
+    if kind is None:
+        raise ArchiveError(filename, f"Unsupported archive type: {filename}")
+
+    try:
+        if kind == "zip":
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not _is_image_name(info.filename):
+                        continue
+                    yield info.filename, archive.read(info)
+        else:
+            # "r|*" = streaming mode with automatic compression detection
+            with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile() or not _is_image_name(member.name):
+                        continue
+                    yield member.name, archive.extractfile(member).read()
+    except Exception as e:
+        # Corrupt, truncated, or not really an archive
+        raise ArchiveError(filename, f"Error reading archive: {e}") from e
+
+
+def iter_uploaded_images(uploads):
+    """
+    Yield (name, image_bytes) for a multipart batch of image files.
+
+    Args:
+        uploads: List of UploadFile objects (already spooled by the server)
+    """
+    for index, upload in enumerate(uploads):
+        name = upload.filename or f"image_{index}"
+        if not _is_image_name(name):
+            continue
+        upload.file.seek(0)
+        yield name, upload.file.read()
+
+
+# ============================================================
+# CLASSIFICATION PIPELINE
+# ============================================================
+
+def classify_stream(images, preprocess, predict_batch,
+                    batch_size=BULK_BATCH_SIZE, workers=DECODE_WORKERS,
+                    max_in_flight=MAX_IN_FLIGHT):
+    """
+    Decode images in a thread pool and classify them in large batches.
+
+    Results of decoded images come out in input order. An image that
+    fails to decode gets an error result right away, instead of stopping
+    the whole run. If the archive itself breaks, the images read so far
+    are still classified and an error result for the archive comes last.
+
+    Args:
+        images: Iterable of (name, image_bytes)
+        preprocess: Callable turning image bytes into a (1, 3, H, W) tensor
+        predict_batch: Callable turning a list of tensors into a list of results
+        batch_size: Images per forward pass
+        workers: Number of decoding threads
+        max_in_flight: Most images submitted to the pool at once
+
+    Yields:
+        Result dictionaries, each with a "filename" key
+    """
+    pending = deque()  # (name, future) in input order
+    batch_names = []
+    batch_tensors = []
+
+    def flush_batch():
+        """Run the model on the current batch and return its results."""
+        results = predict_batch(batch_tensors)
+        output = [
+            {"filename": name, **result}
+            for name, result in zip(batch_names, results)
+        ]
+        batch_names.clear()
+        batch_tensors.clear()
+        return output
+
+    def take_oldest():
+        """Wait for the oldest decode; return an error result if it failed."""
+        name, future = pending.popleft()
+        try:
+            batch_names.append(name)
+            batch_tensors.append(future.result())
+        except Exception as e:
+            batch_names.pop()
+            return {"filename": name, "error": f"Error processing image: {e}"}
+        return None
+
+    archive_error = None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-decode") as pool:
+        try:
+            for name, image_bytes in images:
+                pending.append((name, pool.submit(preprocess, image_bytes)))
+
+                # Bound memory: never hold more than max_in_flight decodes
+                while len(pending) >= max_in_flight:
+                    error = take_oldest()
+                    if error is not None:
+                        yield error
+                    if len(batch_tensors) >= batch_size:
+                        yield from flush_batch()
+        except ArchiveError as e:
+            # Stop reading input, but finish what was already read
+            archive_error = {"filename": e.filename, "error": str(e)}
+
+        # Input exhausted - drain what is left
+        while pending:
+            error = take_oldest()
+            if error is not None:
+                yield error
+            if len(batch_tensors) >= batch_size:
+                yield from flush_batch()
+
+        if batch_tensors:
+            yield from flush_batch()
+
+    if archive_error is not None:
+        yield archive_error
+
+
+def to_ndjson(results):
+    """
+    Encode result dictionaries as NDJSON lines.
+
+    A final summary line with the counts is appended at the end.
+    """
+    processed = 0
+    failed = 0
+
+    for result in results:
+        if "error" in result:
+            failed += 1
+        else:
+            processed += 1
+        yield json.dumps(result) + "\n"
+
+    yield json.dumps({"summary": {"processed": processed, "failed": failed}}) + "\n"
@@ -0,0 +1,295 @@
+"""
+Micro-Batching Inference Engine
+===============================
+Groups concurrent prediction requests into small batches so the model
+runs one forward pass for many images instead of one pass per image.
+
+How it works:
+    1. Callers submit an item and immediately get back a Future
+    2. A single worker thread takes items off a queue
+    3. It waits until it has MAX_BATCH_SIZE items or MAX_WAIT_MS has
+       passed since the first item arrived - whichever comes first
+    4. The whole batch goes through the handler in one call
+    5. Each caller's Future is resolved with its own result
+
+The event loop never runs the model itself, so health checks and other
+requests stay responsive while inference is in progress.
+"""
+
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# How many recent queue-latency samples to keep for percentiles
+LATENCY_WINDOW = 1000
+
+
+# ============================================================
+# METRICS
+# ============================================================
+
+class EngineMetrics:
+    """
+    Thread-safe counters for batch sizes and latencies.
+
+    Queue latency is the time a request spends waiting before its
+    batch starts running. Batch latency is the time the handler
+    (the forward pass) takes for one batch.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.total_requests = 0
+        self.total_batches = 0
+        self.failed_batches = 0
+        self.batch_size_counts = Counter()
+        self.queue_latencies_ms = deque(maxlen=window)
+        self.batch_latencies_ms = deque(maxlen=window)
+
+    def record_batch(self, batch_size, queue_latencies_ms, batch_latency_ms, failed=False):
+        """Record one processed batch."""
+        with self._lock:
+            self.total_requests += batch_size
+            self.total_batches += 1
+            if failed:
+                self.failed_batches += 1
+            self.batch_size_counts[batch_size] += 1
+            self.queue_latencies_ms.extend(queue_latencies_ms)
+            self.batch_latencies_ms.append(batch_latency_ms)
+
+    def snapshot(self):
+        """
+        Return a JSON-friendly summary of the metrics.
+
+        Returns:
+            dict with request/batch totals, batch size histogram and
+            latency percentiles
+        """
+        with self._lock:
+            queue_latencies = sorted(self.queue_latencies_ms)
+            batch_latencies = sorted(self.batch_latencies_ms)
+            histogram = dict(sorted(self.batch_size_counts.items()))
+            total_requests = self.total_requests
+            total_batches = self.total_batches
+            failed_batches = self.failed_batches
+
+        mean_batch_size = total_requests / total_batches if total_batches > 0 else 0
+
+        return {
+            "total_requests": total_requests,
+            "total_batches": total_batches,
+            "failed_batches": failed_batches,
+            "mean_batch_size": round(mean_batch_size, 2),
+            "batch_size_histogram": {str(size): count for size, count in histogram.items()},
+            "queue_latency_ms": _summarize(queue_latencies),
+            "batch_latency_ms": _summarize(batch_latencies),
+        }
+
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(sorted_values):
+    """Summarize a sorted list of latencies in milliseconds."""
+    if not sorted_values:
+        return {"count": 0, "mean": 0, "p50": 0, "p95": 0, "max": 0}
+
+    return {
+        "count": len(sorted_values),
+        "mean": round(sum(sorted_values) / len(sorted_values), 3),
+        "p50": round(_percentile(sorted_values, 0.50), 3),
+        "p95": round(_percentile(sorted_values, 0.95), 3),
+        "max": round(sorted_values[-1], 3),
+    }
+
+
+# ============================================================
+# ENGINE
+# ============================================================
+
+class InferenceEngine:
+    """
+    Dynamic micro-batching engine backed by one worker thread.
+
+    The handler receives a list of submitted items and must return a
+    list of results in the same order. If the handler raises, every
+    caller in that batch receives the exception.
+
+    Example:
+        engine = InferenceEngine(lambda tensors: predict_batch(model, tensors))
+        engine.start()
+        result = await asyncio.wrap_future(engine.submit(tensor))
+    """
+
+    def __init__(self, handler, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        """
+        Args:
+            handler: Callable taking a list of items, returning a list of results
+            max_batch_size: Largest batch the handler will receive
+            max_wait_ms: Longest time to hold the first item of a batch
+                while waiting for more items to arrive
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self._handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._running = False
+
+        self.metrics = EngineMetrics()
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """Start the worker thread (no-op if already running)."""
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._worker_loop,
+            name="inference-engine",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Stop the worker thread.
+
+        Items already queued are still processed before the worker exits.
+        """
+        if not self._running:
+            return
+
+        self._running = False
+        # Sentinel wakes the worker if it is blocked on an empty queue
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, item):
+        """
+        Queue one item for inference.
+
+        Args:
+            item: A single input (e.g. a preprocessed image tensor)
+
+        Returns:
+            concurrent.futures.Future that resolves to the item's result
+        """
+        if not self._running:
+            raise RuntimeError("Inference engine is not running")
+
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def queue_depth(self):
+        """Approximate number of items waiting to be batched."""
+        return self._queue.qsize()
+
+    def _collect_batch(self, first_entry):
+        """
+        Gather more queued items after the first one arrived.
+
+        Stops at max_batch_size or when max_wait_ms has passed since
+        the first item was taken off the queue.
+        """
+        batch = [first_entry]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    # Deadline passed - still take anything already waiting
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if entry is None:
+                # Shutdown sentinel: finish this batch, then exit the loop
+                self._running = False
+                break
+
+            batch.append(entry)
+
+        return batch
+
+    def _run_batch(self, batch):
+        """Run the handler on one batch and resolve every future."""
+        # Drop requests whose caller already gave up (e.g. a cancelled or
+        # timed-out await). The rest are marked running, so they can no
+        # longer be cancelled and set_result/set_exception cannot fail.
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        items = [item for item, _, _ in batch]
+        futures = [future for _, future, _ in batch]
+
+        started = time.perf_counter()
+        queue_latencies_ms = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+
+        failed = False
+        try:
+            results = self._handler(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Handler returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            failed = True
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+        batch_latency_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record_batch(len(batch), queue_latencies_ms, batch_latency_ms, failed)
+
+    def _worker_loop(self):
+        """Worker thread: block for work, build a batch, run it."""
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+
+            batch = self._collect_batch(entry)
+            self._run_batch(batch)
+
+            if not self._running and self._queue.empty():
+                break
+
+        # Drain anything submitted after shutdown began
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                self._run_batch([entry])
@@ -13,10 +13,12 @@ since lily classes are rare (~8% of the dataset).
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torchvision import transforms
-from datasets import load_dataset
+from datasets import load_dataset, Image as ImageFeature
 import random
 
+from lily_metrics import ConfusionMatrix
+from preprocessing import preprocess
+
 
 # ============================================================
 # CONFIGURATION
@@ -41,6 +43,14 @@ LEARNING_RATE = 0.001
 TRAIN_SAMPLES_PER_EPOCH = 2000
 VAL_SAMPLES = 500
 
+# Balanced validation set (VAL_LILIES + VAL_OTHERS = VAL_SAMPLES)
+VAL_LILIES = 50
+VAL_OTHERS = 450
+
+# Validation is streamed in fixed-size mini-batches so peak memory
+# does not grow with the size of the validation set
+VAL_BATCH_SIZE = 64
+
 # Target lily ratio in each batch (25% lilies)
 # This ensures the model sees enough lily examples to learn
 TARGET_LILY_RATIO = 0.25
@@ -52,21 +62,6 @@ LILY_WEIGHT = 10.0  # Weight for class 1 (lily)
 OTHER_WEIGHT = 1.0  # Weight for class 0 (other flowers)
 
 
-# ============================================================
-# IMAGE TRANSFORMS
-# ============================================================
-
-# Define how to transform images from the stream
-transform = transforms.Compose([
-    transforms.Resize((IMAGE_SIZE, IMAGE_SIZE)),  # Resize to fixed size
-    transforms.ToTensor(),                         # Convert to tensor (0-1)
-    transforms.Normalize(                          # Normalize for training
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225]
-    )
-])
-
-
 # ============================================================
 # DATASET STREAMING
 # ============================================================
@@ -96,6 +91,10 @@ def load_streaming_dataset():
         streaming=True
     )
 
+    # Keep images as raw bytes so process_sample can decode JPEGs
+    # at reduced resolution (see preprocessing.py)
+    dataset = dataset.cast_column("image", ImageFeature(decode=False))
+
     # Get train and validation splits
     train_stream = dataset["train"]
     val_stream = dataset["test"]  # Use test split for validation
@@ -116,21 +115,20 @@ def process_sample(sample):
     Converts the image to tensor and label to binary (lily/not lily).
 
     Args:
-        sample: Dictionary with 'image' and 'label' keys
+        sample: Dictionary with 'image' and 'label' keys. The image is
+            either raw {"bytes": ...} (fast path) or a decoded PIL Image
 
     Returns:
         image_tensor: Transformed image tensor
         binary_label: 1 for lily, 0 for other flowers
     """
-    # Get the image (PIL Image)
+    # Get the image (raw bytes when decoding is deferred, else PIL Image)
     image = sample["image"]
+    if isinstance(image, dict):
+        image = image["bytes"]
 
-    # Convert to RGB if needed (some images might be grayscale)
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-
-    # Apply transforms
-    image_tensor = transform(image)
+    # Reduced-resolution decode + resize + normalize (handles grayscale too)
+    image_tensor = preprocess(image, IMAGE_SIZE)
 
     # Convert label to binary: ANY lily type → 1, others → 0
     original_label = sample["label"]
@@ -246,51 +244,88 @@ def create_balanced_batches(stream_iterator, batch_size, num_samples, target_lil
         samples_yielded += len(batch_images)
 
 
-def create_validation_set(stream_iterator, target_lilies=50, target_others=450):
+def stream_validation_batches(val_stream, target_lilies=VAL_LILIES,
+                              target_others=VAL_OTHERS, batch_size=VAL_BATCH_SIZE):
     """
-    Create a validation set with guaranteed lily samples.
+    Stream a validation set with guaranteed lily samples, one batch at a time.
+
+    Scans the stream and keeps the first target_lilies lily samples and
+    the first target_others other samples. Batches are yielded as soon as
+    they fill up, so only one batch of images is in memory at a time.
 
-    Scans the stream to collect a fixed number of lily and other samples.
+    Iterating the (unshuffled) validation stream again gives the same
+    samples in the same order, so every epoch is validated on the same set.
 
     Args:
-        stream_iterator: Iterator yielding samples
+        val_stream: Iterable of samples (a fresh pass each call)
         target_lilies: Number of lily samples to collect
         target_others: Number of other samples to collect
+        batch_size: Number of images per yielded batch
 
-    Returns:
-        val_images: Tensor of all validation images
-        val_labels: Tensor of all validation labels
+    Yields:
+        batch_images: Tensor of shape (<= batch_size, 3, 64, 64)
+        batch_labels: Tensor of shape (<= batch_size,)
     """
-    lily_images = []
-    lily_labels = []
-    other_images = []
-    other_labels = []
+    batch_images = []
+    batch_labels = []
+    lilies = 0
+    others = 0
 
-    for sample in stream_iterator:
+    for sample in val_stream:
         image_tensor, binary_label = process_sample(sample)
 
-        if binary_label == 1 and len(lily_images) < target_lilies:
-            lily_images.append(image_tensor)
-            lily_labels.append(binary_label)
-        elif binary_label == 0 and len(other_images) < target_others:
-            other_images.append(image_tensor)
-            other_labels.append(binary_label)
+        if binary_label == 1 and lilies < target_lilies:
+            lilies += 1
+        elif binary_label == 0 and others < target_others:
+            others += 1
+        else:
+            continue
+
+        batch_images.append(image_tensor)
+        batch_labels.append(binary_label)
+
+        if len(batch_images) == batch_size:
+            yield torch.stack(batch_images), torch.tensor(batch_labels, dtype=torch.long)
+            batch_images = []
+            batch_labels = []
 
         # Stop when we have enough
-        if len(lily_images) >= target_lilies and len(other_images) >= target_others:
+        if lilies >= target_lilies and others >= target_others:
             break
 
-    # Combine and shuffle
-    all_images = lily_images + other_images
-    all_labels = lily_labels + other_labels
+    if batch_images:
+        yield torch.stack(batch_images), torch.tensor(batch_labels, dtype=torch.long)
+
+
+def create_validation_set(stream_iterator, target_lilies=VAL_LILIES, target_others=VAL_OTHERS):
+    """
+    Collect the whole balanced validation set into memory.
+
+    Only for callers that need every image at once (e.g. comparing
+    several exported models on identical inputs). Training streams
+    the set with stream_validation_batches instead.
+
+    Args:
+        stream_iterator: Iterator yielding samples
+        target_lilies: Number of lily samples to collect
+        target_others: Number of other samples to collect
 
-    combined = list(zip(all_images, all_labels))
-    random.shuffle(combined)
-    all_images, all_labels = zip(*combined)
+    Returns:
+        val_images: Tensor of all validation images
+        val_labels: Tensor of all validation labels
+    """
+    batches = list(stream_validation_batches(stream_iterator, target_lilies, target_others))
+    val_images = torch.cat([images for images, _ in batches])
+    val_labels = torch.cat([labels for _, labels in batches])
 
-    print(f"  Validation set: {len(lily_images)} lilies + {len(other_images)} others = {len(all_images)} total")
+    # Shuffle
+    order = torch.randperm(len(val_labels))
+    val_images, val_labels = val_images[order], val_labels[order]
 
-    return torch.stack(list(all_images)), torch.tensor(list(all_labels), dtype=torch.long)
+    lily_count = int(val_labels.sum())
+    print(f"  Validation set: {lily_count} lilies + {len(val_labels) - lily_count} others = {len(val_labels)} total")
+
+    return val_images, val_labels
 
 
 # ============================================================
@@ -403,36 +438,40 @@ def compute_metrics(predictions, labels):
     Returns:
         dict with accuracy, lily_recall, lily_precision, etc.
     """
-    # True positives: predicted lily AND actual lily
-    tp = ((predictions == 1) & (labels == 1)).sum().item()
-    # False positives: predicted lily BUT actual other
-    fp = ((predictions == 1) & (labels == 0)).sum().item()
-    # False negatives: predicted other BUT actual lily
-    fn = ((predictions == 0) & (labels == 1)).sum().item()
-    # True negatives: predicted other AND actual other
-    tn = ((predictions == 0) & (labels == 0)).sum().item()
-
-    total = tp + fp + fn + tn
-    accuracy = 100 * (tp + tn) / total if total > 0 else 0
-
-    # Recall: of all actual lilies, how many did we find?
-    lily_total = tp + fn
-    lily_recall = 100 * tp / lily_total if lily_total > 0 else 0
-
-    # Precision: of all predicted lilies, how many were correct?
-    lily_predicted = tp + fp
-    lily_precision = 100 * tp / lily_predicted if lily_predicted > 0 else 0
-
-    return {
-        "accuracy": accuracy,
-        "lily_recall": lily_recall,
-        "lily_precision": lily_precision,
-        "tp": tp,
-        "fp": fp,
-        "fn": fn,
-        "tn": tn,
-        "lily_total": lily_total
-    }
+    confusion = ConfusionMatrix(num_classes=2, device=predictions.device)
+    confusion.update(predictions, labels)
+    return confusion.compute()
+
+
+def validate_model(model, val_batches):
+    """
+    Evaluate the model on a stream of validation mini-batches.
+
+    Each batch is added to an on-tensor confusion matrix and then
+    dropped. Only one batch of images and activations is alive at a
+    time, so peak memory stays constant as the validation set grows.
+
+    Args:
+        model: The CNN model
+        val_batches: Iterable of (batch_images, batch_labels), e.g.
+                     stream_validation_batches(val_stream)
+
+    Returns:
+        dict with accuracy, lily_recall, lily_precision, etc.
+    """
+    model.eval()
+
+    confusion = ConfusionMatrix(num_classes=2)
+
+    # inference_mode is stricter (and faster) than no_grad:
+    # no autograd tracking and no version counters on the outputs
+    with torch.inference_mode():
+        for batch_images, batch_labels in val_batches:
+            outputs = model(batch_images)
+            predicted = outputs.argmax(dim=1)
+            confusion.update(predicted, batch_labels)
+
+    return confusion.compute()
 
 
 def train_model(model, train_stream, val_stream):
@@ -465,18 +504,17 @@ def train_model(model, train_stream, val_stream):
 
     optimizer = optim.Adam(model.parameters(), lr=LEARNING_RATE)
 
-    # Build validation set once (with guaranteed lilies)
-    print("Building balanced validation set...")
-    val_iter = iter(val_stream)
-    val_images, val_labels = create_validation_set(val_iter, target_lilies=50, target_others=450)
+    # The validation set (with guaranteed lilies) is streamed again each
+    # epoch in batches, instead of being held in memory
+    print(f"Validation set: {VAL_LILIES} lilies + {VAL_OTHERS} others, "
+          f"streamed in batches of {VAL_BATCH_SIZE}")
     print()
 
     for epoch in range(NUM_EPOCHS):
         # ---- TRAINING PHASE ----
         model.train()
-        running_loss = 0.0
-        all_predictions = []
-        all_labels = []
+        running_loss = torch.zeros(())
+        train_confusion = ConfusionMatrix(num_classes=2)
         num_batches = 0
 
         # Create fresh iterator for each epoch with shuffle
@@ -502,27 +540,19 @@ def train_model(model, train_stream, val_stream):
             # Update weights
             optimizer.step()
 
-            # Track metrics
-            running_loss += loss.item()
-            _, predicted = torch.max(outputs, 1)
-            all_predictions.extend(predicted.tolist())
-            all_labels.extend(batch_labels.tolist())
+            # Track metrics (kept on-tensor, read once per epoch)
+            running_loss += loss.detach()
+            predicted = outputs.detach().argmax(dim=1)
+            train_confusion.update(predicted, batch_labels)
             num_batches += 1
 
         # Calculate training metrics
-        train_loss = running_loss / num_batches if num_batches > 0 else 0
-        train_preds = torch.tensor(all_predictions)
-        train_lbls = torch.tensor(all_labels)
-        train_metrics = compute_metrics(train_preds, train_lbls)
+        train_loss = running_loss.item() / num_batches if num_batches > 0 else 0
+        train_metrics = train_confusion.compute()
 
         # ---- VALIDATION PHASE ----
-        model.eval()
         print(f"         - Evaluating on validation set...")
-
-        with torch.no_grad():
-            outputs = model(val_images)
-            _, predicted = torch.max(outputs, 1)
-            val_metrics = compute_metrics(predicted, val_labels)
+        val_metrics = validate_model(model, stream_validation_batches(val_stream))
 
         # Print epoch summary
         print(f"  Training Loss: {train_loss:.4f}")
@@ -543,14 +573,14 @@ def train_model(model, train_stream, val_stream):
     print("Training complete!")
     print()
 
-    return model, (val_images, val_labels)
+    return model
 
 
 # ============================================================
 # EVALUATION
 # ============================================================
 
-def evaluate_model(model, val_data):
+def evaluate_model(model, val_batches):
     """
     Final evaluation of the trained model.
 
@@ -561,18 +591,12 @@ def evaluate_model(model, val_data):
 
     Args:
         model: Trained CNN model
-        val_data: Tuple of (val_images, val_labels)
+        val_batches: Iterable of (batch_images, batch_labels)
     """
     print("Final Evaluation on Validation Set...")
     print("=" * 60)
 
-    val_images, val_labels = val_data
-    model.eval()
-
-    with torch.no_grad():
-        outputs = model(val_images)
-        _, predicted = torch.max(outputs, 1)
-        metrics = compute_metrics(predicted, val_labels)
+    metrics = validate_model(model, val_batches)
 
     print(f"Overall Accuracy: {metrics['accuracy']:.2f}%")
     print()
@@ -622,10 +646,10 @@ def main():
     model = build_model()
 
     # Step 3: Train on balanced streamed data
-    model, val_data = train_model(model, train_stream, val_stream)
+    model = train_model(model, train_stream, val_stream)
 
     # Step 4: Final evaluation
-    metrics = evaluate_model(model, val_data)
+    metrics = evaluate_model(model, stream_validation_batches(val_stream))
 
     # Summary with honest assessment
     print("TRAINING COMPLETE!")
@@ -1,3 +1,5 @@
+import os
+
 import torch
 from torchvision import models, transforms
 from PIL import Image
@@ -34,11 +36,46 @@ FLOWER_CLASSES = {
 # Classes that could be considered "Lilac-like" (purple/violet flowers)
 LILAC_LIKE_KEYWORDS = ["lilac", "violet", "lavender", "purple", "orchid", "iris"]
 
+# Precomputed once: True for every ImageNet class whose name matches a keyword.
+# Predictions then just index this mask instead of re-matching strings.
+LILAC_LIKE_MASK = torch.tensor([
+    any(keyword in label.lower() for keyword in LILAC_LIKE_KEYWORDS)
+    for label in IMAGENET_LABELS
+])
+
+# Number of top predictions shown in the details
+TOP_K = 5
+
+# ============================================================
+# SERVING SETTINGS
+# ============================================================
+
+# Gradio groups concurrent requests into batches of up to this size
+MAX_BATCH_SIZE = 16
+
+# Requests Gradio may run at the same time (each one is a whole batch)
+QUEUE_CONCURRENCY = 1
+
+# Intra-op threads for the ResNet forward pass. One batch at a time uses
+# all cores; inter-op parallelism does not help a sequential CNN.
+TORCH_THREADS = os.cpu_count() or 1
+TORCH_INTEROP_THREADS = 1
+
 
 # ============================================================
 # MODEL SETUP
 # ============================================================
 
+def configure_threads():
+    """Apply CPU thread settings (must run before the first forward pass)."""
+    torch.set_num_threads(TORCH_THREADS)
+    try:
+        torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+    except RuntimeError:
+        # Can only be set once per process, before any parallel work
+        pass
+
+
 def load_model():
     """Load pretrained ResNet18 with ImageNet weights."""
     print("Loading pretrained ResNet18 model...")
@@ -53,6 +90,18 @@ def load_model():
     return model
 
 
+def warm_up(model, batch_sizes=(1, MAX_BATCH_SIZE)):
+    """
+    Run dummy forward passes so the first real request is not slow.
+
+    The first calls allocate buffers and pick convolution kernels.
+    """
+    print("Warming up model...")
+    with torch.inference_mode():
+        for batch_size in batch_sizes:
+            model(torch.zeros(batch_size, 3, 224, 224))
+
+
 def get_transform():
     """Create image preprocessing pipeline for ImageNet models."""
     transform = transforms.Compose([
@@ -71,59 +120,76 @@ def get_transform():
 # PREDICTION
 # ============================================================
 
-def predict_flower(image, model, transform):
+def predict_flowers(images, model, transform):
     """
-    Run inference on an image and return predictions.
-    Returns the top predicted class and confidence.
+    Run inference on a batch of images with a single forward pass.
+
+    Args:
+        images: List of PIL images or numpy arrays (None entries allowed)
+        model: ResNet18 model in eval mode
+        transform: Preprocessing pipeline from get_transform()
+
+    Returns:
+        List of (top_class, top_prob, details) tuples, one per image
     """
-    if image is None:
-        return "No image provided", 0.0, "Please upload an image"
+    results = [("No image provided", 0.0, "Please upload an image")] * len(images)
+
+    # Preprocess only the real images, remembering where they came from
+    positions = []
+    tensors = []
+    for position, image in enumerate(images):
+        if image is None:
+            continue
 
-    # Convert to PIL Image if needed
-    if not isinstance(image, Image.Image):
-        image = Image.fromarray(image)
+        # Convert to PIL Image if needed
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
 
-    # Ensure RGB mode
-    image = image.convert("RGB")
+        # Ensure RGB mode
+        tensors.append(transform(image.convert("RGB")))
+        positions.append(position)
 
-    # Preprocess the image
-    input_tensor = transform(image)
-    input_batch = input_tensor.unsqueeze(0)  # Add batch dimension
+    if not tensors:
+        return results
 
-    # Run inference
-    with torch.no_grad():
-        outputs = model(input_batch)
+    # Run inference on the whole batch
+    with torch.inference_mode():
+        outputs = model(torch.stack(tensors))
         probabilities = torch.softmax(outputs, dim=1)
 
-    # Get top 5 predictions
-    top5_prob, top5_idx = torch.topk(probabilities, 5)
+    # Top-k for every image, plus a vectorized lilac lookup over them
+    topk_prob, topk_idx = torch.topk(probabilities, TOP_K)
+    topk_lilac = LILAC_LIKE_MASK[topk_idx]
 
-    # Get the top prediction
-    top_idx = top5_idx[0][0].item()
-    top_prob = top5_prob[0][0].item() * 100
-    top_class = IMAGENET_LABELS[top_idx]
+    topk_prob = (topk_prob * 100).tolist()
+    topk_idx = topk_idx.tolist()
+    topk_lilac = topk_lilac.tolist()
 
-    # Check if it looks like a lilac
-    is_lilac_like = any(
-        keyword in top_class.lower()
-        for keyword in LILAC_LIKE_KEYWORDS
-    )
+    for row, position in enumerate(positions):
+        # Build detailed results
+        details = f"Top {TOP_K} Predictions:\n"
+        for i in range(TOP_K):
+            class_name = IMAGENET_LABELS[topk_idx[row][i]]
+            details += f"  {i+1}. {class_name}: {topk_prob[row][i]:.1f}%\n"
+
+        # Determine lilac status from the top prediction
+        if topk_lilac[row][0]:
+            lilac_status = "This appears to be a LILAC or similar flower!"
+        else:
+            lilac_status = "This does NOT appear to be a Lilac flower."
 
-    # Build detailed results
-    details = "Top 5 Predictions:\n"
-    for i in range(5):
-        idx = top5_idx[0][i].item()
-        prob = top5_prob[0][i].item() * 100
-        class_name = IMAGENET_LABELS[idx]
-        details += f"  {i+1}. {class_name}: {prob:.1f}%\n"
+        top_class = IMAGENET_LABELS[topk_idx[row][0]]
+        results[position] = (top_class, topk_prob[row][0], f"{lilac_status}\n\n{details}")
 
-    # Determine lilac status
-    if is_lilac_like:
-        lilac_status = "This appears to be a LILAC or similar flower!"
-    else:
-        lilac_status = "This does NOT appear to be a Lilac flower."
+    return results
 
-    return top_class, top_prob, f"{lilac_status}\n\n{details}"
+
+def predict_flower(image, model, transform):
+    """
+    Run inference on an image and return predictions.
+    Returns the top predicted class and confidence.
+    """
+    return predict_flowers([image], model, transform)[0]
 
 
 # ============================================================
@@ -133,18 +199,34 @@ def predict_flower(image, model, transform):
 def create_interface(model, transform):
     """Create and return the Gradio interface."""
 
-    def predict(image):
-        """Wrapper function for Gradio."""
-        if image is None:
-            return "N/A", "0%", "Please upload an image to classify."
-
-        class_name, confidence, details = predict_flower(image, model, transform)
-
-        return class_name, f"{confidence:.1f}%", details
+    def predict(images):
+        """
+        Batched wrapper function for Gradio.
+
+        With batch=True, Gradio passes a list of images (one per queued
+        request) and expects one list per output.
+        """
+        class_names, confidences, all_details = [], [], []
+
+        for image, (class_name, confidence, details) in zip(
+            images, predict_flowers(images, model, transform)
+        ):
+            if image is None:
+                class_names.append("N/A")
+                confidences.append("0%")
+                all_details.append("Please upload an image to classify.")
+            else:
+                class_names.append(class_name)
+                confidences.append(f"{confidence:.1f}%")
+                all_details.append(details)
+
+        return class_names, confidences, all_details
 
     # Create the Gradio interface
     interface = gr.Interface(
         fn=predict,
+        batch=True,
+        max_batch_size=MAX_BATCH_SIZE,
         inputs=gr.Image(type="pil", label="Upload a Flower Image"),
         outputs=[
             gr.Textbox(label="Predicted Class"),
@@ -173,8 +255,12 @@ def main():
     print("   Powered by Pretrained ResNet18")
     print("=" * 60 + "\n")
 
-    # Load the pretrained model
+    # Thread settings must be applied before any inference
+    configure_threads()
+
+    # Load the pretrained model and warm it up
     model = load_model()
+    warm_up(model)
 
     # Get the image transform
     transform = get_transform()
@@ -183,6 +269,9 @@ def main():
     print("\nStarting Gradio interface...")
     interface = create_interface(model, transform)
 
+    # The queue collects concurrent requests into batches
+    interface.queue(default_concurrency_limit=QUEUE_CONCURRENCY)
+
     # Launch the web app
     interface.launch(
         share=False,
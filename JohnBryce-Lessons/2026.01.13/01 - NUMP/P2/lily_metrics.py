@@ -0,0 +1,116 @@
+"""
+Lily Classifier Metrics
+=======================
+Streaming classification metrics for the Lily CNN.
+
+Instead of collecting every prediction in a Python list and turning it
+back into a tensor at the end of the epoch, we keep a small confusion
+matrix on the same device as the model and add each batch to it.
+Memory use stays the same no matter how many samples we evaluate.
+"""
+
+import torch
+
+
+class ConfusionMatrix:
+    """
+    Confusion matrix that is accumulated batch by batch.
+
+    Rows are the true labels and columns are the predicted labels:
+
+        matrix[true_label, predicted_label] = number of samples
+
+    For the binary lily classifier:
+        matrix[0, 0] = TN    matrix[0, 1] = FP
+        matrix[1, 0] = FN    matrix[1, 1] = TP
+    """
+
+    def __init__(self, num_classes=2, device=None):
+        """
+        Create an empty confusion matrix.
+
+        Args:
+            num_classes: Number of classes (2 for lily / not lily)
+            device: Device to keep the counts on (defaults to CPU)
+        """
+        self.num_classes = num_classes
+        self.matrix = torch.zeros(
+            (num_classes, num_classes),
+            dtype=torch.long,
+            device=device
+        )
+
+    def reset(self):
+        """Clear all counts (e.g. at the start of a new epoch)."""
+        self.matrix.zero_()
+
+    def update(self, predictions, labels):
+        """
+        Add one batch of predictions to the matrix.
+
+        Uses a single bincount over (label, prediction) pairs, so there
+        is no Python loop and no copy back to the CPU.
+
+        Args:
+            predictions: Tensor of predicted classes (batch,)
+            labels: Tensor of true labels (batch,)
+        """
+        predictions = predictions.reshape(-1).to(self.matrix.device)
+        labels = labels.reshape(-1).to(self.matrix.device)
+
+        # Each (label, prediction) pair maps to one cell of the flat matrix
+        cell_index = labels * self.num_classes + predictions
+        counts = torch.bincount(cell_index, minlength=self.num_classes ** 2)
+
+        self.matrix += counts.view(self.num_classes, self.num_classes)
+
+    def compute(self, positive_class=1):
+        """
+        Compute classification metrics from the accumulated counts.
+
+        Works for any number of classes. The lily metrics (tp, fp, fn,
+        tn, recall, precision) treat positive_class as "lily" and every
+        other class as "not lily" (one-vs-rest).
+
+        This is the only place the counts are copied to Python numbers.
+
+        Args:
+            positive_class: Class index reported as the lily class
+
+        Returns:
+            dict with accuracy, lily_recall, lily_precision, etc., plus
+            per-class recall and precision lists
+        """
+        matrix = self.matrix.tolist()
+        classes = range(self.num_classes)
+
+        total = sum(sum(row) for row in matrix)
+        correct = sum(matrix[i][i] for i in classes)
+        accuracy = 100 * correct / total if total > 0 else 0
+
+        # Per class: row sums are actual counts, column sums predicted counts
+        actual = [sum(matrix[i]) for i in classes]
+        predicted = [sum(matrix[j][i] for j in classes) for i in classes]
+        recall = [100 * matrix[i][i] / actual[i] if actual[i] > 0 else 0 for i in classes]
+        precision = [100 * matrix[i][i] / predicted[i] if predicted[i] > 0 else 0 for i in classes]
+
+        # Lily vs. everything else
+        tp = matrix[positive_class][positive_class]
+        fn = actual[positive_class] - tp
+        fp = predicted[positive_class] - tp
+        tn = total - tp - fn - fp
+
+        return {
+            "accuracy": accuracy,
+            # Recall: of all actual lilies, how many did we find?
+            "lily_recall": recall[positive_class],
+            # Precision: of all predicted lilies, how many were correct?
+            "lily_precision": precision[positive_class],
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "tn": tn,
+            "lily_total": actual[positive_class],
+            "recall": recall,
+            "precision": precision
+        }
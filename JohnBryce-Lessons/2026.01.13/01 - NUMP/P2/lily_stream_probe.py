@@ -6,10 +6,21 @@ A diagnostic script to explore the Hugging Face dataset
 
 This script does NOT train any model.
 It only inspects and reports on the dataset structure.
+
+Label scans read ONLY the "label" column (no image bytes are decoded)
+and split the dataset shards across worker processes, then merge the
+per-shard Counters.
+
+For offline runs, point LOCAL_DATA_FILES at downloaded parquet files.
 """
 
-from datasets import load_dataset
+import io
+import math
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from datasets import load_dataset, Image as ImageFeature
+from PIL import Image
 
 
 # ============================================================
@@ -17,8 +28,17 @@ from collections import Counter
 # ============================================================
 
 DATASET_NAME = "nelorth/oxford-flowers"
+
+# Samples to scan per split (None = the whole split)
 SAMPLES_TO_SCAN = 2000
 
+# Worker processes for label scans (one or more shards each)
+SCAN_WORKERS = 4
+
+# Local parquet files for offline runs, e.g. "data/train-*.parquet"
+# (None = stream from the Hugging Face Hub)
+LOCAL_DATA_FILES = None
+
 
 # ============================================================
 # KNOWN FLOWER NAMES (Oxford Flowers 102)
@@ -54,6 +74,115 @@ FLOWER_NAMES = [
 ]
 
 
+# ============================================================
+# DATASET LOADING
+# ============================================================
+
+def load_split(split="train", columns=None, data_files=None):
+    """
+    Open one split as a streaming dataset, optionally column-projected.
+
+    With columns=["label"] the parquet reader skips the image column
+    entirely, so nothing is downloaded or decoded for it.
+
+    Args:
+        split: Split name ("train" or "test")
+        columns: Columns to keep (None = all)
+        data_files: Local parquet glob (defaults to LOCAL_DATA_FILES)
+
+    Returns:
+        IterableDataset for the split
+    """
+    if data_files is None:
+        data_files = LOCAL_DATA_FILES
+
+    if data_files is not None:
+        path, kwargs = "parquet", {"data_files": {split: data_files}}
+    else:
+        path, kwargs = DATASET_NAME, {}
+
+    try:
+        # Projection pushed down into the parquet reader
+        dataset = load_dataset(path, split=split, streaming=True, columns=columns, **kwargs)
+    except (TypeError, ValueError):
+        # Builders without a "columns" option: project after reading
+        dataset = load_dataset(path, split=split, streaming=True, **kwargs)
+        if columns is not None:
+            dataset = dataset.select_columns(columns)
+
+    return dataset
+
+
+def _count_shard_labels(task):
+    """
+    Count labels in one group of shards (runs in a worker process).
+
+    Args:
+        task: (split, num_groups, group_index, limit, data_files)
+
+    Returns:
+        Counter of label frequencies for this group
+    """
+    split, num_groups, group_index, limit, data_files = task
+
+    dataset = load_split(split, columns=["label"], data_files=data_files)
+    if num_groups > 1:
+        dataset = dataset.shard(num_shards=num_groups, index=group_index)
+
+    label_counts = Counter()
+    for count, sample in enumerate(dataset):
+        if limit is not None and count >= limit:
+            break
+        label_counts[sample["label"]] += 1
+
+    return label_counts
+
+
+def count_labels(split="train", limit=SAMPLES_TO_SCAN, workers=SCAN_WORKERS,
+                 data_files=None):
+    """
+    Label census using column projection and parallel shard scanning.
+
+    The dataset's shards are split into up to `workers` groups; each
+    group is scanned by its own process and the Counters are merged.
+    With a limit, each group scans an equal share of it.
+
+    Args:
+        split: Split name
+        limit: Total samples to scan (None = the whole split)
+        workers: Maximum number of worker processes
+        data_files: Local parquet glob (defaults to LOCAL_DATA_FILES)
+
+    Returns:
+        Counter with label frequencies
+    """
+    if data_files is None:
+        data_files = LOCAL_DATA_FILES
+
+    num_shards = load_split(split, columns=["label"], data_files=data_files).n_shards
+    num_groups = max(1, min(workers, num_shards))
+    group_limit = None if limit is None else math.ceil(limit / num_groups)
+
+    tasks = [
+        (split, num_groups, group_index, group_limit, data_files)
+        for group_index in range(num_groups)
+    ]
+
+    if num_groups == 1:
+        return _count_shard_labels(tasks[0])
+
+    label_counts = Counter()
+    with ProcessPoolExecutor(max_workers=num_groups) as pool:
+        for shard_counts in pool.map(_count_shard_labels, tasks):
+            label_counts.update(shard_counts)
+
+    return label_counts
+
+
+# ============================================================
+# DIAGNOSTICS
+# ============================================================
+
 def inspect_dataset_structure():
     """
     Connect to the dataset and inspect its structure.
@@ -68,25 +197,33 @@ def inspect_dataset_structure():
     print("=" * 60)
     print()
 
-    print(f"Connecting to: {DATASET_NAME}")
-    print("Using streaming mode (no local download)")
+    if LOCAL_DATA_FILES is not None:
+        print(f"Reading local files: {LOCAL_DATA_FILES}")
+        train_stream = load_split("train")
+    else:
+        print(f"Connecting to: {DATASET_NAME}")
+        print("Using streaming mode (no local download)")
+        print()
+
+        # Load with streaming
+        dataset = load_dataset(
+            DATASET_NAME,
+            streaming=True,
+            trust_remote_code=True
+        )
+
+        # Print available splits
+        print("Available splits:")
+        for split_name in dataset.keys():
+            print(f"  - {split_name}")
+
+        train_stream = dataset["train"]
     print()
 
-    # Load with streaming
-    dataset = load_dataset(
-        DATASET_NAME,
-        streaming=True,
-        trust_remote_code=True
-    )
-
-    # Print available splits
-    print("Available splits:")
-    for split_name in dataset.keys():
-        print(f"  - {split_name}")
+    print(f"Train shards: {train_stream.n_shards}")
     print()
 
     # Get one sample to inspect keys
-    train_stream = dataset["train"]
     sample = next(iter(train_stream))
 
     print("Sample keys (fields):")
@@ -104,15 +241,14 @@ def inspect_dataset_structure():
         print("  No features metadata available in streaming mode")
     print()
 
-    return dataset
+    return train_stream
 
 
-def scan_labels(dataset):
+def scan_labels():
     """
     Scan samples and count label occurrences.
 
-    Args:
-        dataset: The streaming dataset
+    Only the label column is read, in parallel across shards.
 
     Returns:
         label_counts: Counter with label frequencies
@@ -122,24 +258,12 @@ def scan_labels(dataset):
     print("=" * 60)
     print()
 
-    print(f"Scanning first {SAMPLES_TO_SCAN} samples...")
+    scope = "all" if SAMPLES_TO_SCAN is None else f"up to {SAMPLES_TO_SCAN}"
+    print(f"Scanning {scope} samples (label column only, {SCAN_WORKERS} workers max)...")
     print()
 
-    train_stream = dataset["train"]
-    label_counts = Counter()
-
-    count = 0
-    for sample in train_stream:
-        if count >= SAMPLES_TO_SCAN:
-            break
-
-        label = sample["label"]
-        label_counts[label] += 1
-        count += 1
-
-        # Progress indicator
-        if count % 500 == 0:
-            print(f"  Scanned {count} samples...")
+    label_counts = count_labels("train", limit=SAMPLES_TO_SCAN)
+    count = sum(label_counts.values())
 
     print(f"  Completed scanning {count} samples")
     print()
@@ -188,12 +312,16 @@ def detect_lily_labels():
     return lily_labels
 
 
-def analyze_lily_samples(dataset, lily_labels):
+def analyze_lily_samples(label_counts, lily_labels):
     """
     Analyze lily samples in the dataset.
 
+    Lily counts come from the label census. Image properties are read
+    from the headers of the first few lily images among the first
+    SAMPLES_TO_SCAN samples - no image in the dataset is fully decoded.
+
     Args:
-        dataset: The streaming dataset
+        label_counts: Counter from scan_labels()
         lily_labels: List of (label_id, name) tuples for lily flowers
     """
     print("=" * 60)
@@ -206,31 +334,34 @@ def analyze_lily_samples(dataset, lily_labels):
     print(f"Scanning for lily samples (labels: {sorted(lily_label_ids)})...")
     print()
 
-    train_stream = dataset["train"]
+    total_scanned = sum(label_counts.values())
+    lily_counts = Counter({
+        label: count for label, count in label_counts.items()
+        if label in lily_label_ids
+    })
 
-    lily_counts = Counter()
-    total_scanned = 0
+    # Image bytes stay encoded; PIL only parses the header for size/mode
+    train_stream = load_split("train").cast_column("image", ImageFeature(decode=False))
     lily_images_info = []
 
-    for sample in train_stream:
-        if total_scanned >= SAMPLES_TO_SCAN:
+    for count, sample in enumerate(train_stream):
+        if len(lily_images_info) >= 5:
+            break
+        if SAMPLES_TO_SCAN is not None and count >= SAMPLES_TO_SCAN:
             break
 
         label = sample["label"]
-        total_scanned += 1
-
-        if label in lily_label_ids:
-            lily_counts[label] += 1
-
-            # Collect info about first few lily images
-            if len(lily_images_info) < 5:
-                image = sample["image"]
-                lily_images_info.append({
-                    "label": label,
-                    "name": FLOWER_NAMES[label] if label < len(FLOWER_NAMES) else "unknown",
-                    "size": image.size,
-                    "mode": image.mode
-                })
+        if label not in lily_label_ids:
+            continue
+
+        # Collect info about first few lily images
+        image = Image.open(io.BytesIO(sample["image"]["bytes"]))
+        lily_images_info.append({
+            "label": label,
+            "name": FLOWER_NAMES[label] if label < len(FLOWER_NAMES) else "unknown",
+            "size": image.size,
+            "mode": image.mode
+        })
 
     # Report findings
     print(f"Scanned {total_scanned} samples")
@@ -319,22 +450,16 @@ def main():
     print()
 
     # Step 1: Inspect structure
-    dataset = inspect_dataset_structure()
+    inspect_dataset_structure()
 
     # Step 2: Detect lily labels from known names
     lily_labels = detect_lily_labels()
 
-    # Step 3: Scan and count labels
-    label_counts = scan_labels(dataset)
+    # Step 3: Scan and count labels (label column only, parallel shards)
+    label_counts = scan_labels()
 
     # Step 4: Analyze lily samples specifically
-    # Need to reload dataset since we consumed the iterator
-    dataset = load_dataset(
-        DATASET_NAME,
-        streaming=True,
-        trust_remote_code=True
-    )
-    analyze_lily_samples(dataset, lily_labels)
+    analyze_lily_samples(label_counts, lily_labels)
 
     # Step 5: Print recommendations
     print_recommendations(lily_labels, label_counts)
@@ -344,7 +469,7 @@ def main():
     print("SUMMARY")
     print("=" * 60)
     print()
-    print(f"Dataset: {DATASET_NAME}")
+    print(f"Dataset: {DATASET_NAME if LOCAL_DATA_FILES is None else LOCAL_DATA_FILES}")
     print(f"Lily-related labels found: {len(lily_labels)}")
     for label_id, name in lily_labels:
         print(f"  - Label {label_id}: {name}")
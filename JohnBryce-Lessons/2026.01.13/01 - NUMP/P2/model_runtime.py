@@ -0,0 +1,187 @@
+"""
+Lily Model Runtime
+==================
+Helpers for exporting the Lily CNN and loading the fastest artifact
+that is available when the API boots.
+
+Artifacts (created by export_model.py), fastest first:
+    - lily_model_int8.ts : TorchScript, frozen, INT8 dynamic-quantized Linear layers
+    - lily_model_fp32.ts : TorchScript, frozen, fp32
+    - lily_model.pth     : fp32 state dict, rebuilt as an eager LilyCNN
+
+fc1 (32*16*16 -> 64) holds ~99% of the weights, so quantizing the Linear
+layers to INT8 shrinks the model ~4x and speeds up the largest matmul.
+"""
+
+import time
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+TORCHSCRIPT_INT8_PATH = Path("lily_model_int8.ts")
+TORCHSCRIPT_FP32_PATH = Path("lily_model_fp32.ts")
+
+# Batch sizes used to warm up the model at startup
+WARMUP_BATCH_SIZES = (1, 16)
+WARMUP_RUNS = 3
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+
+def select_quantized_engine():
+    """
+    Pick a quantized kernel backend supported on this machine.
+
+    fbgemm is used on x86, qnnpack on ARM (e.g. Apple Silicon).
+    """
+    supported = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in supported:
+            torch.backends.quantized.engine = engine
+            return engine
+    return torch.backends.quantized.engine
+
+
+def quantize_linear_layers(model: nn.Module) -> nn.Module:
+    """
+    Apply dynamic INT8 quantization to every nn.Linear layer.
+
+    Weights are stored as INT8; activations are quantized on the fly,
+    so no calibration data is needed.
+
+    Args:
+        model: fp32 model in eval mode
+
+    Returns:
+        New quantized model (the input model is not modified)
+    """
+    select_quantized_engine()
+    return torch.ao.quantization.quantize_dynamic(
+        model,
+        {nn.Linear},
+        dtype=torch.qint8
+    )
+
+
+def export_torchscript(model: nn.Module, path: Path, image_size: int) -> None:
+    """
+    Trace, freeze and save a model as TorchScript.
+
+    Freezing inlines the weights as constants and drops the Python
+    module structure, so loading it does not need the LilyCNN class.
+
+    Args:
+        model: Model to export (fp32 or quantized)
+        path: Output file
+        image_size: Height/width of the input images
+    """
+    model.eval()
+    example = torch.zeros(1, 3, image_size, image_size)
+
+    with torch.inference_mode():
+        traced = torch.jit.trace(model, example)
+    frozen = torch.jit.freeze(traced)
+
+    torch.jit.save(frozen, str(path))
+
+
+# ============================================================
+# LOADING
+# ============================================================
+
+def warm_up(model, image_size: int, batch_sizes=WARMUP_BATCH_SIZES, runs=WARMUP_RUNS):
+    """
+    Run a few dummy forward passes so the first real request is fast.
+
+    TorchScript optimizes the graph on the first calls, and the kernels
+    allocate their work buffers - we pay that cost at boot instead.
+    """
+    with torch.inference_mode():
+        for batch_size in batch_sizes:
+            dummy = torch.zeros(batch_size, 3, image_size, image_size)
+            for _ in range(runs):
+                outputs = model(dummy)
+                if outputs.shape != (batch_size, 2):
+                    raise RuntimeError(f"Unexpected output shape {tuple(outputs.shape)}")
+
+
+def _is_stale(artifact_path: Path, state_dict_path: Path) -> bool:
+    """An exported artifact is stale if the weights were saved after it."""
+    return (
+        state_dict_path.exists()
+        and state_dict_path.stat().st_mtime > artifact_path.stat().st_mtime
+    )
+
+
+def load_fastest_model(model_factory, state_dict_path: Path, image_size: int):
+    """
+    Load the fastest usable model artifact, falling back step by step.
+
+    Each TorchScript candidate must exist, be newer than the state dict,
+    load, and survive a warm-up pass. Otherwise we move on to the next
+    one and finally to the eager fp32 model.
+
+    Args:
+        model_factory: Callable returning a fresh (untrained) LilyCNN
+        state_dict_path: Path to the fp32 state dict
+        image_size: Height/width of the input images
+
+    Returns:
+        model: Ready-to-use model in eval mode
+        runtime: Dictionary describing what was loaded
+    """
+    candidates = [
+        ("torchscript-int8", TORCHSCRIPT_INT8_PATH),
+        ("torchscript-fp32", TORCHSCRIPT_FP32_PATH),
+    ]
+
+    for name, path in candidates:
+        if not path.exists():
+            continue
+        if _is_stale(path, state_dict_path):
+            print(f"Skipping {path}: older than {state_dict_path} (re-run export_model.py)")
+            continue
+
+        try:
+            if name == "torchscript-int8":
+                select_quantized_engine()
+            started = time.perf_counter()
+            model = torch.jit.load(str(path), map_location="cpu")
+            model.eval()
+            warm_up(model, image_size)
+            load_ms = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            print(f"Could not use {path} ({name}): {e}")
+            continue
+
+        print(f"Loaded {name} model from {path} ({load_ms:.0f} ms incl. warm-up)")
+        return model, {"name": name, "path": str(path), "trained": True}
+
+    # Fallback: rebuild the eager fp32 model from the state dict
+    started = time.perf_counter()
+    model = model_factory()
+    trained = state_dict_path.exists()
+
+    if trained:
+        state_dict = torch.load(state_dict_path, map_location=torch.device('cpu'))
+        model.load_state_dict(state_dict)
+        print(f"Loaded model weights from {state_dict_path}")
+    else:
+        print(f"WARNING: Model file not found at {state_dict_path}")
+        print("Using untrained model - predictions will be random!")
+
+    # Set to evaluation mode (disables dropout, etc.)
+    model.eval()
+    warm_up(model, image_size)
+    load_ms = (time.perf_counter() - started) * 1000
+    print(f"Using eager-fp32 model ({load_ms:.0f} ms incl. warm-up)")
+
+    return model, {"name": "eager-fp32", "path": str(state_dict_path), "trained": trained}
@@ -0,0 +1,138 @@
+"""
+Prediction Cache
+================
+Content-addressed LRU cache for classifier results.
+
+Clients often re-submit the exact same image (retries, re-uploaded
+thumbnails). The cache key is a SHA-256 hash of the raw upload bytes
+plus the model version, so:
+    - identical bytes skip preprocessing and the forward pass
+    - a new model version never serves results from the old one
+
+Entries also remember how long the original prediction took, so the
+stats can report how much latency the cache has saved.
+
+Each lesson folder runs on its own, so the same class is kept in
+2025.12.28/01 - tensor demo/backend/prediction_cache.py
+too. Change both copies together.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+# ============================================================
+# CACHE
+# ============================================================
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of prediction results.
+
+    Example:
+        cache = PredictionCache(model_version="lily_model.pth@1700000000")
+        key = cache.key_for(image_bytes)
+        result = cache.get(key)
+        if result is None:
+            result = run_model(image_bytes)
+            cache.put(key, result, elapsed_ms)
+    """
+
+    def __init__(self, model_version: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            model_version: Identifier of the model whose results are cached
+            max_entries: Least recently used entries are evicted past this size
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (result, compute_ms)
+        self.max_entries = max_entries
+        self.model_version = model_version
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_ms = 0.0
+
+    def key_for(self, image_bytes: bytes) -> str:
+        """Build the cache key: hash of the raw bytes + model version."""
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{self.model_version}:{digest}"
+
+    def get(self, key: str):
+        """
+        Look up a result and mark it as recently used.
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            result, compute_ms = entry
+            self.hits += 1
+            self.saved_ms += compute_ms
+            return result
+
+    def put(self, key: str, result, compute_ms: float) -> None:
+        """
+        Store a result, evicting the least recently used entry if full.
+
+        Results computed for an older model version are dropped.
+
+        Args:
+            key: Key from key_for()
+            result: Prediction result to cache
+            compute_ms: How long computing the result took
+        """
+        with self._lock:
+            if not key.startswith(f"{self.model_version}:"):
+                return
+
+            self._entries[key] = (result, compute_ms)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_model_version(self, model_version: str) -> None:
+        """Switch to a new model version, dropping every cached result."""
+        with self._lock:
+            if model_version == self.model_version:
+                return
+            self.model_version = model_version
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Return hit rate, size and saved latency as a dictionary."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups > 0 else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "saved_ms": round(self.saved_ms, 2),
+            }
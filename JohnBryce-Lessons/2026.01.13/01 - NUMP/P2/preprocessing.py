@@ -0,0 +1,218 @@
+"""
+Lily Image Preprocessing
+========================
+Shared image preprocessing for training (lily_cnn_streaming.py) and
+serving (app.py).
+
+The network only sees 64x64 images, but uploads are often 12-megapixel
+phone photos. Fully decoding every pixel just to throw almost all of
+them away is wasted work. For JPEGs we ask the decoder for a reduced
+resolution instead (PIL `draft` -> libjpeg DCT scaling by 1/2, 1/4
+or 1/8), then finish with a fast box-reduce + bilinear resize.
+
+The result matches the original torchvision pipeline within a small
+tolerance - run this file to check the tolerance and see a benchmark:
+
+    python preprocessing.py
+"""
+
+import io
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+IMAGE_SIZE = 64
+
+NORMALIZE_MEAN = [0.485, 0.456, 0.406]
+NORMALIZE_STD = [0.229, 0.224, 0.225]
+
+# The JPEG decoder may shrink the image until it is this many times
+# larger than the target. Keeping some headroom lets the final resize
+# still average over several source pixels (antialiasing).
+DRAFT_HEADROOM = 4
+
+# PIL first shrinks by an integer factor with a box filter, then
+# resamples - much faster than a bilinear filter over the whole image
+REDUCING_GAP = 3.0
+
+# Largest allowed difference vs the reference pipeline, measured on
+# normalized tensors (roughly 1 unit = 1 standard deviation)
+MEAN_ABS_TOLERANCE = 0.05
+
+
+# ============================================================
+# PIPELINES
+# ============================================================
+
+# Original pipeline: full decode -> Resize -> ToTensor -> Normalize
+reference_transform = transforms.Compose([
+    transforms.Resize((IMAGE_SIZE, IMAGE_SIZE)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=NORMALIZE_MEAN, std=NORMALIZE_STD)
+])
+
+# Normalization constants shaped for (3, H, W) tensors
+_MEAN = torch.tensor(NORMALIZE_MEAN).view(3, 1, 1)
+_STD = torch.tensor(NORMALIZE_STD).view(3, 1, 1)
+
+
+def open_image_reduced(source, size=IMAGE_SIZE) -> Image.Image:
+    """
+    Open an image, decoding JPEGs at a reduced resolution.
+
+    Args:
+        source: Raw image bytes or an already opened PIL image
+        size: Final (square) size the image will be resized to
+
+    Returns:
+        RGB PIL image, at least size * DRAFT_HEADROOM on each side
+        when the source was that large
+    """
+    image = Image.open(io.BytesIO(source)) if isinstance(source, (bytes, bytearray)) else source
+
+    # draft() only works before the pixels are decoded and only for JPEG;
+    # for other formats (or already decoded images) it is a no-op
+    if image.format == "JPEG":
+        target = size * DRAFT_HEADROOM
+        image.draft("RGB", (target, target))
+
+    # Convert to RGB (handles grayscale, RGBA, etc.)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    return image
+
+
+def to_normalized_tensor(image: Image.Image) -> torch.Tensor:
+    """
+    Convert an RGB PIL image to a normalized (3, H, W) float tensor.
+
+    Same math as ToTensor() + Normalize(), in one pass over the pixels.
+    """
+    pixels = torch.from_numpy(np.asarray(image, dtype=np.uint8).copy())
+    tensor = pixels.permute(2, 0, 1).float().div_(255)
+    return tensor.sub_(_MEAN).div_(_STD)
+
+
+def preprocess(source, size=IMAGE_SIZE) -> torch.Tensor:
+    """
+    Fast preprocessing: reduced decode -> reduce + resize -> normalize.
+
+    Args:
+        source: Raw image bytes or a PIL image
+        size: Output height and width
+
+    Returns:
+        Tensor of shape (3, size, size)
+    """
+    image = open_image_reduced(source, size)
+    image = image.resize(
+        (size, size),
+        resample=Image.Resampling.BILINEAR,
+        reducing_gap=REDUCING_GAP
+    )
+    return to_normalized_tensor(image)
+
+
+def preprocess_reference(source) -> torch.Tensor:
+    """Original preprocessing (full-resolution decode), for comparison."""
+    image = Image.open(io.BytesIO(source)) if isinstance(source, (bytes, bytearray)) else source
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return reference_transform(image)
+
+
+# ============================================================
+# VALIDATION & BENCHMARK
+# ============================================================
+
+def make_test_jpeg(width, height, seed=0) -> bytes:
+    """
+    Create a synthetic photo-like JPEG (smooth gradients, shapes, noise).
+    """
+    rng = np.random.default_rng(seed)
+
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    red = 127 + 100 * np.sin(x / width * 6.0)
+    green = 127 + 100 * np.cos(y / height * 4.0)
+    blue = 127 + 100 * np.sin((x + y) / (width + height) * 8.0)
+    pixels = np.stack([red, green, blue], axis=-1)
+
+    # A few solid blobs for hard edges
+    for _ in range(8):
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        radius = rng.uniform(0.05, 0.2) * min(width, height)
+        mask = (x - cx) ** 2 + (y - cy) ** 2 < radius ** 2
+        pixels[mask] = rng.uniform(0, 255, size=3)
+
+    pixels += rng.normal(0, 8, size=pixels.shape)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def compare_to_reference(image_bytes) -> dict:
+    """Difference between the fast and reference tensors for one image."""
+    fast = preprocess(image_bytes)
+    reference = preprocess_reference(image_bytes)
+    diff = (fast - reference).abs()
+    return {"mean_abs": diff.mean().item(), "max_abs": diff.max().item()}
+
+
+def time_ms(fn, image_bytes, runs) -> float:
+    """Average time of fn(image_bytes) in milliseconds."""
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn(image_bytes)
+    return (time.perf_counter() - started) * 1000 / runs
+
+
+def main():
+    """Validate the fast path against the reference and benchmark it."""
+    print()
+    print("=" * 72)
+    print("   PREPROCESSING: reduced JPEG decode vs full decode")
+    print("=" * 72)
+    print()
+
+    sizes = [(640, 480), (1920, 1080), (4032, 3024)]
+    all_within_tolerance = True
+
+    print(f"{'Image size':<12} {'Full (ms)':>10} {'Fast (ms)':>10} {'Speedup':>8} "
+          f"{'Mean |d|':>9} {'Max |d|':>8}")
+    print("-" * 72)
+
+    for width, height in sizes:
+        image_bytes = make_test_jpeg(width, height)
+        runs = 20 if width * height < 4_000_000 else 5
+
+        full_ms = time_ms(preprocess_reference, image_bytes, runs)
+        fast_ms = time_ms(preprocess, image_bytes, runs)
+        diff = compare_to_reference(image_bytes)
+
+        within = diff["mean_abs"] <= MEAN_ABS_TOLERANCE
+        all_within_tolerance &= within
+
+        print(f"{width}x{height:<7} {full_ms:>10.2f} {fast_ms:>10.2f} {full_ms / fast_ms:>7.1f}x "
+              f"{diff['mean_abs']:>9.4f} {diff['max_abs']:>8.3f}{'' if within else '  FAIL'}")
+
+    print()
+    if all_within_tolerance:
+        print(f"All sizes within tolerance (mean |d| <= {MEAN_ABS_TOLERANCE})")
+    else:
+        print(f"WARNING: some sizes exceed tolerance (mean |d| > {MEAN_ABS_TOLERANCE})")
+    print()
+
+
+if __name__ == "__main__":
+    main()
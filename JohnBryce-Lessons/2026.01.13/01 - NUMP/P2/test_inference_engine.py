@@ -0,0 +1,66 @@
+"""
+Tests for the micro-batching inference engine.
+
+Run with:
+    python -m pytest test_inference_engine.py
+"""
+
+import asyncio
+import threading
+
+from inference_engine import InferenceEngine
+
+
+def test_batches_results_in_order():
+    engine = InferenceEngine(lambda items: [item * 2 for item in items], max_wait_ms=20)
+    engine.start()
+    try:
+        futures = [engine.submit(i) for i in range(5)]
+        assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+    finally:
+        engine.stop()
+
+
+def test_handler_error_reaches_every_caller():
+    def handler(items):
+        raise ValueError("boom")
+
+    engine = InferenceEngine(handler)
+    engine.start()
+    try:
+        future = engine.submit(1)
+        assert isinstance(future.exception(timeout=5), ValueError)
+    finally:
+        engine.stop()
+
+
+def test_cancelled_request_does_not_stop_the_worker():
+    release = threading.Event()
+
+    def handler(items):
+        # Hold the first batch until the second request has been cancelled
+        release.wait(5)
+        return items
+
+    engine = InferenceEngine(handler, max_batch_size=1, max_wait_ms=0)
+    engine.start()
+
+    async def scenario():
+        first = asyncio.ensure_future(asyncio.wrap_future(engine.submit("first")))
+        cancelled = asyncio.wrap_future(engine.submit("cancelled"))
+        # Times out while still queued: wait_for cancels the future
+        try:
+            await asyncio.wait_for(cancelled, timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+        release.set()
+
+        assert await first == "first"
+        # The worker must still be alive to serve the next request
+        return await asyncio.wait_for(asyncio.wrap_future(engine.submit("next")), timeout=5)
+
+    try:
+        assert asyncio.run(scenario()) == "next"
+        assert engine.metrics.snapshot()["total_requests"] == 2
+    finally:
+        engine.stop()